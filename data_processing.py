@@ -1,9 +1,26 @@
+import numpy as np
 import pandas as pd
 from utilities import process_dataframes as pd_util
 from utilities import merge_dataframes as md_util
 from utilities import refine_joined_data as rjd_util
 from utilities import calculate_additional_columns as cac_util
+from utilities.backends import obtener_backend
+from utilities.process_dataframes import CoincidenciaBuscadorFinal
+from utilities.linaje_columnas import ensamblar_reporte, resolver_linaje
+from utilities.resumenes import calcular_resumenes
+from utilities.stock import InstantaneasStock
+from utilities.datos_referencia import RegistroReferencia, version_de_datos
+from utilities.transporte_arrow import TransporteArrow, recibir, recibir_varios
+from utilities.muestreo import HOJA_AVISO_MUESTRA, aviso_muestra, muestrear_entradas
+from utilities.memoria import (COLUMNAS_REDUCIBLES, DiccionarioEnDisco, pico_rss_mb, reducir_numericos,
+                               reducir_procesados)
+import contextlib
+import gc
+import os
 import time
+import tracemalloc
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 class Timer:
     def __init__(self, message):
         self.message = message
@@ -15,6 +32,29 @@ class Timer:
         self.end = time.time()
         elapsed_time = self.end - self.start
         print(f"{self.message}: {elapsed_time:.2f} seconds")
+
+class MemoriaPico:
+    """
+    Mide con tracemalloc la memoria máxima asignada (pandas y numpy incluidos) dentro del bloque,
+    por encima de la que ya estaba asignada al entrar. El resultado queda en `pico` (bytes).
+    """
+    def __init__(self, message):
+        self.message = message
+        self.pico = 0
+
+    def __enter__(self):
+        self.iniciado_aqui = not tracemalloc.is_tracing()
+        if self.iniciado_aqui:
+            tracemalloc.start()
+        self.base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        return self
+
+    def __exit__(self, *args):
+        self.pico = tracemalloc.get_traced_memory()[1] - self.base
+        if self.iniciado_aqui:
+            tracemalloc.stop()
+        print(f"{self.message}: pico de {self.pico / 2**20:.1f} MB")
 # -------------------------
 # Funciones de Carga de Datos
 # -------------------------
@@ -38,89 +78,323 @@ def load_data(file_path, file_type='excel'):
 # -------------------------
 # Función Principal de Procesamiento
 # -------------------------
-def process_data(df_ME5A, df_ZMM621_fechaAprobacion, df_IW38, df_ME2N_OC, df_ZMB52, df_MCBE, df_criticos, df_inmovilizados, df_tipos_cambio):
-    processed_dataframes = pd_util.process_dataframes_for_join(df_ME5A, 
-                                                               df_ZMM621_fechaAprobacion,
-                                                               df_IW38,
-                                                               df_ME2N_OC,
-                                                               df_ZMB52, 
-                                                               df_MCBE,
-                                                               df_inmovilizados,
-                                                               df_criticos)
-    
-    # Cuando necesites acceder a un DataFrame específico, usa su índice
-    df_ME5A_converted = processed_dataframes[0]
-    df_ZMM621_fechaAprobacion_converted = processed_dataframes[1]
-    df_IW38_converted = processed_dataframes[2]
-    df_ME2N_OC_converted = processed_dataframes[3]
-    df_ZMB52_converted = processed_dataframes[4]
-    df_MCBE_converted = processed_dataframes[5]
-    df_inmovilizados_converted = processed_dataframes[6]
-    df_criticos_converted = processed_dataframes[7]
-    df_ZMM621_OCompras = processed_dataframes[8]
-    df_ZMM621_OMant = processed_dataframes[9]
-    df_ZMM621_HES_HEM = processed_dataframes[10]
-    
-    # Crear un diccionario con los dataframes procesados y sus nombres
-    processed_dataframes_dict = {
-        "ME5A": df_ME5A_converted,
-        "ZMM621_fechaAprobacion": df_ZMM621_fechaAprobacion_converted,
-        "IW38": df_IW38_converted,
-        "ME2N_OC": df_ME2N_OC_converted,
-        "ZMB52": df_ZMB52_converted,
-        "MCBE": df_MCBE_converted,
-        "inmovilizados": df_inmovilizados_converted,
-        "criticos": df_criticos_converted,
-        "ZMM621_OCompras": df_ZMM621_OCompras,
-        "ZMM621_OMant": df_ZMM621_OMant,
-        "ZMM621_HES_HEM": df_ZMM621_HES_HEM
-    }
+# Nombres de los DataFrames que retorna process_dataframes_for_join, en su orden
+HOJAS_PROCESADAS = ["ME5A", "ZMM621_fechaAprobacion", "IW38", "ME2N_OC", "ZMB52", "MCBE", "inmovilizados",
+                    "criticos", "ZMM621_OCompras", "ZMM621_OMant", "ZMM621_HES_HEM"]
+
+# Reportes de entrada de process_data, en el orden de sus argumentos
+ENTRADAS_PROCESO = ("df_ME5A", "df_ZMM621_fechaAprobacion", "df_IW38", "df_ME2N_OC", "df_ZMB52", "df_MCBE",
+                    "df_criticos", "df_inmovilizados", "df_tipos_cambio")
+
+def process_data(df_ME5A=None, df_ZMM621_fechaAprobacion=None, df_IW38=None, df_ME2N_OC=None, df_ZMB52=None, df_MCBE=None,
+                 df_criticos=None, df_inmovilizados=None, df_tipos_cambio=None,
+                 backend='pandas', clave_costo='Descripcion Material', copy_on_write=False, perfil='completo', resumenes=True, muestra=None,
+                 presupuesto_memoria=False, directorio_temporal=None, registro_referencia=None,
+                 instantaneas_stock=None, fecha_stock=None, version_stock=None, versiones_referencia=None, referencia=None,
+                 entradas=None):
+    """
+    Ejecuta el pipeline completo sobre los reportes SAP cargados.
+
+    Parámetros:
+    - df_tipos_cambio (DataFrame o ServicioTipoCambio): Tabla mensual de tipos de cambio o un
+      servicio ya construido (utilities.tipos_cambio), por ejemplo con tasas diarias.
+    - backend (str): Backend de ejecución de las etapas ('pandas' o 'polars-join', ver utilities.backends).
+    - clave_costo (str): Columna que agrupa las compras al tomar el precio más reciente para
+      'Costo compras por retirar' ('Descripcion Material' o 'Material').
+    - copy_on_write (bool): Ejecuta el pipeline con copy-on-write de pandas. Los DataFrames
+      recibidos nunca se modifican, en ningún modo: por defecto las etapas siguen copiando (copias
+      superficiales y las columnas que reescriben) y con este modo esas copias se difieren. El pico
+      de memoria es prácticamente el mismo en ambos modos (unos 28 MB frente a 26 MB con 20 000
+      filas de ME5A); para bajarlo se usa presupuesto_memoria.
+    - presupuesto_memoria (bool): Modo para máquinas con poca memoria: reduce las columnas numéricas
+      (cantidades, montos, 'Valor stock', 'Precio neto'; ver utilities.memoria), suelta las entradas
+      y los intermedios en cuanto dejan de usarse, guarda las hojas procesadas en disco hasta la
+      exportación (el diccionario retornado es un DiccionarioEnDisco) e informa el pico de memoria residente.
+    - directorio_temporal (str): Carpeta donde se guardan las hojas en modo presupuesto_memoria.
+    - perfil (str o list): Perfil de reporte de utilities.linaje_columnas.PERFILES_REPORTE o lista de
+      columnas de salida. Solo se unen y calculan las columnas de las que depende el perfil.
+    - resumenes (bool): Agrega a las hojas procesadas los resúmenes del reporte (cubo por tipo,
+      responsable, solicitante, estado de factura y mes; percentiles de DEMORA; totales), ver utilities.resumenes.
+    - muestra (float o int): Vista previa: procesa solo una fracción de ME5A (0 < muestra < 1) o unas
+      `muestra` filas, elegidas por hash de 'COMODIN SOLPED', con los demás reportes restringidos a
+      esas llaves (utilities.muestreo). El reporte queda marcado en `result.attrs['muestra']` y las
+      hojas incluyen AVISO_MUESTRA. None procesa todo.
+    - registro_referencia (RegistroReferencia): Registro de utilities.datos_referencia. Si se indica,
+      el índice de CRITICOS, INMOVILIZADOS ya convertido y el servicio de tipos de cambio se toman
+      del registro (se procesan solo cuando la tabla cambia o vence) en lugar de en cada ejecución.
+    - instantaneas_stock (InstantaneasStock o str): Instantáneas de stock de utilities.stock (o su
+      carpeta). ZMB52 agregado se guarda por fecha y, si ya hay instantánea del mismo listado, se
+      carga en lugar de volver a agregarlo. No se usa en vista previa (la muestra no es el stock real).
+    - fecha_stock (str): Fecha o etiqueta de la instantánea (por defecto, hoy).
+    - version_stock (str): Versión barata del listado ZMB52 (p. ej. la huella del archivo) para
+      decidir si la instantánea sirve sin recorrer el listado; ver InstantaneasStock.obtener.
+    - versiones_referencia (dict): Versión barata de CRITICOS, INMOVILIZADOS y tipos de cambio
+      ('criticos', 'inmovilizados', 'tipos_cambio'), p. ej. el sha256 o el tamaño y la fecha de su
+      archivo, para que registro_referencia no recorra las tablas; las que falten se calculan con
+      utilities.datos_referencia.version_de_datos.
+    - referencia (dict): Datos de referencia ya preparados con RegistroReferencia.preparar (ver
+      process_data_plantas); tiene prioridad sobre registro_referencia.
+    - entradas (dict): Los reportes por nombre de argumento (ENTRADAS_PROCESO), en lugar de pasarlos
+      uno por uno. process_data los saca del diccionario, así que es la única referencia que queda:
+      con presupuesto_memoria se liberan a mitad del pipeline aunque la llamada use **opciones (los
+      argumentos posicionales de una llamada con * o ** siguen referenciados hasta que termina).
+
+    Retorna:
+    - DataFrame: Reporte final con las columnas del perfil, en orden.
+    - dict: DataFrames procesados por nombre.
+    """
+    # Modo copy-on-write: las copias intermedias (renombres, selecciones, copias superficiales) son
+    # diferidas y solo se materializan las columnas que realmente se modifican
+    modo = pd.option_context('mode.copy_on_write', True) if copy_on_write else contextlib.nullcontext()
+    if entradas is not None:
+        (df_ME5A, df_ZMM621_fechaAprobacion, df_IW38, df_ME2N_OC, df_ZMB52, df_MCBE, df_criticos, df_inmovilizados,
+         df_tipos_cambio) = [entradas.pop(nombre) for nombre in ENTRADAS_PROCESO]
+    with modo:
+        motor = obtener_backend(backend)
+        if muestra:
+            # Vista previa: muestra de ME5A por hash de llave y el resto de reportes restringido a ella
+            (df_ME5A, df_ZMM621_fechaAprobacion, df_IW38, df_ME2N_OC, df_ZMB52, df_MCBE,
+             df_inmovilizados), fraccion_muestra = muestrear_entradas(df_ME5A, df_ZMM621_fechaAprobacion, df_IW38,
+                                                                     df_ME2N_OC, df_ZMB52, df_MCBE, df_inmovilizados,
+                                                                     muestra)
+            filas_muestra = len(df_ME5A)
+            print(f"VISTA PREVIA: se procesa una muestra del {fraccion_muestra:.2%} de ME5A ({filas_muestra} filas).")
+        stock_agregado = None
+        if instantaneas_stock is not None and not muestra:
+            if isinstance(instantaneas_stock, str):
+                instantaneas_stock = InstantaneasStock(instantaneas_stock)
+            stock_agregado = instantaneas_stock.obtener(df_ZMB52, fecha_stock, version_stock)
+        # Linaje: columnas de cada unión y columnas calculadas de las que depende el perfil
+        linaje = resolver_linaje(perfil, clave_costo)
+        if referencia is None and registro_referencia is not None:
+            # Datos de referencia ya procesados e indexados en ejecuciones anteriores. En vista previa
+            # INMOVILIZADOS es una muestra: no se registra, o reemplazaría a la forma de la tabla completa
+            referencia = registro_referencia.preparar(df_criticos, None if muestra else df_inmovilizados,
+                                                      df_tipos_cambio, versiones_referencia)
+        if referencia is not None:
+            indice_criticos = referencia['indice_criticos']
+            # En vista previa se convierte la muestra de INMOVILIZADOS, no la tabla completa ya preparada
+            inmovilizados_convertidos = None if muestra else referencia['inmovilizados']
+            df_tipos_cambio = referencia['tipos_cambio']
+        else:
+            # Índice único sobre CRITICOS, compartido por inmovilizadosConverted y merge_dataframes
+            indice_criticos = CoincidenciaBuscadorFinal.desde_busqueda(df_criticos, 'Código SAP.')
+            inmovilizados_convertidos = None
+        processed_dataframes = motor.process_dataframes_for_join(df_ME5A, 
+                                                                   df_ZMM621_fechaAprobacion,
+                                                                   df_IW38,
+                                                                   df_ME2N_OC,
+                                                                   df_ZMB52, 
+                                                                   df_MCBE,
+                                                                   df_inmovilizados,
+                                                                   df_criticos,
+                                                                   indice_criticos=indice_criticos,
+                                                                   corregir_solicitantes=linaje['solicitantes'],
+                                                                   inmovilizados_convertidos=inmovilizados_convertidos,
+                                                                   stock_agregado=stock_agregado)
     
-    processed_dataframes = [
-        df_ME5A_converted,
-        df_ZMM621_fechaAprobacion_converted,
-        df_IW38_converted,
-        df_ME2N_OC_converted,
-        df_ZMB52_converted,
-        df_MCBE_converted,
-        df_inmovilizados_converted,
-        df_criticos_converted,
-        df_ZMM621_OCompras,
-        df_ZMM621_OMant,
-        df_ZMM621_HES_HEM
-    ]
+        # Diccionario con los dataframes procesados y sus nombres (única referencia a cada uno)
+        processed_dataframes_dict = dict(zip(HOJAS_PROCESADAS, processed_dataframes))
+        del processed_dataframes
+
+        if presupuesto_memoria:
+            # Desde aquí solo se usan las versiones procesadas: se sueltan las entradas y se reducen los numéricos
+            del df_ME5A, df_ZMM621_fechaAprobacion, df_IW38, df_ME2N_OC, df_ZMB52, df_MCBE, df_inmovilizados
+            processed_dataframes_dict = reducir_procesados(processed_dataframes_dict)
     
-    joined_data = md_util.merge_dataframes(df_ME5A_converted, 
-                                           df_ZMM621_fechaAprobacion_converted,
-                                           df_IW38_converted,
-                                           df_ME2N_OC_converted,
-                                           df_ZMB52_converted, df_MCBE_converted,
-                                           df_tipos_cambio,df_criticos_converted,
-                                           df_inmovilizados_converted,
-                                           df_ZMM621_OCompras,
-                                           df_ZMM621_OMant,
-                                           df_ZMM621_HES_HEM)
+        procesados = processed_dataframes_dict
+        joined_data = motor.merge_dataframes(procesados["ME5A"],
+                                               procesados["ZMM621_fechaAprobacion"],
+                                               procesados["IW38"],
+                                               procesados["ME2N_OC"],
+                                               procesados["ZMB52"], procesados["MCBE"],
+                                               df_tipos_cambio, procesados["criticos"],
+                                               procesados["inmovilizados"],
+                                               procesados["ZMM621_OCompras"],
+                                               procesados["ZMM621_OMant"],
+                                               procesados["ZMM621_HES_HEM"],
+                                               indice_criticos=indice_criticos,
+                                               columnas_por_union=linaje['uniones'])
+        df_inmovilizados_converted = procesados["inmovilizados"]
+        df_criticos_converted = procesados["criticos"]
+        del procesados
+
+        if presupuesto_memoria:
+            # Las hojas procesadas solo se necesitan para exportar: pasan a disco hasta entonces
+            en_disco = DiccionarioEnDisco(directorio_temporal)
+            for nombre in HOJAS_PROCESADAS:
+                en_disco[nombre] = processed_dataframes_dict.pop(nombre)
+            processed_dataframes_dict = en_disco
+            gc.collect()
     
-    joined_data = rjd_util.refine_joined_data(joined_data)
+        joined_data = motor.refine_joined_data(joined_data)
     
-    joined_data = cac_util.calculate_additional_columns(joined_data, df_tipos_cambio,df_inmovilizados_converted,df_criticos_converted)
+        joined_data = motor.calculate_additional_columns(joined_data, df_tipos_cambio,df_inmovilizados_converted,df_criticos_converted,
+                                                         clave_costo=clave_costo,
+                                                         columnas_requeridas=linaje['requeridas'])
     
-    column_order = [
-        'COMODIN OC', 'COMODIN SOLPED', 'Ind.liberación', 'TIPO', 'Solicitante','Solicitante Corregido', 'Pto.tbjo.responsable',
-        'Estado HES/HEM', 'Fecha de reg. Factura', 'Estado factura',
-        'Fecha contable', 'Estado contable', 'Fecha de HES/EM','Material', 'Numero de activo',
-        'Cantidad solicitada', 'Unidad de medida', 'Solicitud de pedido','Pos.solicitud pedido','Cantidad de pedido',
-        'Por entregar (cantidad)', 'Pedido','Posición', 'Indicador liberación', 'Orden', 'Condición de pago del pedido',
-        'Valor net. Solped', 'Denominación de la ubicación técnica', 'Denominación de objeto técnico', 'Equipo',
-        'Por entregar (STATUS)', 'Por entregar (valor)', 'Precio neto', 'Descripcion Material', 'Moneda',
-        'Libre utilización', 'Indicador de borrado SOLPED', 'Año OC', 'Mes OC', 'Indicador de borrado Orden de Compra',
-        'Fecha de SOLPED',
-        'Fecha de OC', 'PENDIENTE DE LIBERACIÓN DE OC', 'Fecha de aprobación de la orden de compr',
-        'DEMORA EN GENERAR OC (DIAS)', 'DEMORA EN LIBERACIONES DE OC', 'Proveedor/Centro suministrador',
-        'Estado liberación', 'Estrategia liberac.', 'Tipo de Cambio', 'Precio Convertido Dolares',
-        'TIPO COMPROMETIDO SUGERENCIA', ' Últ.mov.', 'Últ.cons.', 'Últ.salida','Costo compras por retirar','Dias Inmovilizados','Estado Inmovilizado','Valor stock','Stock','Material Critico?']
-
-    # Reorder the dataframe columns
-    joined_data = joined_data[column_order]
-    joined_data.drop(['Ind.liberación'],axis=1,inplace=True)
-    return joined_data, processed_dataframes_dict
\ No newline at end of file
+        # Reporte final con las columnas del perfil en orden ('Ind.liberación' y las intermedias solo se usan
+        # en los cálculos), armado sobre los arreglos ya calculados en lugar de copiarlos
+        joined_data = ensamblar_reporte(joined_data, linaje['columnas'])
+        if resumenes:
+            for nombre, resumen in calcular_resumenes(joined_data).items():
+                processed_dataframes_dict[nombre] = resumen
+        if muestra:
+            joined_data.attrs['muestra'] = fraccion_muestra
+            processed_dataframes_dict[HOJA_AVISO_MUESTRA] = aviso_muestra(fraccion_muestra, filas_muestra, len(joined_data))
+        if presupuesto_memoria:
+            joined_data = reducir_numericos(joined_data, COLUMNAS_REDUCIBLES['ME2N_OC'] + COLUMNAS_REDUCIBLES['inmovilizados'])
+            pico = pico_rss_mb()
+            if pico is not None:
+                print(f"Pico de memoria residente del proceso: {pico:.0f} MB")
+        return joined_data, processed_dataframes_dict
+
+# -------------------------
+# Procesamiento por planta
+# -------------------------
+# Reportes propios de cada planta (obligatorios en su paquete) y comunes que una planta puede reemplazar
+REPORTES_PLANTA = ("ME5A", "ZMM621", "ME2N", "ZMB52")
+REPORTES_PLANTA_OPCIONALES = ("MCBE", "INMOVILIZADOS")
+
+HOJA_TIEMPOS_PLANTAS = "TIEMPOS_PLANTAS"
+
+def _procesar_planta(planta, entradas, referencia, opciones):
+    """Ejecuta process_data para una planta y devuelve su reporte, sus hojas y los segundos que tardó."""
+    inicio = time.time()
+    # Con presupuesto_memoria las tablas se sacan del paquete para que process_data pueda soltarlas
+    tomar = entradas.pop if opciones.get('presupuesto_memoria') else entradas.__getitem__
+    tablas = dict(zip(ENTRADAS_PROCESO, [tomar('ME5A'), tomar('ZMM621'), tomar('IW38'), tomar('ME2N'), tomar('ZMB52'),
+                                         tomar('MCBE'), tomar('CRITICOS'), tomar('INMOVILIZADOS'),
+                                         referencia['tipos_cambio']]))
+    result, processed_dataframes_dict = process_data(entradas=tablas, referencia=referencia, **opciones)
+    segundos = time.time() - inicio
+    print(f"Planta {planta}: {segundos:.2f} seconds ({len(result)} filas)")
+    return result, processed_dataframes_dict, segundos
+
+def _procesar_planta_en_proceso(planta, tablas, referencia, opciones, directorio):
+    """
+    _procesar_planta en un proceso del pool: las tablas de la planta llegan y el reporte y las hojas
+    vuelven como archivos Arrow en `directorio` (utilities.transporte_arrow), no por la tubería del pool.
+    """
+    result, processed_dataframes_dict, segundos = _procesar_planta(planta, recibir_varios(tablas), referencia, opciones)
+    transporte = TransporteArrow(directorio, filas_minimas=0)
+    return transporte.enviar(result), transporte.enviar_varios(processed_dataframes_dict), segundos
+
+def process_data_plantas(plantas, df_IW38, df_MCBE, df_criticos, df_inmovilizados, df_tipos_cambio, hilos=None,
+                         ejecutor='hilos', registro_referencia=None, copy_on_write=False, instantaneas_stock=None,
+                         versiones_stock=None, versiones_referencia=None, **opciones):
+    """
+    Ejecuta el pipeline para varias plantas a la vez, con las tablas comunes preparadas una sola vez.
+
+    El índice de CRITICOS, INMOVILIZADOS convertido y el servicio de tipos de cambio se construyen
+    antes de empezar (con registro_referencia, o con un RegistroReferencia propio) y se comparten
+    entre plantas: con ejecutor='hilos', en memoria; con 'procesos', se envían ya construidos a cada
+    proceso (son pequeños) y las tablas de las plantas viajan como archivos Arrow.
+
+    Parámetros:
+    - plantas (dict): Paquete de reportes por planta, {planta: {'ME5A', 'ZMM621', 'ME2N', 'ZMB52'}}.
+      Un paquete puede traer además su propio 'MCBE' o 'INMOVILIZADOS'.
+    - df_IW38, df_MCBE, df_criticos, df_inmovilizados, df_tipos_cambio: Tablas comunes a todas las
+      plantas (df_tipos_cambio puede ser un ServicioTipoCambio).
+    - hilos (int): Plantas procesadas a la vez (por defecto, todas hasta el número de CPUs).
+    - ejecutor (str): 'hilos' (por defecto) o 'procesos'. Con 'hilos' no hay copias ni procesos que
+      arrancar, pero casi todo el pipeline retiene el GIL: las plantas se ejecutan prácticamente una
+      tras otra y el tiempo total se acerca a la suma de TIEMPOS_PLANTAS. Conviene para pocas plantas
+      pequeñas. Con 'procesos' (pool 'spawn') las plantas sí corren en paralelo, a cambio de
+      arrancar los procesos y pasar las tablas; es la opción para plantas grandes con varias CPUs.
+    - registro_referencia (RegistroReferencia): Registro de utilities.datos_referencia a reutilizar.
+    - copy_on_write (bool): Como en process_data; la opción de pandas es global, así que se activa
+      una vez para todas las plantas.
+    - instantaneas_stock (InstantaneasStock o str): Como en process_data, con una subcarpeta por planta.
+    - versiones_stock (dict): version_stock de process_data para el ZMB52 de cada planta.
+    - versiones_referencia (dict): Como en process_data, para las tablas comunes (el INMOVILIZADOS
+      propio de una planta se versiona por contenido).
+    - **opciones: Demás argumentos de process_data (backend, perfil, muestra, fecha_stock, ...).
+
+    Retorna:
+    - DataFrame: Reporte consolidado, con la columna 'Planta' al inicio.
+    - dict: Resúmenes del reporte consolidado (si `resumenes` no es False) y TIEMPOS_PLANTAS.
+    - dict: Por planta, la tupla (reporte, hojas procesadas) de process_data.
+    """
+    permitidas = set(REPORTES_PLANTA + REPORTES_PLANTA_OPCIONALES)
+    for planta, paquete in plantas.items():
+        faltantes = [clave for clave in REPORTES_PLANTA if clave not in paquete]
+        sobrantes = [clave for clave in paquete if clave not in permitidas]
+        if faltantes or sobrantes:
+            raise ValueError(f"Paquete de la planta {planta}: faltan {faltantes}, no se esperaban {sobrantes} "
+                             f"(IW38, CRITICOS y tipos de cambio son comunes)")
+
+    registro = registro_referencia or RegistroReferencia()
+    comunes = {'IW38': df_IW38, 'MCBE': df_MCBE, 'CRITICOS': df_criticos, 'INMOVILIZADOS': df_inmovilizados}
+    with Timer("Preparing shared reference tables"):
+        # Las versiones de las tablas comunes se calculan una vez (si no vienen en versiones_referencia);
+        # cada INMOVILIZADOS distinto se convierte una vez
+        versiones = dict(versiones_referencia or {})
+        if 'criticos' not in versiones:
+            versiones['criticos'] = version_de_datos(df_criticos)
+        if 'tipos_cambio' not in versiones and isinstance(df_tipos_cambio, pd.DataFrame):
+            versiones['tipos_cambio'] = version_de_datos(df_tipos_cambio)
+        versiones_inmovilizados = {}
+        if 'inmovilizados' in versiones:
+            versiones_inmovilizados[id(df_inmovilizados)] = versiones.pop('inmovilizados')
+        entradas, referencias = {}, {}
+        for planta, paquete in plantas.items():
+            entradas[planta] = {**comunes, **paquete}
+            df_inmov = entradas[planta]['INMOVILIZADOS']
+            if id(df_inmov) not in versiones_inmovilizados:
+                versiones_inmovilizados[id(df_inmov)] = version_de_datos(df_inmov)
+            referencias[planta] = registro.preparar(df_criticos, df_inmov, df_tipos_cambio,
+                                                    {**versiones, 'inmovilizados': versiones_inmovilizados[id(df_inmov)]})
+
+    if ejecutor not in ('hilos', 'procesos'):
+        raise ValueError(f"Ejecutor no válido: {ejecutor}. Use 'hilos' o 'procesos'.")
+    if instantaneas_stock is not None:
+        directorio = instantaneas_stock if isinstance(instantaneas_stock, str) else instantaneas_stock.directorio
+    hilos = hilos or min(len(plantas), os.cpu_count() or 1) or 1
+    if ejecutor == 'hilos':
+        # La opción de pandas es global: se activa una vez alrededor de todos los hilos
+        modo = pd.option_context('mode.copy_on_write', True) if copy_on_write else contextlib.nullcontext()
+        pool = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="planta")
+        transporte = None
+    else:
+        modo = contextlib.nullcontext()
+        opciones = {**opciones, 'copy_on_write': copy_on_write}
+        pool = ProcessPoolExecutor(max_workers=hilos, mp_context=multiprocessing.get_context("spawn"))
+        transporte = TransporteArrow(filas_minimas=0)
+
+    with Timer(f"Processing {len(plantas)} plants"), modo, pool, transporte or contextlib.nullcontext():
+        futuros, enviadas = {}, {}
+        for planta in plantas:
+            opciones_planta = dict(opciones)
+            if instantaneas_stock is not None:
+                opciones_planta['instantaneas_stock'] = InstantaneasStock(os.path.join(directorio, str(planta)))
+                opciones_planta['version_stock'] = (versiones_stock or {}).get(planta)
+            if transporte is None:
+                futuros[planta] = pool.submit(_procesar_planta, planta, entradas[planta], referencias[planta],
+                                              opciones_planta)
+            else:
+                # Las tablas comunes se escriben una sola vez para todas las plantas
+                for df in entradas[planta].values():
+                    if id(df) not in enviadas:
+                        enviadas[id(df)] = transporte.enviar(df)
+                tablas = {clave: enviadas[id(df)] for clave, df in entradas[planta].items()}
+                futuros[planta] = pool.submit(_procesar_planta_en_proceso, planta, tablas, referencias[planta],
+                                              opciones_planta, transporte.directorio)
+        por_planta, tiempos = {}, []
+        for planta, futuro in futuros.items():
+            result, processed_dataframes_dict, segundos = futuro.result()
+            if transporte is not None:
+                # Copias propias: los resultados se entregan al usuario y el transporte se borra al salir
+                result = recibir(result, copiar=True)
+                processed_dataframes_dict = recibir_varios(processed_dataframes_dict, copiar=True)
+            por_planta[planta] = (result, processed_dataframes_dict)
+            tiempos.append({'Planta': planta, 'Filas': len(result), 'Segundos': round(segundos, 2)})
+
+    reportes = [result for result, _ in por_planta.values()]
+    consolidado = pd.concat(reportes, ignore_index=True)
+    consolidado.insert(0, 'Planta', np.repeat(list(por_planta), [len(result) for result in reportes]))
+    hojas = {}
+    if opciones.get('resumenes', True):
+        hojas.update(calcular_resumenes(consolidado))
+    hojas[HOJA_TIEMPOS_PLANTAS] = pd.DataFrame(tiempos, columns=['Planta', 'Filas', 'Segundos'])
+    return consolidado, hojas, por_planta
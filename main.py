@@ -1,159 +1,266 @@
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 import streamlit as st
 import pandas as pd
-import data_processing as dp
-from utilities.process_dataframes import process_MCBE, validate_and_create_comodin_columns
+from utilities.cola_trabajos import DURACION_RESULTADOS, ColaTrabajos
+from utilities.esquemas import ErrorDeEsquema
+from utilities.indice_registros import IndiceRegistros
+from utilities.ingesta import TRABAJADORES_INGESTA_COMPARTIDOS, IngestaEnSegundoPlano
+from utilities.resumenes import (COLUMNA_PERIODO, DIMENSIONES_RESUMEN, HOJA_CUBO, HOJA_DEMORAS, MEDIDAS_RESUMEN,
+                                 agregar_cubo, filtrar_cubo)
+from utilities.backends import backends_disponibles
+
+# Reportes de la aplicación: clave y texto del file_uploader, en el orden de process_data
+REPORTES_APP = [
+    ("ME5A", "Subir archivo ME5A"),
+    ("ZMM621", "Subir archivo ZMM621"),
+    ("IW38", "Subir archivo IW38"),
+    ("ME2N", "Subir archivo ME2N"),
+    ("ZMB52", "Subir archivo ZMB52"),
+    ("MCBE", "Subir archivo MCBE"),
+    ("CRITICOS", "Subir archivo CRITICOS"),
+    ("INMOVILIZADOS", "Subir archivo INMOVILIZADOS"),
+    ("tipos_cambio", "Subir archivo Tipos de cambio"),
+]
+CLAVES_APP = [clave for clave, _ in REPORTES_APP]
+
+# Filas de ME5A que procesa la vista previa (process_data con muestra)
+FILAS_VISTA_PREVIA = 2000
+
+# Filas máximas que muestra la búsqueda de registros
+MAXIMO_FILAS_BUSQUEDA = 500
+
+# Segundos entre consultas del estado de un trabajo en la cola
+INTERVALO_CONSULTA = 1
+
+# Reportes de trabajos terminados que se mantienen cargados para la búsqueda (todas las sesiones)
+MAXIMO_REPORTES_CARGADOS = 4
+
+ICONOS_ESTADO = {'sin archivo': '⚪', 'en cola': '🕓', 'procesando': '⏳', 'listo': '✅', 'error': '❌'}
+
+
+@st.cache_resource
+def obtener_pool_ingesta():
+    """Hilos de lectura compartidos por todas las sesiones: su número no crece con las sesiones abiertas."""
+    return ThreadPoolExecutor(max_workers=TRABAJADORES_INGESTA_COMPARTIDOS, thread_name_prefix="ingesta")
+
+
+def obtener_ingesta():
+    """
+    Lecturas en segundo plano de la sesión, sobre el pool compartido. Al terminar la sesión se
+    descarta con su session_state y sus lecturas pendientes se cancelan (IngestaEnSegundoPlano).
+    """
+    if 'ingesta' not in st.session_state:
+        st.session_state.ingesta = IngestaEnSegundoPlano(pool=obtener_pool_ingesta())
+    return st.session_state.ingesta
+
+
+def mostrar_estado_ingesta(ingesta):
+    """Muestra el estado de lectura de cada archivo."""
+    for clave, _ in REPORTES_APP:
+        estado, detalle = ingesta.estado(clave)
+        st.caption(f"{ICONOS_ESTADO[estado]} {clave}: {estado} {detalle}")
 
-def process_uploaded_files(files):
-    dfs = {}
-    
-    # Carga de DataFrames
-    try:
-        dfs["ME5A"] = pd.read_excel(files[0],engine='openpyxl')
-        if dfs["ME5A"] is None:
-            st.error("Error: El archivo ME5A no se cargó correctamente.")
-            return
-        dfs["ZMM621"] = pd.read_excel(files[1],engine='openpyxl')
-        if dfs["ZMM621"] is None:
-            st.error("Error: El archivo ZMM621 no se cargó correctamente.")
-            return
-        dfs["IW38"] = pd.read_excel(files[2],engine='openpyxl')
-        if dfs["IW38"] is None:
-            st.error("Error: El archivo IW38 no se cargó correctamente.")
-            return
-        dfs["ME2N"] = pd.read_excel(files[3],engine='openpyxl')
-        if dfs["ME2N"] is None:
-            st.error("Error: El archivo ME2N no se cargó correctamente.")
-            return
-        dfs["ZMB52"] = pd.read_excel(files[4],engine='openpyxl')
-        if dfs["ZMB52"] is None:
-            st.error("Error: El archivo ZMB52 no se cargó correctamente.")
-            return
-        dfs["MCBE"] = process_MCBE(pd.read_excel(files[5],engine='openpyxl'))
-        if dfs["MCBE"] is None:
-            st.error("Error: El archivo MCBE no se cargó correctamente.")
-            return
-        dfs["CRITICOS"] = pd.read_excel(files[6],engine='openpyxl')
-        if dfs["CRITICOS"] is None:
-            st.error("Error: El archivo CRITICOS no se cargó correctamente.")
-            return
-        dfs["INMOVILIZADOS"] = pd.read_excel(files[7],engine='openpyxl')
-        if dfs["INMOVILIZADOS"] is None:
-            st.error("Error: El archivo INMOVILIZADOS no se cargó correctamente.")
-            return
-
-        try:
-            dfs["tipos_cambio"] = pd.read_excel(files[8],engine='openpyxl')
-            if dfs["tipos_cambio"] is None:
-                st.error("Error: Los archivos de tipos de cambio no se cargaron correctamente.")
-                return
-        except Exception as e:
-            st.error(f"Error cargando y unificando los archivos de tipos de cambio: {e}")
-            return
 
+# Con st.fragment (Streamlit >= 1.37) el estado se refresca solo mientras se leen los archivos
+_fragmento = getattr(st, 'fragment', None)
+if _fragmento is not None:
+    mostrar_estado_ingesta = _fragmento(run_every=1)(mostrar_estado_ingesta)
+
+
+@st.cache_resource
+def obtener_cola():
+    """Cola de trabajos única del servidor, compartida por todas las sesiones."""
+    return ColaTrabajos()
+
+
+def obtener_sesion():
+    """Identificador de la sesión, con el que se registran sus trabajos en la cola."""
+    if 'sesion' not in st.session_state:
+        st.session_state.sesion = uuid.uuid4().hex[:8]
+    return st.session_state.sesion
+
+
+def process_uploaded_files(ingesta, cola, backend='pandas', presupuesto_memoria=False, vista_previa=False):
+    """
+    Espera la lectura de los archivos y envía el procesamiento a la cola de trabajos del servidor.
+    Retorna el identificador del trabajo, o None si algún archivo no se pudo cargar.
+    """
+    # Los archivos se leen, validan y reciben sus columnas COMODIN en segundo plano al subirlos;
+    # aquí solo se espera a los que falten
+    barra = st.progress(ingesta.progreso(CLAVES_APP), text="Leyendo archivos...")
+    while ingesta.pendientes(CLAVES_APP):
+        time.sleep(0.2)
+        barra.progress(ingesta.progreso(CLAVES_APP), text="Leyendo archivos...")
+    barra.progress(1.0, text="Archivos leídos.")
+
+    try:
+        dfs = ingesta.resultados(CLAVES_APP)
+    except ErrorDeEsquema as e:
+        st.error(str(e))
+        return
     except Exception as e:
         st.error(f"Error cargando los archivos: {e}")
         return
-    
-    keys = list(dfs.keys())
-    # Procesamiento de DataFrames
-    for key in keys:
-        df = dfs[key]
-        if df is None:
-            st.error(f"Error: El DataFrame {key} es None.")
-            return
-        if key in ["ME5A", "ZMM621", "ME2N"]:
-            try:
-                dfs[f"{key}_ComodinCreated"], message = validate_and_create_comodin_columns(df, f"df_{key}")
-                st.write(message)
-            except Exception as e:
-                st.error(f"Error validando y creando columnas para {key}: {e}")
-                return
-    
-    try:
-        result, processed_dataframes_dict  = dp.process_data(
-            dfs["ME5A_ComodinCreated"], 
-            dfs["ZMM621_ComodinCreated"], 
-            dfs["IW38"], 
-            dfs["ME2N_ComodinCreated"], 
-            dfs["ZMB52"], 
-            dfs["MCBE"], 
-            dfs["CRITICOS"], 
-            dfs["INMOVILIZADOS"], 
-            dfs["tipos_cambio"]
-        )
 
-    except Exception as e:
-        st.error(f"Error processing the data: {e}")
+    opciones = {'backend': backend, 'presupuesto_memoria': presupuesto_memoria}
+    if vista_previa:
+        opciones['muestra'] = FILAS_VISTA_PREVIA
+    return cola.enviar(dfs, ingesta.huellas(CLAVES_APP), opciones, sesion=obtener_sesion())
+
+
+# Los cachés de salidas se identifican por trabajo y vencen a más tardar con sus salidas
+# (ColaTrabajos.limpiar las borra DURACION_RESULTADOS segundos después de terminar)
+@st.cache_data(ttl=DURACION_RESULTADOS, max_entries=MAXIMO_REPORTES_CARGADOS)
+def cargar_resumenes(id_trabajo, ruta):
+    """Resúmenes de un trabajo terminado (se leen una vez por trabajo)."""
+    return pd.read_pickle(ruta)
+
+
+def mostrar_tablero(resumenes):
+    """
+    Tablero de resultados: filtros, totales, gráfico por dimensión y percentiles de DEMORA.
+    Todo se calcula sobre el cubo precalculado, sin volver a recorrer el reporte.
+    """
+    cubo = resumenes[HOJA_CUBO]
+    dimensiones = [col for col in DIMENSIONES_RESUMEN + [COLUMNA_PERIODO] if col in cubo.columns]
+    if not dimensiones:
+        return
+    st.subheader("Resumen")
+
+    columnas = st.columns(len(dimensiones))
+    filtros = {dimension: columna.multiselect(dimension, sorted(cubo[dimension].unique()))
+               for columna, dimension in zip(columnas, dimensiones)}
+    filtrado = filtrar_cubo(cubo, filtros)
+
+    medidas = ['Registros'] + [nombre for nombre in MEDIDAS_RESUMEN if nombre in cubo.columns]
+    for columna, medida in zip(st.columns(len(medidas)), medidas):
+        columna.metric(medida, f"{filtrado[medida].sum():,.0f}")
+
+    dimension = st.selectbox("Agrupar por", dimensiones)
+    medida = st.selectbox("Medida", medidas)
+    st.bar_chart(agregar_cubo(filtrado, dimension)[medida])
+
+    if not resumenes[HOJA_DEMORAS].empty:
+        st.caption("Percentiles de DEMORA (días) por TIPO COMPROMETIDO SUGERENCIA")
+        st.dataframe(resumenes[HOJA_DEMORAS], hide_index=True)
+
+
+@st.cache_resource(ttl=DURACION_RESULTADOS, max_entries=MAXIMO_REPORTES_CARGADOS)
+def cargar_busqueda(id_trabajo, ruta_reporte, ruta_indice):
+    """Reporte e índices de un trabajo terminado, cargados una vez y compartidos (solo lectura)."""
+    reporte = pd.read_pickle(ruta_reporte)
+    return reporte, IndiceRegistros.cargar(ruta_indice, reporte)
+
+
+def mostrar_busqueda(reporte, indice):
+    """Búsqueda de registros del reporte por Pedido, Solicitud de pedido, Orden o Material."""
+    st.subheader("Buscar registros")
+    columna_campo, columna_valor, columna_modo = st.columns([2, 3, 1])
+    campo = columna_campo.selectbox("Campo", indice.columnas)
+    valor = columna_valor.text_input("Valor")
+    por_prefijo = columna_modo.checkbox("Prefijo", value=False)
+    if not valor:
         return
+    if por_prefijo:
+        posiciones = indice.buscar_prefijo(campo, valor)
+    else:
+        posiciones = indice.buscar(campo, valor)
+    st.caption(f"{len(posiciones)} registro(s)")
+    st.dataframe(reporte.iloc[posiciones[:MAXIMO_FILAS_BUSQUEDA]], hide_index=True)
+
 
-    return result,processed_dataframes_dict 
+def mostrar_progreso(cola, id_trabajo):
+    """
+    Progreso de un trabajo en curso. Se vuelve a ejecutar cada INTERVALO_CONSULTA segundos (como
+    fragmento, sin ocupar el hilo de la sesión entre consultas) y recarga la página al terminar.
+    """
+    estado = cola.estado(id_trabajo)
+    if estado['estado'] not in ('en cola', 'ejecutando'):
+        st.rerun()
+    st.progress(estado['fraccion'], text=f"Trabajo {id_trabajo}: {estado['estado']} {estado['etapa']}")
+
+
+if _fragmento is not None:
+    mostrar_progreso = _fragmento(run_every=INTERVALO_CONSULTA)(mostrar_progreso)
+
+
+def mostrar_trabajo(cola, id_trabajo):
+    """Muestra el progreso del trabajo mientras corre y, al terminar, ofrece sus salidas para descargar."""
+    # Los trabajos vencidos se borran también al consultarlos, no solo al enviar otro
+    cola.limpiar()
+    estado = cola.estado(id_trabajo)
+    if estado['estado'] in ('en cola', 'ejecutando'):
+        mostrar_progreso(cola, id_trabajo)
+        if _fragmento is None:
+            # Sin fragmentos, una recarga por consulta en lugar de esperar dentro de la ejecución
+            time.sleep(INTERVALO_CONSULTA)
+            st.rerun()
+        return
+    if estado['estado'] == 'desconocido':
+        st.info("Los resultados de este trabajo ya se borraron. Procese los archivos de nuevo.")
+        st.session_state.pop('trabajo', None)
+        return
+    if estado['estado'] != 'listo':
+        st.error(f"Error procesando los datos: {estado['error']}")
+        return
+
+    salidas = estado['salidas']
+    if salidas.get('muestra'):
+        st.warning(f"VISTA PREVIA sobre una muestra del {salidas['muestra']:.1%} de ME5A: el reporte no está "
+                   "completo. Desactive la vista previa para procesar todo.")
+    st.success(f"Procesamiento completado exitosamente ({salidas['filas']} filas).")
+    # Las salidas están en la carpeta del trabajo: cada sesión descarga las suyas
+    with open(salidas['excel'], "rb") as f:
+        st.download_button(
+            label="Descargar archivos procesados",
+            data=f,
+            file_name="archivos_procesados.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        )
+    with open(salidas['csv'], "rb") as f:
+        st.download_button(label="Descargar reporte (CSV)", data=f, file_name="reporte_procesado.csv",
+                           mime="text/csv")
+    mostrar_tablero(cargar_resumenes(id_trabajo, salidas['resumenes']))
+    mostrar_busqueda(*cargar_busqueda(id_trabajo, salidas['reporte'], salidas['indice']))
 
 def main():
     st.title("Aplicación de Procesamiento de Datos")
 
+    backend = st.sidebar.selectbox("Backend de procesamiento", backends_disponibles())
+    presupuesto_memoria = st.sidebar.checkbox("Modo de memoria reducida", value=False,
+                                              help="Reduce tipos numéricos y guarda las hojas intermedias en disco.")
+    vista_previa = st.sidebar.checkbox("Vista previa (muestra)", value=False,
+                                       help=f"Procesa solo unas {FILAS_VISTA_PREVIA} filas de ME5A, con los demás "
+                                            "reportes restringidos a ellas, para revisar los archivos en segundos.")
 
-    # Inicialización del estado de sesión para el botón de procesamiento
-    if 'processed' not in st.session_state:
-        st.session_state.processed = False
-    
-    if 'downloading' not in st.session_state:
-        st.session_state.downloading = False
+    cola = obtener_cola()
         
-    # Carga de archivos usando Streamlit
-    files = [
-        st.file_uploader("Subir archivo ME5A", type=["xlsx"]),
-        st.file_uploader("Subir archivo ZMM621", type=["xlsx"]),
-        st.file_uploader("Subir archivo IW38", type=["xlsx"]),
-        st.file_uploader("Subir archivo ME2N", type=["xlsx"]),
-        st.file_uploader("Subir archivo ZMB52", type=["xlsx"]),
-        st.file_uploader("Subir archivo MCBE", type=["xlsx"]),       # Nuevo archivo
-        st.file_uploader("Subir archivo CRITICOS", type=["xlsx"]),   # Nuevo archivo
-        st.file_uploader("Subir archivo INMOVILIZADOS", type=["xlsx"]), # Nuevo archivo
-        st.file_uploader("Subir archivo Tipos de cambio", type=["xlsx"]),
-    ]
+    # Carga de archivos usando Streamlit: cada archivo empieza a leerse apenas se sube
+    ingesta = obtener_ingesta()
+    files = []
+    for clave, etiqueta in REPORTES_APP:
+        archivo = st.file_uploader(etiqueta, type=["xlsx"])
+        # Un archivo reemplazado o quitado cancela la lectura anterior de su clave y suelta su DataFrame
+        ingesta.enviar(clave, archivo)
+        files.append(archivo)
+    mostrar_estado_ingesta(ingesta)
     
-    if all(files) and not st.session_state.downloading:
+    if all(files):
         st.success("Todos los archivos han sido subidos correctamente.")
    # Botón de procesamiento   
-    if st.button("Procesar archivos") or st.session_state.processed:
-        st.session_state.downloading = False  # Reset downloading flag
-        
-
+    if st.button("Procesar archivos"):
         if all(files):
-            try:
-                st.write("Procesando...")
-                result, processed_dataframes_dict = process_uploaded_files(files)
-                
-                if result is not None:
-                    st.success("Procesamiento completado exitosamente.")
-                    
-                    # Guardar el archivo CSV para descarga
-                    csv_filename = "reporte_procesado.csv"
-                    result.to_csv(csv_filename, index=False)
-                    
-                    # Guardar el archivo Excel para descarga
-                    excel_filename = "archivos_procesados.xlsx"
-                    # Names of your datasets, modify this according to your actual names
-                    with pd.ExcelWriter(excel_filename) as writer:
-                        result.to_excel(writer, sheet_name='Result', index=False)
-                
-                        for sheet_name, df in processed_dataframes_dict.items():
-                            df.to_excel(writer, sheet_name=sheet_name, index=False)
-
-                    # Botón de descarga para el archivo Excel
-                    with open(excel_filename, "rb") as f:
-                        st.download_button(
-                            label="Descargar archivos procesados",
-                            data=f,
-                            file_name="archivos_procesados.xlsx",
-                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                        )
-                    st.session_state.processed = True
-                
-            except Exception as e:
-                st.error(f"Error procesando los datos: {e}")
+            id_trabajo = process_uploaded_files(ingesta, cola, backend, presupuesto_memoria, vista_previa)
+            if id_trabajo is not None:
+                st.session_state.trabajo = id_trabajo
         else:
             st.warning("Por favor, sube todos los archivos antes de procesar.")
 
+    # El trabajo de la sesión sigue en la cola aunque la página se recargue (p. ej. al descargar)
+    if st.session_state.get('trabajo'):
+        mostrar_trabajo(cola, st.session_state.trabajo)
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,70 +1,389 @@
+import argparse
+import json
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
 import pandas as pd
-from data_processing import process_data
-from utilities.process_dataframes import process_MCBE, validate_and_create_comodin_columns
+from utilities.esquemas import validar_y_convertir
+from utilities.ingesta import cargar_reporte
+from utilities.linaje_columnas import PERFILES_REPORTE
+from utilities.resumenes import HOJAS_RESUMEN
+from utilities.transporte_arrow import TransporteArrow, recibir_varios
 import time
 
+# Nombre de archivo esperado dentro de cada carpeta mensual, en el orden de process_uploaded_files
+ARCHIVOS_PERIODO = {
+    "ME5A": "ME5A SOLPEDS.xlsx",
+    "ZMM621": "ZMM621 FECHA APROBACION.xlsx",
+    "IW38": "IW38.xlsx",
+    "ME2N": "ME2N OC.xlsx",
+    "ZMB52": "ZMB52 STOCK.xlsx",
+    "MCBE": "MCBE.xlsx",
+    "criticos": "CRITICOS.xlsx",
+    "inmovilizados": "INMOVILIZADOS.xlsx",
+    "tipos_cambio": "Tasas de cambio.xlsx",
+}
+
+# Tablas de referencia comunes a todos los periodos de un lote
+ARCHIVOS_COMPARTIDOS = ("criticos", "tipos_cambio")
+
+# Claves de ARCHIVOS_PERIODO que process_data reutiliza ya procesadas (utilities.datos_referencia)
+ARCHIVOS_REFERENCIA = ("criticos", "inmovilizados", "tipos_cambio")
+
 class Timer:
     def __init__(self, message):
         self.message = message
-        
+
     def __enter__(self):
         self.start = time.time()
         return self
-        
+
     def __exit__(self, *args):
         self.end = time.time()
-        elapsed_time = self.end - self.start
-        print(f"{self.message}: {elapsed_time:.2f} seconds")
+        self.elapsed_time = self.end - self.start
+        print(f"{self.message}: {self.elapsed_time:.2f} seconds")
+
+def cargar_archivo(key, file):
+    """
+    Lee un archivo de un periodo y aplica el preprocesamiento propio de su reporte
+    (ver utilities.ingesta.cargar_reporte).
 
-def process_uploaded_files(files):
+    Parámetros:
+    - key (str): Clave del reporte en ARCHIVOS_PERIODO.
+    - file (str): Ruta del archivo.
+
+    Retorna:
+    - DataFrame listo para process_data.
+
+    Lanza ErrorDeEsquema si el archivo no cumple el esquema de su reporte (utilities.esquemas).
+    """
+    df, _ = cargar_reporte(key, file)
+    return df
+
+def process_uploaded_files(files, compartidos=None, backend='pandas', presupuesto_memoria=False, perfil='completo',
+                           instantaneas_stock=None, fecha_stock=None, versiones_compartidos=None):
+    """
+    Carga y procesa los nueve archivos de un periodo.
+
+    Parámetros:
+    - files (list): Rutas en el orden de ARCHIVOS_PERIODO.
+    - compartidos (dict): DataFrames ya cargados para las claves de ARCHIVOS_COMPARTIDOS;
+      sustituyen a la ruta correspondiente de files.
+    - backend (str): Backend de process_data.
+    - presupuesto_memoria (bool): Modo de presupuesto de memoria de process_data.
+    - perfil (str): Perfil de reporte de process_data (ver utilities.linaje_columnas).
+    - instantaneas_stock (str): Carpeta de instantáneas de stock (utilities.stock); None no las guarda.
+    - fecha_stock (str): Fecha o etiqueta de la instantánea de stock (por defecto, hoy).
+    - versiones_compartidos (dict): Versión de cada tabla de `compartidos` (ver version_de_archivo).
+    """
+    compartidos = compartidos or {}
     dfs = {}
-    
+
     # Load DataFrames
     with Timer("Loading data"):
-        dfs["ME5A"] = pd.read_excel(files[0])
-        dfs["ZMM621"] = pd.read_excel(files[1])
-        dfs["IW38"] = pd.read_excel(files[2])
-        dfs["ME2N"] = pd.read_excel(files[3])
-        dfs["ZMB52"] = pd.read_excel(files[4])
-        dfs["MCBE"] = process_MCBE(pd.read_excel(files[5]))
-        dfs["criticos"] = pd.read_excel(files[6])
-        dfs["inmovilizados"] = pd.read_excel(files[7])
-        dfs["tipos_cambio"] = pd.read_excel(files[8])
+        for key, file in zip(ARCHIVOS_PERIODO, files):
+            if key in compartidos:
+                # Sin copia: process_data no modifica sus entradas
+                dfs[key] = compartidos[key]
+            else:
+                dfs[key] = cargar_archivo(key, file)
+
+    # La instantánea de stock y los datos de referencia se reconocen por el tamaño y la fecha de su
+    # archivo, sin recorrer las tablas (las tablas sin versión se comparan por contenido)
+    from utilities.stock import version_de_archivo
+    versiones = dict(versiones_compartidos or {})
+    for key, file in zip(ARCHIVOS_PERIODO, files):
+        if key not in compartidos and isinstance(file, str) and os.path.exists(file):
+            versiones[key] = version_de_archivo(file)
+    versiones_referencia = {key: versiones[key] for key in ARCHIVOS_REFERENCIA if key in versiones}
 
     # Process DataFrames
     with Timer("Processing data"):
-        keys = list(dfs.keys())
-        for key in keys:
-            df = dfs[key]
-            if key in ["ME5A", "ZMM621", "ME2N"]:
-                dfs[f"{key}_ComodinCreated"], _ = validate_and_create_comodin_columns(df, f"df_{key}")
-        result, processed_dataframes = process_data(dfs["ME5A_ComodinCreated"], dfs["ZMM621_ComodinCreated"], dfs["IW38"], dfs["ME2N_ComodinCreated"], dfs["ZMB52"], dfs["MCBE"], dfs["criticos"], dfs["inmovilizados"], dfs["tipos_cambio"])
-    
+        result, processed_dataframes = procesar_dataframes(dfs, backend, presupuesto_memoria, perfil, instantaneas_stock,
+                                                           fecha_stock, versiones.get("ZMB52"), versiones_referencia)
+
     return result, processed_dataframes
 
-def main(files):
-    result, processed_dataframes_dict = process_uploaded_files(files)
-    
-    output_path = "resultado.xlsx"
+def procesar_dataframes(dfs, backend='pandas', presupuesto_memoria=False, perfil='completo', instantaneas_stock=None,
+                        fecha_stock=None, version_stock=None, versiones_referencia=None):
+    """
+    Ejecuta process_data sobre los DataFrames cargados con cargar_archivo, por clave de ARCHIVOS_PERIODO.
+    En modo presupuesto_memoria los DataFrames se retiran de dfs para que process_data pueda liberarlos.
+    CRITICOS, INMOVILIZADOS y tipos de cambio se reutilizan ya procesados entre llamadas del mismo
+    proceso (utilities.datos_referencia), p. ej. en la vigilancia de carpeta o en los workers del lote.
+    """
+    # Importaciones diferidas: el pipeline solo se carga al procesar (python -m utilities validar/exportar no lo usa)
+    from data_processing import process_data
+    from utilities.datos_referencia import REGISTRO_REFERENCIA
+
+    tomar = dfs.pop if presupuesto_memoria else dfs.__getitem__
+    return process_data(tomar("ME5A"), tomar("ZMM621"), tomar("IW38"), tomar("ME2N"), tomar("ZMB52"), tomar("MCBE"),
+                        tomar("criticos"), tomar("inmovilizados"), tomar("tipos_cambio"), backend=backend,
+                        presupuesto_memoria=presupuesto_memoria, perfil=perfil,
+                        registro_referencia=REGISTRO_REFERENCIA, instantaneas_stock=instantaneas_stock,
+                        fecha_stock=fecha_stock, version_stock=version_stock,
+                        versiones_referencia=versiones_referencia)
+
+def guardar_resultado(result, processed_dataframes_dict, output_path):
+    """Escribe el reporte y los DataFrames procesados en un libro Excel."""
     with pd.ExcelWriter(output_path) as writer:
         result.to_excel(writer, sheet_name='Result', index=False)
-        
+
         for sheet_name, df in processed_dataframes_dict.items():
             df.to_excel(writer, sheet_name=sheet_name, index=False)
 
+def publicar_en_sheets(result, processed_dataframes_dict, id_libro, credenciales, archivo_huellas=None):
+    """
+    Publica el reporte ('Result') y las hojas de resumen en un libro de Google Sheets
+    (utilities.publicador_sheets). Al volver a publicar solo se envían los bloques que cambiaron.
+    """
+    from utilities.publicador_sheets import ClienteSheetsGspread, PublicadorSheets
+
+    hojas = {'Result': result}
+    hojas.update({nombre: processed_dataframes_dict[nombre] for nombre in HOJAS_RESUMEN
+                  if nombre in processed_dataframes_dict})
+    publicador = PublicadorSheets(ClienteSheetsGspread(id_libro, credenciales), archivo_huellas=archivo_huellas)
+    with Timer("Publishing to Google Sheets"):
+        resumen = publicador.publicar(hojas)
+    print(resumen.to_string(index=False))
+    return resumen
+
+def main(files, backend='pandas', presupuesto_memoria=False, perfil='completo', instantaneas_stock=None,
+         sheets=None):
+    result, processed_dataframes_dict = process_uploaded_files(files, backend=backend,
+                                                               presupuesto_memoria=presupuesto_memoria,
+                                                               perfil=perfil, instantaneas_stock=instantaneas_stock)
+
+    output_path = "resultado.xlsx"
+    guardar_resultado(result, processed_dataframes_dict, output_path)
+
     print(f"El archivo se ha guardado en {output_path}")
 
+    if sheets:
+        publicar_en_sheets(result, processed_dataframes_dict, **sheets)
+
+def comparar_resultados(ruta_anterior, ruta_actual, output_path="diferencias.xlsx"):
+    """
+    Compara la hoja 'Result' de dos libros de salida (por ejemplo, el del mes anterior y el actual)
+    y escribe las hojas de utilities.diferencias en un libro Excel.
+    """
+    from utilities.diferencias import comparar_reportes
+
+    with Timer("Reading reports"):
+        anterior = pd.read_excel(ruta_anterior, sheet_name='Result')
+        actual = pd.read_excel(ruta_actual, sheet_name='Result')
+    with Timer("Comparing reports"):
+        diferencia = comparar_reportes(anterior, actual)
+    with pd.ExcelWriter(output_path) as writer:
+        for sheet_name, df in diferencia.hojas().items():
+            df.to_excel(writer, sheet_name=sheet_name, index=False)
+    print(f"Las diferencias se han guardado en {output_path}")
+    return diferencia
+
+# -------------------------
+# Ejecución por lotes (varios periodos)
+# -------------------------
+def rutas_de_carpeta(carpeta):
+    """Rutas de los archivos de un periodo dentro de su carpeta mensual."""
+    return {key: os.path.join(carpeta, nombre) for key, nombre in ARCHIVOS_PERIODO.items()}
+
+def descubrir_periodos(directorio):
+    """
+    Lista las carpetas mensuales de un directorio. Cada subcarpeta con al menos el archivo ME5A
+    es un periodo, identificado por el nombre de la carpeta.
+    """
+    periodos = {}
+    for nombre in sorted(os.listdir(directorio)):
+        carpeta = os.path.join(directorio, nombre)
+        if os.path.isdir(carpeta) and os.path.exists(os.path.join(carpeta, ARCHIVOS_PERIODO["ME5A"])):
+            periodos[nombre] = rutas_de_carpeta(carpeta)
+    return periodos
+
+def leer_manifiesto(ruta_manifiesto):
+    """
+    Lee un manifiesto JSON de lote:
+
+        {"compartidos": {"criticos": "...", "tipos_cambio": "..."},
+         "periodos": {"Agosto": "../Agosto", "Setiembre": {"ME5A": "...", ...}}}
+
+    Un periodo puede darse como carpeta (con los nombres de ARCHIVOS_PERIODO) o como
+    diccionario de rutas; las rutas relativas se resuelven desde la carpeta del manifiesto.
+
+    Retorna:
+    - dict: Rutas por periodo.
+    - dict: Rutas de las tablas compartidas.
+    """
+    base = os.path.dirname(os.path.abspath(ruta_manifiesto))
+    with open(ruta_manifiesto, encoding='utf-8') as f:
+        manifiesto = json.load(f)
+
+    def _resolver(ruta):
+        return ruta if os.path.isabs(ruta) else os.path.join(base, ruta)
+
+    periodos = {}
+    for periodo, entrada in manifiesto.get("periodos", {}).items():
+        if isinstance(entrada, str):
+            periodos[periodo] = rutas_de_carpeta(_resolver(entrada))
+        else:
+            periodos[periodo] = {key: _resolver(ruta) for key, ruta in entrada.items()}
+    compartidos = {key: _resolver(ruta) for key, ruta in manifiesto.get("compartidos", {}).items()}
+    return periodos, compartidos
+
+# Tablas compartidas del lote, cargadas una sola vez por proceso del pool, y sus versiones
+_COMPARTIDOS = {}
+_VERSIONES_COMPARTIDOS = {}
+
+def _inicializar_worker(compartidos, versiones=None):
+    _COMPARTIDOS.update(recibir_varios(compartidos))
+    _VERSIONES_COMPARTIDOS.update(versiones or {})
+
+def _procesar_periodo(periodo, rutas, directorio_salida, backend, presupuesto_memoria=False, perfil='completo',
+                      instantaneas_stock=None):
+    """Procesa un periodo dentro de un worker y devuelve su fila del resumen."""
+    inicio = time.time()
+    fila = {"periodo": periodo, "estado": "OK", "segundos": 0.0, "archivo_salida": "", "error": ""}
+    try:
+        files = [rutas.get(key) for key in ARCHIVOS_PERIODO]
+        faltantes = [key for key, ruta in zip(ARCHIVOS_PERIODO, files)
+                     if key not in _COMPARTIDOS and (ruta is None or not os.path.exists(ruta))]
+        if faltantes:
+            raise FileNotFoundError(f"Faltan archivos del periodo {periodo}: {faltantes}")
+
+        # La instantánea de stock de cada periodo se guarda con el nombre del periodo
+        result, processed_dataframes_dict = process_uploaded_files(files, _COMPARTIDOS, backend, presupuesto_memoria, perfil,
+                                                                   instantaneas_stock, periodo, _VERSIONES_COMPARTIDOS)
+        output_path = os.path.join(directorio_salida, f"resultado_{periodo}.xlsx")
+        guardar_resultado(result, processed_dataframes_dict, output_path)
+        fila["archivo_salida"] = output_path
+    except Exception as e:
+        fila["estado"] = "ERROR"
+        fila["error"] = f"{type(e).__name__}: {e}"
+        traceback.print_exc()
+    fila["segundos"] = round(time.time() - inicio, 2)
+    return fila
+
+def procesar_lote(periodos, rutas_compartidas=None, directorio_salida=".", procesos=None, backend='pandas',
+                  presupuesto_memoria=False, perfil='completo', instantaneas_stock=None):
+    """
+    Procesa varios periodos en paralelo con un pool de procesos.
+
+    Las tablas de ARCHIVOS_COMPARTIDOS se leen una sola vez (desde rutas_compartidas o, si no se
+    indican, desde el primer periodo) y se entregan a cada worker al iniciarse; las grandes, como
+    archivos Arrow en memoria compartida (utilities.transporte_arrow) en lugar de pickle.
+
+    Parámetros:
+    - periodos (dict): Rutas por periodo (ver descubrir_periodos / leer_manifiesto).
+    - rutas_compartidas (dict): Rutas de CRITICOS y tipos de cambio comunes al lote.
+    - directorio_salida (str): Carpeta donde se escriben resultado_<periodo>.xlsx y resumen_lote.csv.
+    - procesos (int): Tamaño del pool (por defecto, número de CPUs).
+    - backend (str): Backend de process_data.
+    - presupuesto_memoria (bool): Modo de presupuesto de memoria de process_data en cada periodo.
+    - perfil (str): Perfil de reporte de process_data en cada periodo.
+    - instantaneas_stock (str): Carpeta donde se guarda el stock agregado de cada periodo (utilities.stock).
+
+    Retorna:
+    - DataFrame: Resumen con estado, tiempo y archivo de salida por periodo.
+    """
+    os.makedirs(directorio_salida, exist_ok=True)
+    rutas_compartidas = dict(rutas_compartidas or {})
+    if periodos:
+        primero = next(iter(periodos.values()))
+        for key in ARCHIVOS_COMPARTIDOS:
+            if key not in rutas_compartidas and primero.get(key) and os.path.exists(primero[key]):
+                rutas_compartidas[key] = primero[key]
+
+    from utilities.stock import version_de_archivo
+    with Timer("Loading shared reference tables"):
+        compartidos = {key: validar_y_convertir(pd.read_excel(ruta), key) for key, ruta in rutas_compartidas.items()}
+        versiones_compartidos = {key: version_de_archivo(ruta) for key, ruta in rutas_compartidas.items()}
+
+    filas = []
+    with Timer(f"Processing {len(periodos)} periods"):
+        with TransporteArrow() as transporte, ProcessPoolExecutor(
+                max_workers=procesos, initializer=_inicializar_worker,
+                initargs=(transporte.enviar_varios(compartidos), versiones_compartidos)) as pool:
+            futuros = [pool.submit(_procesar_periodo, periodo, rutas, directorio_salida, backend, presupuesto_memoria,
+                                   perfil, instantaneas_stock)
+                       for periodo, rutas in periodos.items()]
+            for futuro in as_completed(futuros):
+                fila = futuro.result()
+                print(f"[{fila['estado']}] {fila['periodo']}: {fila['segundos']:.2f} seconds {fila['error']}")
+                filas.append(fila)
+
+    resumen = pd.DataFrame(filas, columns=["periodo", "estado", "segundos", "archivo_salida", "error"])
+    resumen = resumen.sort_values("periodo").reset_index(drop=True)
+    ruta_resumen = os.path.join(directorio_salida, "resumen_lote.csv")
+    resumen.to_csv(ruta_resumen, index=False)
+    print(f"Resumen del lote guardado en {ruta_resumen}: "
+          f"{(resumen['estado'] == 'OK').sum()} OK, {(resumen['estado'] != 'OK').sum()} con error")
+    return resumen
+
+def parse_args(argv=None):
+    from utilities.backends import backends_disponibles
+
+    parser = argparse.ArgumentParser(description="Procesamiento sin Streamlit de uno o varios periodos.")
+    origen = parser.add_mutually_exclusive_group()
+    origen.add_argument("--periodos", help="Directorio con una subcarpeta por periodo mensual.")
+    origen.add_argument("--manifiesto", help="Manifiesto JSON con las rutas de cada periodo.")
+    origen.add_argument("--comparar", nargs=2, metavar=("ANTERIOR", "ACTUAL"),
+                        help="Compara la hoja Result de dos libros de salida y escribe diferencias.xlsx en --salida.")
+    parser.add_argument("--salida", default=".", help="Carpeta de salida del lote.")
+    parser.add_argument("--procesos", type=int, default=None, help="Número de procesos del pool.")
+    parser.add_argument("--criticos", help="Archivo CRITICOS común a todos los periodos.")
+    parser.add_argument("--tipos-cambio", help="Archivo de tipos de cambio común a todos los periodos.")
+    parser.add_argument("--backend", default="pandas", choices=backends_disponibles(),
+                        help="Backend de procesamiento (ver utilities.backends).")
+    parser.add_argument("--presupuesto-memoria", action="store_true",
+                        help="Reduce tipos numéricos y guarda las hojas intermedias en disco (máquinas con poca memoria).")
+    parser.add_argument("--perfil", default="completo", choices=list(PERFILES_REPORTE),
+                        help="Perfil del reporte: solo se unen y calculan las columnas que incluye.")
+    parser.add_argument("--instantaneas-stock",
+                        help="Carpeta donde se guarda el stock ZMB52 agregado por fecha (o por periodo en lotes).")
+    parser.add_argument("--sheets-id", help="Libro de Google Sheets donde se publican el reporte y los resúmenes.")
+    parser.add_argument("--sheets-credenciales", help="JSON de la cuenta de servicio con acceso al libro.")
+    parser.add_argument("--sheets-huellas", default="huellas_sheets.json",
+                        help="Archivo con las huellas de la última publicación (solo se reenvía lo que cambia).")
+    args = parser.parse_args(argv)
+    # La publicación en Sheets es de un solo reporte: en lote cada periodo sobrescribiría al anterior en el libro
+    if (args.sheets_id or args.sheets_credenciales) and (args.periodos or args.manifiesto or args.comparar):
+        parser.error("--sheets-id/--sheets-credenciales solo se admiten al procesar un periodo, "
+                     "no con --periodos, --manifiesto ni --comparar.")
+    if bool(args.sheets_id) != bool(args.sheets_credenciales):
+        parser.error("--sheets-id y --sheets-credenciales se indican juntos.")
+    return args
+
 
 if __name__ == "__main__":
-    files = [
-        "../Agosto/ME5A SOLPEDS.xlsx",
-        "../Agosto/ZMM621 FECHA APROBACION.xlsx",
-        "../Agosto/IW38.xlsx",
-        "../Agosto/ME2N OC.xlsx",
-        "../Agosto/ZMB52 STOCK.xlsx",
-        "../Agosto/MCBE.xlsx",
-        "../Agosto/CRITICOS.xlsx",
-        "../Agosto/INMOVILIZADOS.xlsx",  
-        "../Agosto/Tasas de cambio.xlsx",
-    ]
-    main(files)
\ No newline at end of file
+    args = parse_args()
+    if args.comparar:
+        os.makedirs(args.salida, exist_ok=True)
+        comparar_resultados(*args.comparar, os.path.join(args.salida, "diferencias.xlsx"))
+    elif args.periodos or args.manifiesto:
+        if args.manifiesto:
+            periodos, rutas_compartidas = leer_manifiesto(args.manifiesto)
+        else:
+            periodos, rutas_compartidas = descubrir_periodos(args.periodos), {}
+        if args.criticos:
+            rutas_compartidas["criticos"] = args.criticos
+        if args.tipos_cambio:
+            rutas_compartidas["tipos_cambio"] = args.tipos_cambio
+        procesar_lote(periodos, rutas_compartidas, args.salida, args.procesos, args.backend, args.presupuesto_memoria,
+                      args.perfil, args.instantaneas_stock)
+    else:
+        files = [
+            "../Agosto/ME5A SOLPEDS.xlsx",
+            "../Agosto/ZMM621 FECHA APROBACION.xlsx",
+            "../Agosto/IW38.xlsx",
+            "../Agosto/ME2N OC.xlsx",
+            "../Agosto/ZMB52 STOCK.xlsx",
+            "../Agosto/MCBE.xlsx",
+            "../Agosto/CRITICOS.xlsx",
+            "../Agosto/INMOVILIZADOS.xlsx",
+            "../Agosto/Tasas de cambio.xlsx",
+        ]
+        sheets = None
+        if args.sheets_id:
+            sheets = {"id_libro": args.sheets_id, "credenciales": args.sheets_credenciales,
+                      "archivo_huellas": args.sheets_huellas}
+        main(files, args.backend, args.presupuesto_memoria, args.perfil, args.instantaneas_stock, sheets)
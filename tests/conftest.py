@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def generar_reportes(n=400, seed=0):
+    """Reportes SAP sintéticos y pequeños con la forma de los de un periodo (CRITICOS y tipos de cambio incluidos)."""
+    rng = np.random.default_rng(seed)
+    mats = [1000000 + i for i in range(60)]
+    solic = ['emanchegom', 'MLAGUNAR', 'ypandiap', 'CTICSER', 'JPACCOC', 'ARADOPP', 'MMELGARN', 'XYZ']
+
+    def con_nulos(arr, p):
+        arr = np.array(arr, dtype=object)
+        arr[rng.random(len(arr)) < p] = np.nan
+        return arr
+
+    sol = rng.integers(10000000, 10000000 + n // 2, n).astype(float)
+    mat = con_nulos(rng.choice(mats, n), 0.2)
+    pos = rng.integers(1, 5, n) * 10
+    ped = con_nulos(rng.integers(45000000, 45000000 + n // 3, n).astype(float), 0.3)
+    pospd = rng.integers(1, 5, n) * 10
+    fechas = pd.to_datetime('2023-01-01') + pd.to_timedelta(rng.integers(0, 240, n), unit='D')
+    me5a = pd.DataFrame({
+        'Solicitud de pedido': sol,
+        'Material': mat,
+        'Pos.solicitud pedido': pos,
+        'Posición de pedido': pospd,
+        'Pedido': ped,
+        'Solicitante': rng.choice(solic, n),
+        'Indicador de borrado': rng.choice(['True', np.nan], n),
+        'Indicador de Liberación': rng.choice(['X', ''], n),
+        'Fecha de solicitud': con_nulos(fechas, 0.05),
+        'Unidad de medida': rng.choice(['UN', 'KG'], n),
+        'Cantidad solicitada': rng.integers(1, 50, n),
+        'Texto breve': rng.choice([f'DESC {i}' for i in range(40)], n),
+    })
+
+    me5a = me5a.drop_duplicates(subset=['Solicitud de pedido', 'Material', 'Pos.solicitud pedido']).reset_index(drop=True)
+    n = len(me5a)
+    # ZMM621 rows mirroring OC keys
+    idx = rng.choice(n, n // 2)
+    z = pd.DataFrame({
+        'Nro Pedido': me5a['Pedido'].values[idx],
+        'Material': me5a['Material'].values[idx],
+        'Pos. Pedido': me5a['Posición de pedido'].values[idx],
+        'Numero de orden': con_nulos(rng.integers(2000000, 2000050, len(idx)), 0.3),
+        'Fecha de registro.1': con_nulos(fechas[idx], 0.3),
+        'Fecha contable': con_nulos(fechas[idx] + pd.Timedelta(days=5), 0.3),
+        'Fecha Doc. Fact.': con_nulos(fechas[idx] + pd.Timedelta(days=7), 0.4),
+        'Solicitante de la solicitud pedido': rng.choice(solic, len(idx)),
+        'Condición de pago del pedido': rng.choice(['P030', 'P060'], len(idx)),
+        'Fecha de aprobación de la orden de compr': con_nulos(fechas[idx] + pd.Timedelta(days=3), 0.3),
+        'Valor net. Solped': rng.random(len(idx)) * 1000,
+        'Numero de activo': rng.choice(['', 'A1'], len(idx)),
+    })
+    z['Nro Pedido'] = z['Nro Pedido'].fillna(0)
+    z['Pos. Pedido'] = z['Pos. Pedido'].astype(int)
+
+    iw38 = pd.DataFrame({
+        'Orden': [2000000 + i for i in range(50)],
+        'Pto.tbjo.responsable': rng.choice(['MEC', 'ELE', 'INS'], 50),
+        'Denominación de la ubicación técnica': rng.choice(['UT1', 'UT2'], 50),
+        'Denominación de objeto técnico': rng.choice(['OT1', 'OT2'], 50),
+        'Equipo': rng.integers(1, 100, 50),
+    })
+
+    idx2 = rng.choice(n, int(n * 0.6), replace=False)
+    m2 = len(idx2)
+    me2n = pd.DataFrame({
+        'Documento compras': me5a['Pedido'].values[idx2],
+        'Material': me5a['Material'].values[idx2],
+        'Posición': me5a['Posición de pedido'].values[idx2],
+        'Solicitante': rng.choice(solic, m2),
+        'Proveedor/Centro suministrador': rng.choice(['PROV1', 'PROV2'], m2),
+        'Estado liberación': rng.choice(['', 'X', 'XX'], m2),
+        'Indicador de borrado': rng.choice(['L', np.nan], m2),
+        'Fecha documento': con_nulos(fechas[idx2] + pd.Timedelta(days=10), 0.1),
+        'Por entregar (cantidad)': rng.integers(0, 3, m2),
+        'Cantidad de pedido': rng.integers(1, 10, m2),
+        'Precio neto': np.round(rng.random(m2) * 500, 2),
+        'Moneda': rng.choice(['PEN', 'USD', 'EUR'], m2),
+        'Por entregar (valor)': rng.random(m2) * 100,
+        'Ind.liberación': rng.choice(['R', 'B'], m2),
+        'Estrategia liberac.': rng.choice([0, 1, 2], m2),
+    })
+    me2n = me2n.drop_duplicates(subset=['Documento compras', 'Material', 'Posición'])
+    me2n['Documento compras'] = me2n['Documento compras'].fillna(0)
+    me2n['Posición'] = me2n['Posición'].astype(int)
+
+    zmb52 = pd.DataFrame({
+        'Material': rng.choice(mats, 200),
+        'Valor libre util.': rng.random(200) * 100,
+        'Libre utilización': rng.integers(0, 5, 200),
+    })
+
+    mcbe_hdr = ['x', 'Material', 'Últ.salida', 'Últ.cons.', ' Últ.mov.']
+    mcbe_rows = [['a'] * 5, mcbe_hdr, ['b'] * 5, ['c'] * 5]
+    for m in mats[:40]:
+        mcbe_rows.append(['', m, pd.Timestamp('2022-01-01'), pd.Timestamp('2022-02-01'), pd.Timestamp('2022-03-01')])
+    mcbe_raw = pd.DataFrame(mcbe_rows, columns=['Unnamed: 0', 'Unnamed: 1', 'Unnamed: 2', 'Unnamed: 3', 'Unnamed: 4'])
+
+    criticos = pd.DataFrame({'Código SAP.': mats[::4], 'Descripción': 'x'})
+
+    inm_cols = ['Material', 'Descripcion', 'Valor stock', 'Moneda', 'Stock', 'AREA', 'PEDIDO POR',
+                'RESPONSABLE', 'OBSERVACIONES', 'Und', 'Últ.entr.', ' Últ.mov.', 'Tipo de Repuesto', 'Extra']
+    rows = [['junk'] * len(inm_cols), inm_cols]
+    for i, m in enumerate(mats[:45]):
+        rows.append([m, f'D{i}', float(rng.random() * 1000), 'USD', int(rng.integers(1, 9)), 'A', 'P', 'R', '', 'UN',
+                     pd.Timestamp('2021-01-01'), pd.Timestamp('2023-01-01') - pd.Timedelta(days=int(rng.integers(0, 1500))),
+                     rng.choice(['CRITICO', 'NO CRITICO']), 'e'])
+    inm_raw = pd.DataFrame(rows, columns=[f'Unnamed: {i}' for i in range(len(inm_cols))])
+
+    tc = pd.DataFrame([(y, m, 3.7 + m / 100, 0.9 + m / 1000) for y in (2022, 2023) for m in range(1, 13)],
+                      columns=['Año', 'Mes', 'Tipo_Cambio_PEN', 'Tipo_Cambio_EUR'])
+    return dict(ME5A=me5a, ZMM621=z, IW38=iw38, ME2N=me2n, ZMB52=zmb52, MCBE_raw=mcbe_raw,
+                CRITICOS=criticos, INMOVILIZADOS=inm_raw, tipos_cambio=tc)
+
+
+def entradas_process_data(reportes):
+    """Argumentos de process_data por nombre, con ME5A, ZMM621, ME2N y MCBE preparados como en la ingesta."""
+    from utilities.process_dataframes import process_MCBE, validate_and_create_comodin_columns
+
+    return {
+        'df_ME5A': validate_and_create_comodin_columns(reportes['ME5A'], 'df_ME5A')[0],
+        'df_ZMM621_fechaAprobacion': validate_and_create_comodin_columns(reportes['ZMM621'], 'df_ZMM621')[0],
+        'df_IW38': reportes['IW38'],
+        'df_ME2N_OC': validate_and_create_comodin_columns(reportes['ME2N'], 'df_ME2N')[0],
+        'df_ZMB52': reportes['ZMB52'],
+        'df_MCBE': process_MCBE(reportes['MCBE_raw']),
+        'df_criticos': reportes['CRITICOS'],
+        'df_inmovilizados': reportes['INMOVILIZADOS'],
+        'df_tipos_cambio': reportes['tipos_cambio'],
+    }
+
+
+@pytest.fixture
+def reportes():
+    return generar_reportes()
+
+
+@pytest.fixture
+def entradas(reportes):
+    return entradas_process_data(reportes)
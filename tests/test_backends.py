@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from mainSINSTREAMLIT import parse_args as parse_args_lote
+from utilities.__main__ import parse_args as parse_args_utilities
+from utilities.backends import left_join_polars, verificar_paridad
+from utilities.merge_dataframes import left_join
+
+pytest.importorskip("polars")
+
+
+def _izquierda():
+    return pd.DataFrame({
+        'Material': ['100', '101', np.nan, '103', '101', 104],
+        'Cantidad': [1, 2, 3, 4, 5, 6],
+        'Moneda': ['PEN', 'USD', 'PEN', 'EUR', 'USD', 'PEN'],
+    })
+
+
+def _derecha():
+    return pd.DataFrame({
+        'Material': ['101', '100', '101', np.nan, '104', 104],
+        'Precio': [10.0, 20.0, 30.0, 40.0, 50.0, 60.0],
+        'Moneda': ['USD', 'PEN', 'USD', 'PEN', 'EUR', 'PEN'],
+        'Proveedor': ['A', 'B', 'C', 'D', 'E', 'F'],
+    })
+
+
+@pytest.mark.parametrize("columnas", [['Precio'], ['Precio', 'Proveedor'], ['Precio', 'Moneda']])
+def test_left_join_polars_igual_a_pandas(columnas):
+    esperado = left_join(_izquierda(), _derecha(), 'Material', columnas)
+    obtenido = left_join_polars(_izquierda(), _derecha(), 'Material', columnas)
+
+    pd.testing.assert_frame_equal(obtenido, esperado)
+
+
+def test_left_join_polars_sin_duplicados_conserva_las_filas():
+    derecha = _derecha().drop_duplicates('Material', keep='first')
+    esperado = left_join(_izquierda(), derecha, 'Material', ['Precio'])
+    obtenido = left_join_polars(_izquierda(), derecha, 'Material', ['Precio'])
+
+    assert len(obtenido) == len(_izquierda())
+    pd.testing.assert_frame_equal(obtenido, esperado)
+
+
+def test_reporte_final_igual_con_ambos_backends(entradas):
+    assert verificar_paridad(entradas, backend='polars-join', referencia='pandas') == []
+
+
+@pytest.mark.parametrize("parse_args", [
+    parse_args_lote,
+    lambda argv: parse_args_utilities(['procesar'] + argv),
+])
+def test_backend_desconocido_se_rechaza_al_leer_argumentos(parse_args, capsys):
+    with pytest.raises(SystemExit):
+        parse_args(["--backend", "polars"])
+    assert "polars-join" in capsys.readouterr().err
+    assert parse_args(["--backend", "polars-join"]).backend == "polars-join"
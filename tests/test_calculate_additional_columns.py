@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+from utilities.calculate_additional_columns import costoComprasPorRetirar, precio_unitario_reciente
+
+
+def _precio_como_antes(df):
+    """Implementación original: ordenar por clave y fecha descendente, quedarse con la primera y unir."""
+    filtrado = df[['Descripcion Material', 'Fecha de OC', 'Precio Convertido Dolares', 'Cantidad de pedido']].copy()
+    filtrado = filtrado.sort_values(by=['Descripcion Material', 'Fecha de OC'], ascending=[True, False])
+    filtrado['Precio Unitario'] = filtrado['Precio Convertido Dolares'] / filtrado['Cantidad de pedido']
+    recientes = filtrado.drop_duplicates(subset='Descripcion Material', keep='first')
+    unido = pd.merge(df[['Descripcion Material']], recientes[['Descripcion Material', 'Precio Unitario']],
+                     on='Descripcion Material', how='left')
+    return unido['Precio Unitario'].to_numpy()
+
+
+def _compras():
+    d = pd.Timestamp
+    return pd.DataFrame({
+        'Descripcion Material': ['EMPATE', 'EMPATE', 'EMPATE', 'SIN PRECIO', 'SIN PRECIO', 'SIN FECHA', 'SIN FECHA',
+                                 np.nan, np.nan, 'UNICO'],
+        'Fecha de OC': [d('2023-03-01'), d('2023-05-01'), d('2023-05-01'), d('2023-01-01'), d('2023-02-01'),
+                        pd.NaT, pd.NaT, d('2023-01-01'), d('2023-04-01'), pd.NaT],
+        'Precio Convertido Dolares': [10.0, 40.0, 90.0, 30.0, np.nan, 8.0, 6.0, 5.0, 7.0, 12.0],
+        'Cantidad de pedido': [1, 2, 3, 3, 1, 2, 3, 1, 1, 4],
+    })
+
+
+def test_precio_unitario_reciente_igual_que_ordenar_y_unir():
+    df = _compras()
+
+    precios = precio_unitario_reciente(df)
+
+    np.testing.assert_array_equal(precios, _precio_como_antes(df))
+    # Empate en la fecha más reciente: gana la primera fila; sin precio en la más reciente: NaN
+    assert precios[0] == 20.0
+    assert np.isnan(precios[3]) and np.isnan(precios[4])
+    # Grupo sin fechas: su primera fila; clave nula: un grupo propio
+    assert precios[5] == 4.0 and precios[7] == 7.0 and precios[9] == 3.0
+
+
+def test_costo_compras_por_retirar_es_numerico_con_nan_fuera_de_compra_por_retirar():
+    df = _compras().assign(**{'TIPO COMPROMETIDO SUGERENCIA': ['COMPRA POR RETIRAR', ''] * 5,
+                              'Libre utilización': [2] * 10})
+
+    df = costoComprasPorRetirar(df)
+
+    assert pd.api.types.is_float_dtype(df['Costo compras por retirar'])
+    assert df['Costo compras por retirar'].iloc[0] == 40.0
+    assert df['Costo compras por retirar'].iloc[1::2].isna().all()
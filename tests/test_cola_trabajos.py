@@ -0,0 +1,61 @@
+import gc
+import tracemalloc
+import weakref
+
+import pytest
+
+from conftest import entradas_process_data, generar_reportes
+from utilities import calculate_additional_columns as cac_util
+from utilities.cola_trabajos import CLAVES_PROCESO, _ejecutar_trabajo
+
+ENTRADAS_LIBERABLES = ["ME5A", "ZMM621", "IW38", "ME2N", "ZMB52", "MCBE", "INMOVILIZADOS"]
+
+
+def _dfs_trabajo(n=400, seed=0):
+    entradas = entradas_process_data(generar_reportes(n, seed))
+    return dict(zip(CLAVES_PROCESO, entradas.values()))
+
+
+def _al_calcular_columnas(monkeypatch, revisar):
+    """Ejecuta `revisar` al empezar calculate_additional_columns (las entradas ya no se usan desde ahí)."""
+    calcular = cac_util.calculate_additional_columns
+    def calcular_y_revisar(*args, **kwargs):
+        gc.collect()
+        revisar()
+        return calcular(*args, **kwargs)
+    monkeypatch.setattr(cac_util, "calculate_additional_columns", calcular_y_revisar)
+
+
+@pytest.mark.parametrize("presupuesto_memoria", [False, True])
+def test_trabajo_suelta_las_entradas_con_presupuesto_memoria(presupuesto_memoria, monkeypatch, tmp_path):
+    dfs = _dfs_trabajo()
+    referencias = {clave: weakref.ref(dfs[clave]) for clave in ENTRADAS_LIBERABLES}
+    vivas = []
+    _al_calcular_columnas(monkeypatch, lambda: vivas.extend(clave for clave, referencia in referencias.items()
+                                                            if referencia() is not None))
+
+    salidas = _ejecutar_trabajo(dfs, {'presupuesto_memoria': presupuesto_memoria,
+                                      'directorio_temporal': str(tmp_path)}, str(tmp_path))
+
+    assert salidas['filas'] > 0 and dfs == {}
+    assert vivas == ([] if presupuesto_memoria else ENTRADAS_LIBERABLES)
+
+
+def test_presupuesto_memoria_reduce_la_memoria_del_trabajo(monkeypatch, tmp_path):
+    retenida = {}
+    for presupuesto_memoria in (False, True):
+        dfs = _dfs_trabajo(n=3000)
+        def medir():
+            # Memoria asignada desde que se recibió el trabajo (negativa si se soltaron entradas)
+            retenida[presupuesto_memoria] = tracemalloc.get_traced_memory()[0] - base
+            tracemalloc.stop()
+        _al_calcular_columnas(monkeypatch, medir)
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+        try:
+            _ejecutar_trabajo(dfs, {'presupuesto_memoria': presupuesto_memoria,
+                                    'directorio_temporal': str(tmp_path)}, str(tmp_path))
+        finally:
+            tracemalloc.stop()
+
+    assert retenida[True] < retenida[False] * 0.8
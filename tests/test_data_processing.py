@@ -0,0 +1,64 @@
+import contextlib
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_processing as dp
+from conftest import entradas_process_data, generar_reportes
+
+
+@pytest.mark.parametrize('opciones', [{}, {'copy_on_write': True}, {'presupuesto_memoria': True}],
+                         ids=['por_defecto', 'copy_on_write', 'presupuesto_memoria'])
+def test_process_data_no_modifica_las_entradas(entradas, tmp_path, opciones):
+    originales = {nombre: df.copy(deep=True) for nombre, df in entradas.items()}
+    if opciones.get('presupuesto_memoria'):
+        opciones = dict(opciones, directorio_temporal=str(tmp_path))
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        dp.process_data(**entradas, **opciones)
+
+    for nombre, df in entradas.items():
+        pd.testing.assert_frame_equal(df, originales[nombre], obj=nombre)
+
+
+def _nulos_como_nan(df):
+    """Nulos de texto como NaN: según la columna, el transporte Arrow devuelve NaN o conserva None (ver leer_tabla)."""
+    df = df.copy()
+    for col in df.columns[df.dtypes == object]:
+        df[col] = df[col].where(df[col].notna(), np.nan)
+    return df
+
+
+@pytest.mark.parametrize('ejecutor', ['hilos', 'procesos'])
+def test_process_data_plantas_igual_que_process_data_por_planta(ejecutor):
+    comunes = generar_reportes(seed=0)
+    plantas = {}
+    for semilla in (1, 2):
+        reportes = generar_reportes(seed=semilla)
+        plantas[f'P{semilla}'] = {clave: reportes[clave] for clave in dp.REPORTES_PLANTA}
+        plantas[f'P{semilla}'].update(MCBE=reportes['MCBE_raw'])
+    plantas['P2']['INMOVILIZADOS'] = generar_reportes(seed=3)['INMOVILIZADOS']
+    for paquete in plantas.values():
+        entradas = entradas_process_data({**comunes, **paquete, 'MCBE_raw': paquete['MCBE']})
+        paquete.update(ME5A=entradas['df_ME5A'], ZMM621=entradas['df_ZMM621_fechaAprobacion'],
+                       ME2N=entradas['df_ME2N_OC'], MCBE=entradas['df_MCBE'])
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        consolidado, _, por_planta = dp.process_data_plantas(
+            plantas, comunes['IW38'], None, comunes['CRITICOS'], comunes['INMOVILIZADOS'], comunes['tipos_cambio'],
+            ejecutor=ejecutor, resumenes=False)
+
+    for planta, paquete in plantas.items():
+        with contextlib.redirect_stdout(io.StringIO()):
+            esperado, _ = dp.process_data(paquete['ME5A'], paquete['ZMM621'], comunes['IW38'], paquete['ME2N'],
+                                          paquete['ZMB52'], paquete['MCBE'], comunes['CRITICOS'],
+                                          paquete.get('INMOVILIZADOS', comunes['INMOVILIZADOS']),
+                                          comunes['tipos_cambio'], resumenes=False)
+        obtenido = por_planta[planta][0]
+        de_la_planta = consolidado[consolidado['Planta'] == planta].drop(columns='Planta').reset_index(drop=True)
+        if ejecutor == 'procesos':
+            esperado, obtenido, de_la_planta = map(_nulos_como_nan, (esperado, obtenido, de_la_planta))
+        pd.testing.assert_frame_equal(obtenido, esperado)
+        pd.testing.assert_frame_equal(de_la_planta, esperado, check_dtype=False)
@@ -0,0 +1,67 @@
+import pandas as pd
+
+from data_processing import process_data
+from utilities.datos_referencia import RegistroReferencia
+
+
+def _copia(entradas):
+    return {clave: df.copy() for clave, df in entradas.items()}
+
+
+def test_registro_reutiliza_las_formas_procesadas(entradas, capsys):
+    registro = RegistroReferencia()
+    primero, _ = process_data(**_copia(entradas), registro_referencia=registro)
+    capsys.readouterr()
+    segundo, _ = process_data(**_copia(entradas), registro_referencia=registro)
+
+    assert "Referencia" not in capsys.readouterr().out
+    pd.testing.assert_frame_equal(primero, segundo)
+    assert registro.estado().set_index('Dato')['Usos'].to_dict() == {'criticos': 2, 'inmovilizados': 2, 'tipos_cambio': 2}
+
+
+def test_vista_previa_no_reemplaza_inmovilizados_completo(entradas, capsys):
+    registro = RegistroReferencia()
+    process_data(**_copia(entradas), registro_referencia=registro)
+    version = registro.estado().set_index('Dato').loc['inmovilizados', 'Versión']
+
+    con_registro, _ = process_data(**_copia(entradas), registro_referencia=registro, muestra=0.5)
+    sin_registro, _ = process_data(**_copia(entradas), muestra=0.5)
+    capsys.readouterr()
+    process_data(**_copia(entradas), registro_referencia=registro)
+
+    assert registro.estado().set_index('Dato').loc['inmovilizados', 'Versión'] == version
+    assert "Referencia 'inmovilizados' procesada" not in capsys.readouterr().out
+    pd.testing.assert_frame_equal(con_registro, sin_registro)
+
+
+def _sin_recorrer_tablas(monkeypatch):
+    def version_de_datos(df):
+        raise AssertionError("se recorrió una tabla de referencia para versionarla")
+    monkeypatch.setattr("utilities.datos_referencia.version_de_datos", version_de_datos)
+
+
+def test_versiones_dadas_evitan_recorrer_las_tablas(entradas, monkeypatch, capsys):
+    registro = RegistroReferencia()
+    versiones = {'criticos': 'c1', 'inmovilizados': 'i1', 'tipos_cambio': 't1'}
+    esperado, _ = process_data(**_copia(entradas))
+    _sin_recorrer_tablas(monkeypatch)
+
+    primero, _ = process_data(**_copia(entradas), registro_referencia=registro, versiones_referencia=versiones)
+    capsys.readouterr()
+    segundo, _ = process_data(**_copia(entradas), registro_referencia=registro, versiones_referencia=versiones)
+
+    assert "Referencia" not in capsys.readouterr().out
+    pd.testing.assert_frame_equal(primero, esperado)
+    pd.testing.assert_frame_equal(segundo, esperado)
+    assert registro.estado().set_index('Dato')['Versión'].to_dict()['criticos'] == 'c1'
+
+
+def test_trabajo_de_la_cola_usa_las_huellas_como_version(entradas, monkeypatch, tmp_path):
+    from utilities.cola_trabajos import CLAVES_PROCESO, _ejecutar_trabajo
+
+    monkeypatch.setattr("utilities.datos_referencia.REGISTRO_REFERENCIA", RegistroReferencia())
+    _sin_recorrer_tablas(monkeypatch)
+    dfs = dict(zip(CLAVES_PROCESO, _copia(entradas).values()))
+    huellas = {clave: f"sha-{clave}" for clave in CLAVES_PROCESO}
+
+    assert _ejecutar_trabajo(dfs, {}, str(tmp_path), huellas)['filas'] > 0
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+from utilities.diferencias import AGREGADA, ELIMINADA, MODIFICADA, comparar_reportes
+
+
+def _reporte(filas):
+    return pd.DataFrame(filas, columns=['COMODIN SOLPED', 'COMODIN OC', 'Estado factura', 'Precio neto',
+                                        'DEMORA EN GENERAR OC (DIAS)'])
+
+
+ANTERIOR = _reporte([
+    ['s1', 'o1', 'PENDIENTE', 10.0, 5],
+    ['s2', 'o2', 'PENDIENTE', 20.0, 5],
+    ['s3', 'o3', 'FACTURADO', 30.0, 5],
+    ['s4', 'o4', np.nan, 40.0, 5],
+    ['s4', 'o4', np.nan, 41.0, 5],
+])
+ACTUAL = _reporte([
+    ['s1', 'o1', 'PENDIENTE', 10.0, 9],
+    ['s2', 'o2', 'FACTURADO', 25.0, 9],
+    ['s4', 'o4', np.nan, 40.0, 9],
+    ['s4', 'o4', 'FACTURADO', 41.0, 9],
+    ['s5', 'o5', 'PENDIENTE', 50.0, 9],
+])
+
+
+def test_registros_agregados_eliminados_y_modificados():
+    filas = comparar_reportes(ANTERIOR, ACTUAL).filas
+
+    por_cambio = {cambio: list(grupo['COMODIN SOLPED']) for cambio, grupo in filas.groupby('Cambio')}
+    assert por_cambio == {AGREGADA: ['s5'], ELIMINADA: ['s3'], MODIFICADA: ['s2', 's4']}
+    # DEMORA depende de la fecha de hoy y no cuenta como cambio
+    modificadas = filas[filas['Cambio'] == MODIFICADA]['Columnas modificadas'].tolist()
+    assert modificadas == ['Estado factura, Precio neto', 'Estado factura']
+
+
+def test_detalle_y_transiciones_por_celda():
+    diferencia = comparar_reportes(ANTERIOR, ACTUAL)
+
+    detalle = diferencia.detalle
+    assert detalle[['COMODIN SOLPED', 'Columna']].values.tolist() == [
+        ['s2', 'Estado factura'], ['s2', 'Precio neto'], ['s4', 'Estado factura']]
+    assert detalle['Valor actual'].tolist() == ['FACTURADO', 25.0, 'FACTURADO']
+    transiciones = diferencia.transiciones().set_index(['Valor anterior', 'Valor actual'])['Registros']
+    assert transiciones.to_dict() == {('PENDIENTE', 'FACTURADO'): 1, ('nan', 'FACTURADO'): 1}
+    assert set(diferencia.hojas()) == {'DIF_RESUMEN', 'DIF_TRANSICIONES', 'DIF_REGISTROS', 'DIF_DETALLE'}
+
+
+def test_tipos_distintos_entre_reportes_no_son_cambios():
+    actual = ANTERIOR.astype({'Precio neto': object})
+    actual['Precio neto'] = actual['Precio neto'].map(str)
+
+    assert comparar_reportes(ANTERIOR, ANTERIOR.astype({'Precio neto': 'float32'})).filas.empty
+    # Número y texto se comparan como texto: 10.0 y '10.0' son el mismo valor
+    assert comparar_reportes(ANTERIOR, actual).filas.empty
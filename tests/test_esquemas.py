@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utilities.esquemas import ErrorDeEsquema, validar_reportes, validar_y_convertir
+from utilities.process_dataframes import generate_hash_id, validate_and_create_comodin_columns
+
+
+def test_reporte_sin_esquema_lanza_keyerror(reportes):
+    with pytest.raises(KeyError, match="ME5B"):
+        validar_y_convertir(reportes['ME5A'], 'ME5B')
+    with pytest.raises(KeyError):
+        validar_reportes({'ME5A': reportes['ME5A'], 'ZMM62': reportes['ZMM621']})
+
+
+@pytest.mark.parametrize("nombre, base", [('ZMM621_fechaAprobacion', 'ZMM621'), ('df_ZMM621_fechaAprobacion', 'ZMM621'),
+                                          ('ME2N_OC', 'ME2N'), ('df_ME2N_OC', 'ME2N')])
+def test_reportes_derivados_se_validan_con_su_esquema(reportes, nombre, base):
+    sin_columna = reportes[base].drop(columns=['Material'])
+    with pytest.raises(ErrorDeEsquema, match="falta la columna 'Material'"):
+        validar_y_convertir(sin_columna, nombre)
+
+
+def test_solped_abierta_sin_posicion_de_pedido_es_valida(reportes):
+    me5a = reportes['ME5A'].copy()
+    me5a['Posición de pedido'] = me5a['Posición de pedido'].astype(float)
+    me5a.loc[:4, ['Pedido', 'Posición de pedido']] = np.nan
+
+    convertido = validar_y_convertir(me5a, 'ME5A')
+
+    assert convertido['Posición de pedido'].iloc[:5].isna().all()
+    assert convertido['Posición de pedido'].iloc[5:].map(type).eq(int).all()
+
+
+def test_llave_oc_igual_en_me5a_y_me2n_con_posiciones_vacias():
+    me5a = pd.DataFrame({
+        'Solicitud de pedido': [1.0, 2.0], 'Material': ['100', '101'], 'Pos.solicitud pedido': [10, 10],
+        'Posición de pedido': [10.0, np.nan], 'Pedido': [4500.0, np.nan], 'Solicitante': ['a', 'b'],
+        'Indicador de borrado': [np.nan, np.nan], 'Indicador liberación': ['X', 'X'],
+        'Fecha de solicitud': pd.to_datetime(['2024-01-01', '2024-01-02']), 'Unidad de medida': ['UN', 'UN'],
+        'Cantidad solicitada': [1, 2], 'Texto breve': ['x', 'y'],
+    })
+
+    convertido, _ = validate_and_create_comodin_columns(me5a, 'df_ME5A')
+
+    assert convertido.loc[0, 'COMODIN OC'] == generate_hash_id(4500.0, '100', 10)
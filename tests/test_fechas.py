@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+from utilities.fechas import FECHAS_VACIAS_SAP, ORIGEN_EXCEL, parsear_fechas
+
+
+def test_seriales_de_excel_como_numero_o_texto():
+    serie = pd.Series([45000, 45000.5, '45001', np.nan], dtype=object)
+
+    fechas = parsear_fechas(serie)
+
+    assert list(fechas[:3]) == [ORIGEN_EXCEL + pd.Timedelta(days=45000), ORIGEN_EXCEL + pd.Timedelta(days=45000.5),
+                                pd.Timestamp('2023-03-16')]
+    assert pd.isna(fechas[3])
+
+
+def test_fechas_vacias_sap_quedan_nat_sin_aviso(capsys):
+    serie = pd.Series(FECHAS_VACIAS_SAP + [' 01.02.2023 ', '', None])
+
+    fechas = parsear_fechas(serie, 'prueba_vacias')
+
+    assert fechas.isna().tolist() == [True] * len(FECHAS_VACIAS_SAP) + [False, True, True]
+    assert fechas[len(FECHAS_VACIAS_SAP)] == pd.Timestamp('2023-02-01')
+    assert 'Precaución' not in capsys.readouterr().out
+
+
+def test_formato_mixto_despues_de_la_muestra_no_se_pierde(capsys):
+    dias = pd.date_range('2023-01-01', periods=60)
+    serie = pd.Series(list(dias.strftime('%d.%m.%Y')) + ['2023-07-15', '16/07/2023'])
+
+    fechas = parsear_fechas(serie)
+
+    assert fechas.notna().all()
+    assert list(fechas[:60]) == list(dias)
+    assert list(fechas[60:]) == [pd.Timestamp('2023-07-15'), pd.Timestamp('2023-07-16')]
+    assert 'Precaución' not in capsys.readouterr().out
+
+
+def test_textos_no_interpretables_se_avisan(capsys):
+    serie = pd.Series(['01.02.2023', 'sin fecha', '03.02.2023'], name='Fecha documento')
+
+    fechas = parsear_fechas(serie)
+
+    assert fechas.isna().tolist() == [False, True, False]
+    assert '1 textos de la columna Fecha documento' in capsys.readouterr().out
+
+
+def test_columna_de_fechas_reales_con_nulos():
+    serie = pd.Series([pd.Timestamp('2023-01-01'), np.nan, pd.Timestamp('2023-02-01').to_pydatetime()], dtype=object)
+
+    fechas = parsear_fechas(serie, 'prueba_reales')
+
+    assert fechas.dtype == 'datetime64[ns]'
+    assert fechas.isna().tolist() == [False, True, False]
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+from utilities.indice_registros import IndiceRegistros, normalizar_llaves
+
+
+def _reporte():
+    return pd.DataFrame({
+        'Material': ['0001234', '001', '12', '0001299', 1234, np.nan, ' 00012a '],
+        'Pedido': [4500012345.0, np.nan, 4500012346.0, 4500012345.0, np.nan, 12.0, 2.0],
+    })
+
+
+def test_normalizar_llaves_conserva_ceros_y_enteros_grandes():
+    assert normalizar_llaves(['0001234', '001', None, 'nan']).tolist() == ['0001234', '001', '', '']
+    assert normalizar_llaves(np.array([4500012345.0, np.nan, 2.5])).tolist() == ['4500012345', '', '2.5']
+    assert normalizar_llaves([2**60 + 1, 'x']).tolist() == [str(2**60 + 1), 'X']
+
+
+def test_busqueda_exacta_distingue_llaves_con_ceros():
+    indice = IndiceRegistros.desde_reporte(_reporte())
+
+    assert indice.buscar('Material', '0001234').tolist() == [0]
+    assert indice.buscar('Material', 1234).tolist() == [4]
+    assert indice.buscar('Material', '001').tolist() == [1]
+    assert indice.buscar('Pedido', 4500012345).tolist() == [0, 3]
+    assert indice.buscar('Pedido', '4500012345').tolist() == [0, 3]
+
+
+def test_busqueda_por_prefijo_con_ceros():
+    indice = IndiceRegistros.desde_reporte(_reporte())
+
+    assert indice.buscar_prefijo('Material', '00012').tolist() == [0, 3, 6]
+    assert indice.buscar_prefijo('Material', '000123').tolist() == [0]
+    assert indice.buscar_prefijo('Material', '12').tolist() == [2, 4]
+    assert indice.buscar_prefijo('Material', '00012', limite=2).tolist() == [0, 3]
+
+
+def test_guardar_y_cargar(tmp_path):
+    reporte = _reporte()
+    ruta = str(tmp_path / "indice.npz")
+    IndiceRegistros.desde_reporte(reporte).guardar(ruta)
+
+    indice = IndiceRegistros.cargar(ruta, reporte)
+    assert indice.buscar_prefijo('Material', '00012').tolist() == [0, 3, 6]
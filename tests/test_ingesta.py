@@ -0,0 +1,84 @@
+import gc
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+from utilities.ingesta import IngestaEnSegundoPlano
+
+
+class _Lector:
+    """cargar de prueba: lee el texto del archivo y espera a `liberar` antes de terminar."""
+    def __init__(self):
+        self.empezo = threading.Event()
+        self.liberar = threading.Event()
+        self.leidos = []
+
+    def __call__(self, clave, contenido):
+        self.empezo.set()
+        self.liberar.wait(5)
+        texto = contenido.read().decode()
+        self.leidos.append(texto)
+        return pd.DataFrame({'texto': [texto]}), ""
+
+
+@pytest.fixture
+def pool():
+    pool = ThreadPoolExecutor(max_workers=1)
+    yield pool
+    pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _archivo(tmp_path, nombre, texto):
+    ruta = tmp_path / nombre
+    ruta.write_text(texto)
+    return str(ruta)
+
+
+def test_cerrar_no_apaga_el_pool_compartido(pool, tmp_path):
+    lector = _Lector()
+    ingesta = IngestaEnSegundoPlano(cargar=lector, pool=pool)
+    ingesta.enviar('ME5A', _archivo(tmp_path, "a.xlsx", "a"))
+    lector.empezo.wait(5)
+    ingesta.enviar('IW38', _archivo(tmp_path, "b.xlsx", "b"))
+    futuro_b = ingesta.tareas['IW38'].futuro
+
+    ingesta.cerrar()
+    lector.liberar.set()
+
+    assert ingesta.tareas == {} and futuro_b.cancelled()
+    assert pool.submit(lambda: 1).result(5) == 1
+
+
+def test_reemplazar_un_archivo_descarta_la_lectura_anterior(pool, tmp_path):
+    lector = _Lector()
+    ingesta = IngestaEnSegundoPlano(cargar=lector, pool=pool)
+    ingesta.enviar('ME5A', _archivo(tmp_path, "bloqueo.xlsx", "bloqueo"))
+    lector.empezo.wait(5)
+    ingesta.enviar('IW38', _archivo(tmp_path, "v1.xlsx", "v1"))
+    anterior = ingesta.tareas['IW38'].futuro
+
+    ingesta.enviar('IW38', _archivo(tmp_path, "v2.xlsx", "v2"))
+    lector.liberar.set()
+
+    assert anterior.cancelled()
+    assert ingesta.resultados(['IW38'], timeout=5)['IW38']['texto'].tolist() == ['v2']
+    assert 'v1' not in lector.leidos
+
+
+def test_descartar_la_ingesta_cancela_sus_lecturas_pendientes(pool, tmp_path):
+    lector = _Lector()
+    ingesta = IngestaEnSegundoPlano(cargar=lector, pool=pool)
+    ingesta.enviar('ME5A', _archivo(tmp_path, "a.xlsx", "a"))
+    lector.empezo.wait(5)
+    ingesta.enviar('IW38', _archivo(tmp_path, "b.xlsx", "b"))
+    pendiente = ingesta.tareas['IW38'].futuro
+
+    del ingesta
+    gc.collect()
+    lector.liberar.set()
+
+    assert pendiente.cancelled()
+    pool.shutdown(wait=True)
+    assert lector.leidos == ['a']
@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+
+from utilities.lectura import leer_MCBE, leer_inmovilizados
+from utilities.process_dataframes import COLUMNAS_INMOVILIZADOS
+
+
+def _hoja(tmp_path, filas, nombre):
+    ruta = tmp_path / nombre
+    pd.DataFrame(filas).to_excel(ruta, header=False, index=False)
+    return str(ruta)
+
+
+def test_inmovilizados_con_fila_en_blanco_conserva_materiales_enteros(tmp_path):
+    datos = [[1000 + i] + [f"v{i}"] * (len(COLUMNAS_INMOVILIZADOS) - 1) for i in range(4)]
+    datos.insert(2, [np.nan] * len(COLUMNAS_INMOVILIZADOS))
+    ruta = _hoja(tmp_path, [["Reporte de inmovilizados"] + [None] * (len(COLUMNAS_INMOVILIZADOS) - 1),
+                            COLUMNAS_INMOVILIZADOS] + datos, "INMOVILIZADOS.xlsx")
+
+    df = leer_inmovilizados(ruta)
+
+    assert list(df.columns) == COLUMNAS_INMOVILIZADOS
+    assert df['Material'].dtype == object
+    assert df['Material'].dropna().astype(str).tolist() == ['1000', '1001', '1002', '1003']
+
+
+def test_mcbe_con_fila_de_totales_conserva_materiales_enteros(tmp_path):
+    encabezado = [None, 'Material', 'Últ.salida', 'Últ.cons.', ' Últ.mov.']
+    ruta = _hoja(tmp_path, [[None] * 5, encabezado, [None] * 5, [None] * 5,
+                            [None, 2000, 1, 2, 3], [None, 2001, 4, 5, 6], [None, None, 5, 7, 9]], "MCBE.xlsx")
+
+    df = leer_MCBE(ruta)
+
+    assert list(df.columns) == encabezado[1:]
+    assert df['Material'].dtype == object
+    assert df['Material'].dropna().astype(str).tolist() == ['2000', '2001']
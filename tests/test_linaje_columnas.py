@@ -0,0 +1,64 @@
+import contextlib
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_processing as dp
+from conftest import entradas_process_data
+from utilities.linaje_columnas import PERFILES_REPORTE, ensamblar_reporte, resolver_linaje
+
+
+def _procesar(entradas, **opciones):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return dp.process_data(**entradas, resumenes=False, **opciones)[0]
+
+
+@pytest.mark.parametrize('perfil', [perfil for perfil in PERFILES_REPORTE if perfil != 'completo'])
+def test_perfil_igual_a_las_columnas_del_reporte_completo(reportes, perfil):
+    completo = _procesar(entradas_process_data(reportes))
+    reducido = _procesar(entradas_process_data(reportes), perfil=perfil)
+
+    assert list(reducido.columns) == PERFILES_REPORTE[perfil]
+    pd.testing.assert_frame_equal(reducido, completo[PERFILES_REPORTE[perfil]])
+
+
+def test_lista_de_columnas_como_perfil(entradas):
+    reporte = _procesar(entradas, perfil=['Material', 'Costo compras por retirar'])
+
+    assert list(reporte.columns) == ['Material', 'Costo compras por retirar']
+
+
+def test_linaje_solo_pide_las_uniones_necesarias():
+    linaje = resolver_linaje('liberaciones')
+
+    assert not {'IW38', 'MCBE', 'inmovilizados', 'criticos'} & set(linaje['uniones'])
+    # 'Libre utilización' (ZMB52) entra por TIPO COMPROMETIDO SUGERENCIA
+    assert linaje['uniones']['ZMB52'] == ['Libre utilización']
+    assert 'Estrategia liberac.' in linaje['uniones']['ME2N_OC']
+    # Columnas intermedias de las calculadas, aunque no salgan en el reporte
+    assert 'TIPO COMPROMETIDO SUGERENCIA' in linaje['requeridas']
+    # Los dos indicadores de borrado se piden juntos
+    assert {'Indicador de borrado SOLPED', 'Indicador de borrado Orden de Compra'} <= linaje['requeridas']
+
+
+def test_linaje_de_la_clave_de_costo():
+    assert 'Texto breve' in resolver_linaje('costos')['uniones']['ME5A']
+    assert 'Texto breve' not in resolver_linaje(['Costo compras por retirar'], clave_costo='Material')['uniones']['ME5A']
+
+
+def test_perfil_o_columna_desconocidos():
+    with pytest.raises(ValueError, match='Perfil de reporte desconocido'):
+        resolver_linaje('otro')
+    with pytest.raises(ValueError, match='sin linaje conocido'):
+        resolver_linaje(['Material', 'No existe'])
+
+
+def test_ensamblar_reporte_no_copia_las_columnas():
+    datos = pd.DataFrame({'a': np.arange(5.0), 'b': np.arange(5), 'c': list('vwxyz')})
+
+    reporte = ensamblar_reporte(datos, ['c', 'a'])
+
+    assert list(reporte.columns) == ['c', 'a']
+    assert np.shares_memory(reporte['a'].to_numpy(), datos['a'].to_numpy())
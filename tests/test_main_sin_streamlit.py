@@ -0,0 +1,22 @@
+import pytest
+
+from mainSINSTREAMLIT import parse_args
+
+
+@pytest.mark.parametrize("origen", [["--periodos", "lote"], ["--manifiesto", "lote.json"],
+                                    ["--comparar", "julio.xlsx", "agosto.xlsx"]])
+def test_sheets_no_se_admite_en_lote_ni_al_comparar(origen, capsys):
+    with pytest.raises(SystemExit):
+        parse_args(origen + ["--sheets-id", "libro", "--sheets-credenciales", "cuenta.json"])
+    assert "--sheets-id" in capsys.readouterr().err
+
+
+def test_sheets_requiere_credenciales(capsys):
+    with pytest.raises(SystemExit):
+        parse_args(["--sheets-id", "libro"])
+    assert "juntos" in capsys.readouterr().err
+
+
+def test_sheets_en_un_periodo():
+    args = parse_args(["--sheets-id", "libro", "--sheets-credenciales", "cuenta.json"])
+    assert args.sheets_id == "libro" and args.sheets_huellas == "huellas_sheets.json"
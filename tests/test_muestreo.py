@@ -0,0 +1,52 @@
+import contextlib
+import io
+
+import pandas as pd
+import pytest
+
+import data_processing as dp
+from conftest import entradas_process_data
+from utilities.muestreo import HOJA_AVISO_MUESTRA, fraccion_de_muestra, muestrear_entradas
+
+# Dependen del precio de la OC más reciente, que en la muestra puede ser otra compra (ver aviso_muestra)
+COLUMNAS_QUE_PUEDEN_DIFERIR = ['Costo compras por retirar']
+
+
+def _procesar(entradas, **opciones):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return dp.process_data(**entradas, resumenes=False, **opciones)
+
+
+def test_fraccion_de_muestra():
+    assert fraccion_de_muestra(0.25, 400) == 0.25
+    assert fraccion_de_muestra(100, 400) == 0.25
+    assert fraccion_de_muestra(1000, 400) == 1.0
+    with pytest.raises(ValueError):
+        fraccion_de_muestra(0, 400)
+
+
+def test_muestra_por_llave_completa_y_repetible(entradas):
+    argumentos = [entradas[nombre] for nombre in ('df_ME5A', 'df_ZMM621_fechaAprobacion', 'df_IW38', 'df_ME2N_OC',
+                                                  'df_ZMB52', 'df_MCBE', 'df_inmovilizados')]
+
+    (me5a, *_), fraccion = muestrear_entradas(*argumentos, 0.3)
+    (otra, *_), _ = muestrear_entradas(*argumentos, 0.3)
+
+    assert fraccion == 0.3
+    assert 0 < len(me5a) < len(entradas['df_ME5A'])
+    assert me5a.index.equals(otra.index)
+    # Todas las filas de una llave entran juntas
+    llaves = entradas['df_ME5A']['COMODIN SOLPED']
+    assert llaves.isin(me5a['COMODIN SOLPED']).sum() == len(me5a)
+
+
+def test_vista_previa_igual_al_reporte_completo_en_sus_llaves(reportes):
+    completo, _ = _procesar(entradas_process_data(reportes))
+    previa, hojas = _procesar(entradas_process_data(reportes), muestra=0.3)
+
+    assert previa.attrs['muestra'] == 0.3
+    assert HOJA_AVISO_MUESTRA in hojas
+    assert 0 < len(previa) < len(completo)
+    esperado = completo[completo['COMODIN SOLPED'].isin(previa['COMODIN SOLPED'])]
+    columnas = [col for col in completo.columns if col not in COLUMNAS_QUE_PUEDEN_DIFERIR]
+    pd.testing.assert_frame_equal(previa[columnas].reset_index(drop=True), esperado[columnas].reset_index(drop=True))
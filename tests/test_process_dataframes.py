@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utilities.process_dataframes import (COLUMNAS_INMOVILIZADOS, CoincidenciaBuscadorFinal, inmovilizadosConverted,
+                                         tasa_inmovilizado)
+
+# Días en los bordes de cada tramo de tasa (180, 361 y 721) y a ambos lados
+DIAS_BORDE = [0, 179, 180, 181, 359, 360, 361, 362, 719, 720, 721, 722, 5000]
+
+
+def _tasa_por_fila(days):
+    """Regla original, aplicada fila a fila con .apply antes de vectorizarla."""
+    if 180 <= days <= 360:
+        return 0.5
+    elif 361 <= days <= 720:
+        return 0.6
+    elif days > 720:
+        return 1
+    return 0
+
+
+def _inmovilizados_crudos(dias, tipos):
+    """Reporte INMOVILIZADOS como llega de Excel: fila de título, encabezado y una columna extra."""
+    hoy = pd.Timestamp.now().normalize()
+    columnas = COLUMNAS_INMOVILIZADOS + ['Extra']
+    filas = [['Reporte'] * len(columnas), columnas]
+    for i, (dia, tipo) in enumerate(zip(dias, tipos)):
+        ultimo = np.nan if pd.isna(dia) else hoy - pd.Timedelta(days=dia)
+        fila = dict.fromkeys(columnas, 'x')
+        fila.update({'Material': 1000000 + i, 'Valor stock': 100.0 + i, 'Stock': 1, ' Últ.mov.': ultimo,
+                     'Tipo de Repuesto': tipo})
+        filas.append([fila[col] for col in columnas])
+    return pd.DataFrame(filas, columns=[f'Unnamed: {i}' for i in range(len(columnas))])
+
+
+def test_tasa_inmovilizado_coincide_con_la_regla_por_fila_en_los_bordes():
+    dias = DIAS_BORDE + [-3, np.nan]
+    esperado = [_tasa_por_fila(dia) for dia in dias]
+
+    assert list(tasa_inmovilizado(pd.Series(dias))) == esperado
+
+
+@pytest.mark.parametrize('tipo', ['NO CRITICO', 'CRITICO'])
+def test_inmovilizados_converted_coincide_con_las_reglas_por_fila(tipo):
+    dias = DIAS_BORDE + [np.nan]
+    crudo = _inmovilizados_crudos(dias, [tipo] * len(dias))
+    criticos = pd.DataFrame({'Código SAP.': [1000000 + len(dias) + 10]})
+
+    df = inmovilizadosConverted(crudo, criticos)
+
+    assert list(df['Dias Inmovilizados'].iloc[:-1]) == DIAS_BORDE
+    assert pd.isna(df['Dias Inmovilizados'].iloc[-1])
+    valor = df['Valor stock'].astype(float)
+    if tipo == 'NO CRITICO':
+        # La regla por fila se aplicaba solo a los NO CRITICO; los días nulos tenían tasa 0
+        tasas = [0 if pd.isna(dia) else _tasa_por_fila(dia) for dia in dias]
+        esperado = pd.Series(tasas) * valor
+    else:
+        esperado = pd.Series(np.nan, index=df.index)
+    pd.testing.assert_series_equal(df['Deducción'], esperado, check_dtype=False, check_names=False)
+    pd.testing.assert_series_equal(df['SALDO'], valor - esperado, check_names=False)
+    estado = ['inmovilizado' if not pd.isna(dia) and dia >= 180 else '' for dia in dias]
+    assert list(df['Estado Inmovilizado']) == estado
+
+
+def test_inmovilizados_converted_marca_criticos_segun_el_listado():
+    crudo = _inmovilizados_crudos([400, 400], ['NO CRITICO', 'NO CRITICO'])
+    criticos = pd.DataFrame({'Código SAP.': [1000001]})
+
+    df = inmovilizadosConverted(crudo, criticos)
+
+    assert list(df['Tipo de repuesto']) == ['NO CRITICO', 'CRITICO']
+    assert list(df['Estado Inmovilizado']) == ['inmovilizado', '']
+    assert df['Código SAP.'].isna().tolist() == [True, False]
+
+
+# Llaves de búsqueda con duplicados, nulos y enteros mezclados con textos
+BUSQUEDA = pd.DataFrame({'Código SAP.': [1000001, 1000002, 1000002, '1000003', np.nan, 'A-7', 1000005],
+                         'Descripcion': ['uno', 'dos', 'dos bis', 'tres', 'nulo', 'letra', 'cinco']})
+CONSULTA = pd.Series([1000002, '1000001', '1000003', 1000003, np.nan, 'A-7', 'a-7', 1000004, None, 1000002.0],
+                     dtype=object)
+
+
+def _como_antes(valores):
+    """Las llaves como las comparaba el merge original: todo convertido con astype(str)."""
+    return pd.Series(valores, dtype=object).astype(str).reset_index(drop=True)
+
+
+def test_coincidencias_contiene_y_etiquetar_igual_que_isin():
+    buscador = CoincidenciaBuscadorFinal.desde_busqueda(BUSQUEDA, 'Código SAP.')
+    esperado = _como_antes(CONSULTA).isin(_como_antes(BUSQUEDA['Código SAP.'])).to_numpy()
+
+    assert buscador.contiene(CONSULTA, 'Código SAP.').tolist() == esperado.tolist()
+    etiquetas = buscador.etiquetar(CONSULTA, 'Código SAP.', 'Critico')
+    assert etiquetas.tolist() == np.where(esperado, 'Critico', '').tolist()
+
+
+def test_coincidencias_obtener_usa_la_primera_fila_como_el_merge_sin_duplicados():
+    buscador = CoincidenciaBuscadorFinal.desde_busqueda(BUSQUEDA, 'Código SAP.')
+    busqueda = BUSQUEDA.assign(**{'Código SAP.': _como_antes(BUSQUEDA['Código SAP.'])})
+    busqueda = busqueda.drop_duplicates(subset='Código SAP.', keep='first')
+    esperado = pd.merge(pd.DataFrame({'Código SAP.': _como_antes(CONSULTA)}), busqueda, on='Código SAP.', how='left')
+
+    obtenidos = buscador.obtener(CONSULTA, 'Código SAP.', 'Descripcion')
+    assert pd.Series(obtenidos).equals(esperado['Descripcion'].rename(None))
+
+
+def test_buscar_coincidencia_igual_que_el_merge_original():
+    entrada = pd.DataFrame({'Material': CONSULTA, 'Otra': range(len(CONSULTA))})
+    original = entrada.copy()
+    buscador = CoincidenciaBuscadorFinal(entrada, BUSQUEDA, columna_verificacion='Código SAP.')
+
+    resultado = buscador.buscar_coincidencia('Material', 'Código SAP.', 'CRITICO', 'Tipo de repuesto', None)
+
+    # Merge original con la búsqueda ya sin duplicados (columna_verificacion)
+    busqueda = buscador.dataset_busqueda[['Código SAP.']].astype(str)
+    esperado = pd.merge(entrada.astype({'Material': str}), busqueda, left_on='Material', right_on='Código SAP.',
+                        how='left', indicator=True)
+    esperado['Tipo de repuesto'] = np.where(esperado['_merge'] == 'both', 'CRITICO', '')
+    esperado = esperado.drop(columns='_merge')
+    pd.testing.assert_frame_equal(resultado, esperado, check_dtype=False)
+    pd.testing.assert_frame_equal(entrada, original)
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utilities.publicador_sheets import ClienteSheetsMemoria, ErrorTransitorio, PublicadorSheets
+
+
+def _reporte(filas=25):
+    return pd.DataFrame({
+        'Material': [str(1000 + i) for i in range(filas)],
+        'Cantidad': np.arange(filas, dtype=float),
+        'Fecha': pd.date_range('2024-01-01', periods=filas, freq='D'),
+    })
+
+
+def _publicador(cliente, esperas=None, **kwargs):
+    return PublicadorSheets(cliente, filas_por_bloque=10,
+                            dormir=(esperas.append if esperas is not None else lambda _: None), **kwargs)
+
+
+def test_primera_publicacion_crea_la_hoja_antes_de_limpiarla():
+    cliente = ClienteSheetsMemoria()
+    _publicador(cliente).publicar({'Result': _reporte()})
+
+    operaciones = [llamada[0] for llamada in cliente.llamadas]
+    assert operaciones[:2] == ['asegurar_hoja', 'limpiar']
+    assert cliente.llamadas[0] == ('asegurar_hoja', 'Result', 26, 3)
+    resultado = cliente.como_dataframe('Result')
+    assert list(resultado.columns) == ['Material', 'Cantidad', 'Fecha']
+    assert resultado['Material'].tolist() == _reporte()['Material'].tolist()
+
+
+def test_bloques_se_agrupan_por_celdas_por_llamada():
+    cliente = ClienteSheetsMemoria()
+    # 3 bloques de datos de 10 x 3 celdas + encabezado: con 60 celdas por llamada caben dos rangos por llamada
+    resumen = _publicador(cliente, celdas_por_llamada=60).publicar({'Result': _reporte()})
+
+    escrituras = [llamada for llamada in cliente.llamadas if llamada[0] == 'escribir']
+    assert [rangos for _, rangos, _ in escrituras] == [2, 2]
+    assert resumen.loc[0, 'Llamadas'] == 2
+    assert resumen.loc[0, 'Bloques enviados'] == 3
+
+
+def test_errores_transitorios_se_reintentan_con_espera_creciente():
+    cliente = ClienteSheetsMemoria(fallos=2)
+    esperas = []
+    _publicador(cliente, esperas).publicar({'Result': _reporte()})
+
+    assert [llamada[0] for llamada in cliente.llamadas].count('error') == 2
+    assert len(esperas) == 2 and esperas[1] > esperas[0] / 2
+    assert len(cliente.como_dataframe('Result')) == 25
+
+
+def test_errores_transitorios_agotan_los_reintentos():
+    cliente = ClienteSheetsMemoria(fallos=10)
+    with pytest.raises(ErrorTransitorio):
+        _publicador(cliente, reintentos=2).publicar({'Result': _reporte()})
+
+
+def test_solo_se_reenvian_los_bloques_cambiados():
+    cliente = ClienteSheetsMemoria()
+    publicador = _publicador(cliente)
+    df = _reporte()
+    publicador.publicar({'Result': df})
+
+    cliente.llamadas.clear()
+    cambiado = df.copy()
+    cambiado.loc[12, 'Cantidad'] = -1.0
+    resumen = publicador.publicar({'Result': cambiado})
+
+    assert 'limpiar' not in [llamada[0] for llamada in cliente.llamadas]
+    assert resumen.loc[0, 'Bloques enviados'] == 1
+    assert resumen.loc[0, 'Celdas'] == 10 * 3
+    assert cliente.como_dataframe('Result')['Cantidad'].tolist() == cambiado['Cantidad'].tolist()
+
+    cliente.llamadas.clear()
+    resumen = publicador.publicar({'Result': cambiado})
+    assert resumen.loc[0, 'Bloques enviados'] == 0
+    assert 'escribir' not in [llamada[0] for llamada in cliente.llamadas]
+
+
+def test_filas_sobrantes_se_eliminan_al_publicar_menos_filas():
+    cliente = ClienteSheetsMemoria()
+    publicador = _publicador(cliente)
+    publicador.publicar({'Result': _reporte(25)})
+    publicador.publicar({'Result': _reporte(15)})
+
+    assert len(cliente.como_dataframe('Result')) == 15
@@ -0,0 +1,65 @@
+import contextlib
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_processing as dp
+from utilities.resumenes import (COLUMNA_PERIODO, HOJA_CUBO, HOJA_DEMORAS, HOJA_INDICADORES, SIN_DATO, agregar_cubo,
+                                 calcular_cubo, calcular_resumenes, filtrar_cubo)
+
+
+@pytest.fixture
+def reporte(entradas):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return dp.process_data(**entradas, resumenes=False)[0]
+
+
+def test_cubo_conserva_los_totales_del_reporte(reporte):
+    hojas = calcular_resumenes(reporte)
+    cubo = hojas[HOJA_CUBO]
+
+    assert cubo['Registros'].sum() == len(reporte)
+    assert cubo['Monto USD'].sum() == pytest.approx(pd.to_numeric(reporte['Precio Convertido Dolares']).sum())
+    assert cubo['Costo compras por retirar'].sum() == pytest.approx(reporte['Costo compras por retirar'].sum())
+    indicadores = hojas[HOJA_INDICADORES].set_index('Indicador')['Valor']
+    assert indicadores['Registros'] == len(reporte)
+
+
+def test_filtrar_y_agregar_el_cubo_igual_que_sobre_el_reporte(reporte):
+    cubo = calcular_cubo(reporte)
+    tipo = 'TIPO COMPROMETIDO SUGERENCIA'
+
+    filtrado_cubo = filtrar_cubo(cubo, {tipo: ['SERV. POR FINALIZAR', SIN_DATO], 'Estado factura': []})
+    por_solicitante = agregar_cubo(filtrado_cubo, 'Solicitante Corregido')
+
+    filtrado = reporte[reporte[tipo].isin(['SERV. POR FINALIZAR', ''])]
+    esperado = filtrado.groupby('Solicitante Corregido')['Precio Convertido Dolares'].sum()
+    pd.testing.assert_series_equal(por_solicitante['Monto USD'], esperado, check_names=False)
+    assert por_solicitante['Registros'].to_dict() == filtrado['Solicitante Corregido'].value_counts().to_dict()
+
+
+def test_demoras_con_los_percentiles_del_reporte(reporte):
+    demoras = calcular_resumenes(reporte)[HOJA_DEMORAS]
+    total = demoras[(demoras['Demora'] == 'DEMORA EN GENERAR OC (DIAS)') & (demoras['Grupo'] == 'TOTAL')].iloc[0]
+
+    dias = pd.to_numeric(reporte['DEMORA EN GENERAR OC (DIAS)'], errors='coerce').dropna().to_numpy(dtype=float)
+    assert total['Registros'] == len(dias)
+    assert total['P90'] == pytest.approx(np.quantile(dias, 0.9))
+
+
+def test_cubo_con_vacios_y_perfil_reducido():
+    reporte = pd.DataFrame({'Estado factura': ['FACTURADO', np.nan, '', 'FACTURADO'],
+                            'Fecha de OC': pd.to_datetime(['2023-01-05', '2023-01-20', None, '2023-02-01']),
+                            'Precio Convertido Dolares': [1.0, 2.0, 3.0, 4.0]})
+
+    cubo = calcular_cubo(reporte)
+
+    assert list(cubo.columns) == ['Estado factura', COLUMNA_PERIODO, 'Registros', 'Monto USD']
+    assert cubo.to_dict('records') == [
+        {'Estado factura': SIN_DATO, COLUMNA_PERIODO: SIN_DATO, 'Registros': 1, 'Monto USD': 3.0},
+        {'Estado factura': SIN_DATO, COLUMNA_PERIODO: '2023-01', 'Registros': 1, 'Monto USD': 2.0},
+        {'Estado factura': 'FACTURADO', COLUMNA_PERIODO: '2023-01', 'Registros': 1, 'Monto USD': 1.0},
+        {'Estado factura': 'FACTURADO', COLUMNA_PERIODO: '2023-02', 'Registros': 1, 'Monto USD': 4.0},
+    ]
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import utilities.stock as stock
+from utilities.process_dataframes import vectorized_process_material
+from utilities.stock import InstantaneasStock, agregar_stock, version_de_archivo
+
+
+def _zmb52():
+    return pd.DataFrame({
+        'Material': [1000, '1000', 1002, 'ABC', 1001, np.nan, 1002],
+        'Libre utilización': [1, 2, 3, 4, 5, 6, 7],
+        'Valor libre util.': [1.5, 2.5, 3.5, 4.5, 5.5, 6.5, 7.5],
+    })
+
+
+def test_agregar_stock_equivale_a_pivot_table():
+    df = _zmb52()
+    esperado = df.pivot_table(index='Material', values=['Libre utilización', 'Valor libre util.'], aggfunc='sum')
+    esperado = vectorized_process_material(esperado.reset_index(), ['Material'])
+    esperado = esperado.groupby('Material', sort=False, as_index=False).sum()
+
+    obtenido = agregar_stock(df)
+
+    assert obtenido['Material'].tolist() == ['1000', '1001', '1002', 'ABC']
+    pd.testing.assert_frame_equal(obtenido.set_index('Material').sort_index(),
+                                  esperado.set_index('Material').sort_index(), check_dtype=False)
+
+
+def test_instantanea_con_version_no_recorre_el_listado(tmp_path, monkeypatch):
+    def no_llamar(*args):
+        raise AssertionError("no debe recorrer el listado")
+
+    instantaneas = InstantaneasStock(str(tmp_path))
+    monkeypatch.setattr(stock, 'version_de_datos', no_llamar)
+    primero = instantaneas.obtener(_zmb52(), '2024-08', version='v1')
+
+    monkeypatch.setattr(stock, 'agregar_stock', no_llamar)
+    segundo = instantaneas.obtener(_zmb52(), '2024-08', version='v1')
+
+    pd.testing.assert_frame_equal(primero, segundo)
+    assert instantaneas.fechas() == ['2024-08']
+
+
+def test_instantanea_se_rehace_si_cambia_la_version(tmp_path):
+    instantaneas = InstantaneasStock(str(tmp_path))
+    instantaneas.obtener(_zmb52(), '2024-08', version='v1')
+    cambiado = _zmb52().assign(**{'Libre utilización': 0})
+
+    obtenido = instantaneas.obtener(cambiado, '2024-08', version='v2')
+
+    assert (obtenido['Libre utilización'] == 0).all()
+
+
+def test_version_de_archivo_cambia_con_el_contenido(tmp_path):
+    ruta = tmp_path / "ZMB52.xlsx"
+    ruta.write_bytes(b"uno")
+    antes = version_de_archivo(str(ruta))
+    ruta.write_bytes(b"uno y dos")
+
+    assert version_de_archivo(str(ruta)) != antes
+
+
+def test_historial_une_las_fechas(tmp_path):
+    instantaneas = InstantaneasStock(str(tmp_path))
+    instantaneas.obtener(_zmb52(), '2024-07', version='a')
+    instantaneas.obtener(_zmb52(), '2024-08', version='b')
+
+    historial = instantaneas.historial(['1000'])
+
+    assert historial['Fecha'].tolist() == ['2024-07', '2024-08']
+    assert historial.columns[0] == 'Fecha'
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+from utilities.tipos_cambio import ServicioTipoCambio
+
+MENSUAL = pd.DataFrame({'Año': [2023, 2023], 'Mes': [1, 2], 'Tipo_Cambio_PEN': [3.8, 3.9]})
+DIARIAS = pd.DataFrame({
+    'Fecha': ['2023-01-10', '2023-01-20', '2023-01-20', '2023-02-05', '2023-01-15'],
+    'Moneda': ['PEN', 'PEN', 'PEN', 'PEN', 'CLP'],
+    'Tipo de Cambio': [3.70, 3.71, 3.72, 3.75, 800.0],
+})
+
+
+def _tasas(fechas, monedas):
+    servicio = ServicioTipoCambio(MENSUAL, DIARIAS)
+    return servicio.tasas(pd.Series(pd.to_datetime(fechas)), pd.Series(monedas))
+
+
+def test_tasa_diaria_del_mismo_dia_y_ultima_publicada():
+    tasas = _tasas(['2023-01-10', '2023-01-20', '2023-01-25', '2023-02-05'], ['PEN'] * 4)
+
+    # La tasa publicada ese día cuenta; con dos tasas el mismo día gana la última
+    assert list(tasas) == [3.70, 3.72, 3.72, 3.75]
+
+
+def test_fecha_anterior_a_la_primera_tasa_diaria():
+    tasas = _tasas(['2023-01-05', '2023-01-05', '2022-06-01'], ['PEN', 'CLP', 'PEN'])
+
+    # PEN cae en la tasa mensual; CLP solo tiene tasas diarias y queda sin tipo de cambio
+    assert tasas[0] == 3.8
+    assert np.isnan(tasas[1])
+    # Fuera de la tabla mensual tampoco hay tasa
+    assert np.isnan(tasas[2])
+
+
+def test_moneda_sin_tasa_en_ninguna_tabla_vale_uno():
+    tasas = _tasas(['2023-01-20', '2023-01-20', None], ['USD', 'JPY', 'USD'])
+
+    assert list(tasas) == [1.0, 1.0, 1.0]
+
+
+def test_fecha_nula_queda_sin_tipo_de_cambio():
+    tasas = _tasas([None, None], ['PEN', 'CLP'])
+
+    assert np.isnan(tasas).all()
+
+
+def test_convertir_divide_entre_la_tasa_de_cada_fila():
+    servicio = ServicioTipoCambio(MENSUAL, DIARIAS)
+
+    montos = servicio.convertir([372.0, 10.0], pd.Series(pd.to_datetime(['2023-01-20', '2023-02-01'])),
+                                pd.Series(['PEN', 'USD']))
+
+    assert list(montos) == [100.0, 10.0]
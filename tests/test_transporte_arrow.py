@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_processing import process_data
+from utilities.transporte_arrow import FORMATO_ARROW, FORMATO_PICKLE, TransporteArrow, recibir_varios
+
+pytest.importorskip("pyarrow")
+
+
+def _tabla():
+    return pd.DataFrame({
+        'Cantidad': np.arange(6, dtype=np.int64),
+        'Precio': np.linspace(0, 1, 6),
+        'Texto': ['a', None, 'c', 'd', np.nan, 'f'],
+        'Material': [1000, '1001', np.nan, 1003.0, 'X', 1005],
+        'Fecha': pd.date_range('2024-01-01', periods=6),
+        'Vacia': pd.Series([pd.NaT] * 6, dtype=object),
+    })
+
+
+def test_ida_y_vuelta_conserva_valores_y_tipos():
+    df = _tabla()
+    with TransporteArrow(filas_minimas=0) as transporte:
+        referencia = transporte.enviar(df)
+        recibido = recibir_varios({'tabla': referencia})['tabla']
+
+    assert referencia.formato == FORMATO_ARROW
+    assert referencia.columnas_pickle == ['Material', 'Vacia']
+    esperado = df.assign(Texto=df['Texto'].where(df['Texto'].notna(), np.nan))
+    pd.testing.assert_frame_equal(recibido, esperado)
+
+
+def test_columnas_numericas_se_leen_sin_copiar():
+    with TransporteArrow(filas_minimas=0) as transporte:
+        recibido = recibir_varios(transporte.enviar_varios({'tabla': _tabla()}))['tabla']
+
+    assert not recibido['Cantidad'].to_numpy().flags.writeable
+    assert not recibido['Precio'].to_numpy().flags.writeable
+
+
+def test_nombres_repetidos_y_tablas_pequenas():
+    repetidas = pd.DataFrame([[1, 2]], columns=['a', 'a'])
+    with TransporteArrow(filas_minimas=3) as transporte:
+        referencias = transporte.enviar_varios({'pequena': repetidas, 'grande': _tabla(), 'otro': 5})
+        assert referencias['pequena'] is repetidas and referencias['otro'] == 5
+        assert transporte.enviar(repetidas).formato == FORMATO_PICKLE
+        assert referencias['grande'].formato == FORMATO_ARROW
+
+
+@pytest.mark.parametrize("opciones", [{}, {'copy_on_write': True}, {'presupuesto_memoria': True}])
+def test_process_data_acepta_entradas_de_solo_lectura(entradas, opciones, tmp_path):
+    if opciones.get('presupuesto_memoria'):
+        opciones = dict(opciones, directorio_temporal=str(tmp_path))
+    esperado, _ = process_data(**{clave: df.copy() for clave, df in entradas.items()}, **opciones)
+    with TransporteArrow(filas_minimas=0) as transporte:
+        recibidas = recibir_varios(transporte.enviar_varios(entradas))
+        obtenido, _ = process_data(**recibidas, **opciones)
+
+    pd.testing.assert_frame_equal(obtenido, esperado)
+
+
+def test_copiar_devuelve_columnas_editables():
+    with TransporteArrow(filas_minimas=0) as transporte:
+        recibido = recibir_varios(transporte.enviar_varios({'tabla': _tabla()}), copiar=True)['tabla']
+    recibido.loc[0, 'Cantidad'] = -1
+
+    assert recibido['Cantidad'].tolist() == [-1, 1, 2, 3, 4, 5]
@@ -0,0 +1,86 @@
+import os
+import subprocess
+import sys
+
+import pandas as pd
+import pytest
+
+from conftest import generar_reportes
+from mainSINSTREAMLIT import ARCHIVOS_PERIODO
+from utilities.__main__ import main
+from utilities.linaje_columnas import PERFILES_REPORTE
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Reporte sintético de conftest que corresponde a cada archivo del periodo
+REPORTE_DE_ARCHIVO = {"ME5A": "ME5A", "ZMM621": "ZMM621", "IW38": "IW38", "ME2N": "ME2N", "ZMB52": "ZMB52",
+                      "MCBE": "MCBE_raw", "criticos": "CRITICOS", "inmovilizados": "INMOVILIZADOS",
+                      "tipos_cambio": "tipos_cambio"}
+
+
+@pytest.fixture(scope="module")
+def periodo(tmp_path_factory):
+    carpeta = tmp_path_factory.mktemp("Agosto")
+    reportes = generar_reportes()
+    for clave, nombre in ARCHIVOS_PERIODO.items():
+        reportes[REPORTE_DE_ARCHIVO[clave]].to_excel(carpeta / nombre, index=False)
+    return carpeta
+
+
+@pytest.fixture(scope="module")
+def resultado(periodo, tmp_path_factory):
+    salida = tmp_path_factory.mktemp("salida") / "resultado.xlsx"
+    assert main(["procesar", "--periodo", str(periodo), "--salida", str(salida)]) == 0
+    return salida
+
+
+def test_ayuda_no_importa_pandas():
+    codigo = ("import runpy, sys\n"
+              "sys.argv = ['utilities', 'procesar', '--help']\n"
+              "try:\n    runpy.run_module('utilities', run_name='__main__')\n"
+              "except SystemExit:\n    pass\n"
+              "print('pandas' in sys.modules)")
+    salida = subprocess.run([sys.executable, "-c", codigo], cwd=RAIZ, capture_output=True, text=True, check=True)
+    assert "--perfil" in salida.stdout
+    assert salida.stdout.strip().endswith("False")
+
+
+def test_validar_periodo(periodo, capsys):
+    assert main(["validar", "--periodo", str(periodo)]) == 0
+    assert capsys.readouterr().out.count("[OK]") == len(ARCHIVOS_PERIODO)
+
+
+def test_validar_informa_el_archivo_que_no_cumple(periodo, tmp_path, capsys):
+    roto = tmp_path / "ME5A.xlsx"
+    pd.read_excel(periodo / ARCHIVOS_PERIODO["ME5A"]).drop(columns="Material").to_excel(roto, index=False)
+
+    assert main(["validar", "--archivo", "ME5A", str(roto), "--archivo", "IW38",
+                 str(periodo / ARCHIVOS_PERIODO["IW38"])]) == 1
+    salida = capsys.readouterr().out
+    assert "[ERROR] ME5A" in salida and "[OK] IW38" in salida
+
+
+def test_procesar_sin_todos_los_archivos(periodo, capsys):
+    assert main(["procesar", "--archivo", "ME5A", str(periodo / ARCHIVOS_PERIODO["ME5A"])]) == 2
+    assert "Faltan archivos del periodo" in capsys.readouterr().out
+
+
+def test_procesar_y_exportar_un_perfil(resultado, tmp_path):
+    reporte = pd.read_excel(resultado, sheet_name="Result")
+    assert len(reporte) > 0
+
+    csv = tmp_path / "costos.csv"
+    assert main(["exportar", str(resultado), str(csv), "--perfil", "costos"]) == 0
+    exportado = pd.read_csv(csv)
+    assert list(exportado.columns) == PERFILES_REPORTE["costos"]
+    assert len(exportado) == len(reporte)
+
+
+def test_diferencias_de_un_reporte_consigo_mismo(resultado, tmp_path, capsys):
+    salida = tmp_path / "diferencias.xlsx"
+
+    assert main(["diff", str(resultado), str(resultado), "--salida", str(salida)]) == 0
+    hojas = pd.read_excel(salida, sheet_name=None)
+    assert set(hojas) == {"DIF_RESUMEN", "DIF_TRANSICIONES", "DIF_REGISTROS", "DIF_DETALLE"}
+    assert hojas["DIF_REGISTROS"].empty
+    assert "Las diferencias se han guardado" in capsys.readouterr().out
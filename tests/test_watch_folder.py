@@ -0,0 +1,61 @@
+import os
+import time
+
+import pandas as pd
+
+import watch_folder
+from watch_folder import CacheArchivosParseados
+
+
+def _cache(tmp_path, monkeypatch, **kwargs):
+    lecturas = []
+
+    def cargar(key, ruta):
+        lecturas.append(ruta)
+        return pd.DataFrame({'valor': [len(lecturas)]})
+
+    monkeypatch.setattr(watch_folder, 'cargar_archivo', cargar)
+    return CacheArchivosParseados(str(tmp_path), **kwargs), lecturas
+
+
+def _en_disco(tmp_path, key):
+    return sorted(nombre for nombre in os.listdir(tmp_path) if nombre.startswith(f"{key}_"))
+
+
+def test_cache_en_disco_conserva_solo_las_ultimas_versiones(tmp_path, monkeypatch):
+    cache, lecturas = _cache(tmp_path, monkeypatch, max_entradas=2)
+    for version in range(5):
+        cache.obtener('ME5A', 'ME5A.xlsx', (version, 100))
+        time.sleep(0.01)
+    cache.obtener('ZMB52', 'ZMB52.xlsx', (0, 100))
+
+    assert len(lecturas) == 6
+    assert len(_en_disco(tmp_path, 'ME5A')) == 2
+    assert len(_en_disco(tmp_path, 'ZMB52')) == 1
+
+    # Las dos últimas versiones siguen en disco: un cache nuevo no vuelve a parsearlas
+    nuevo, lecturas_nuevo = _cache(tmp_path, monkeypatch, max_entradas=2)
+    nuevo.obtener('ME5A', 'ME5A.xlsx', (3, 100))
+    assert lecturas_nuevo == []
+
+
+def test_cache_en_disco_borra_las_entradas_vencidas(tmp_path, monkeypatch):
+    cache, _ = _cache(tmp_path, monkeypatch)
+    cache.obtener('ME5A', 'ME5A.xlsx', (0, 100))
+    vieja = os.path.join(tmp_path, _en_disco(tmp_path, 'ME5A')[0])
+    hace_un_mes = time.time() - 30 * 24 * 3600
+    os.utime(vieja, (hace_un_mes, hace_un_mes))
+
+    CacheArchivosParseados(str(tmp_path))
+
+    assert _en_disco(tmp_path, 'ME5A') == []
+
+
+def test_cache_devuelve_el_dataframe_guardado_sin_copiarlo(tmp_path, monkeypatch):
+    cache, lecturas = _cache(tmp_path, monkeypatch)
+    primero, reparseado = cache.obtener('ME5A', 'ME5A.xlsx', (0, 100))
+    segundo, reparseado_2 = cache.obtener('ME5A', 'ME5A.xlsx', (0, 100))
+
+    assert reparseado and not reparseado_2
+    assert segundo is primero
+    assert len(lecturas) == 1
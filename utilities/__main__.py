@@ -0,0 +1,228 @@
+"""
+Punto de entrada sin interfaz gráfica, para tareas programadas:
+
+    python -m utilities validar --periodo ../Agosto
+    python -m utilities procesar --periodo ../Agosto --salida resultado.xlsx --perfil costos
+    python -m utilities exportar reporte.pkl reporte.csv --perfil liberaciones
+    python -m utilities diferencias resultado_Julio.xlsx resultado_Agosto.xlsx --salida diferencias.xlsx
+    python -m utilities transporte --periodo ../Agosto
+
+(alias en inglés: validate, process, export, diff, transport). Se ejecuta desde la carpeta del proyecto.
+
+Cada subcomando importa solo lo que necesita: validar y exportar no cargan el pipeline
+(data_processing ni rapidfuzz) y la ayuda no carga pandas. Al terminar se informa el tiempo total
+y el de importación; con --tiempos, el detalle por módulo.
+"""
+import argparse
+import importlib
+import os
+import sys
+import time
+
+INICIO = time.perf_counter()
+
+# Segundos de importación de cada módulo cargado con importar(), en orden de carga
+TIEMPOS_IMPORTACION = {}
+
+
+def importar(nombre):
+    """Importa un módulo y registra cuánto tardó (solo la primera vez; lo ya cargado no cuenta)."""
+    inicio = time.perf_counter()
+    modulo = importlib.import_module(nombre)
+    TIEMPOS_IMPORTACION.setdefault(nombre, time.perf_counter() - inicio)
+    return modulo
+
+
+def nombre_backend(nombre):
+    """
+    type= de --backend: acepta los backends instalados (backends_disponibles). Se valida al leer el
+    argumento y no con choices= para que la ayuda no importe el pipeline.
+    """
+    disponibles = importar('utilities.backends').backends_disponibles()
+    if nombre not in disponibles:
+        raise argparse.ArgumentTypeError(f"backend '{nombre}' no disponible (opciones: {', '.join(disponibles)})")
+    return nombre
+
+
+def _rutas(args):
+    """Rutas por clave de ARCHIVOS_PERIODO: las de la carpeta --periodo y las dadas con --archivo."""
+    rutas = {}
+    if args.periodo:
+        rutas.update(importar('mainSINSTREAMLIT').rutas_de_carpeta(args.periodo))
+    for clave, ruta in args.archivo or []:
+        rutas[clave] = ruta
+    return rutas
+
+
+def leer_reporte(ruta, hoja='Result'):
+    """Lee un reporte guardado como .pkl (cola de trabajos), .csv o .xlsx (hoja `hoja`)."""
+    pd = importar('pandas')
+    extension = os.path.splitext(ruta)[1].lower()
+    if extension == '.pkl':
+        return pd.read_pickle(ruta)
+    if extension == '.csv':
+        return pd.read_csv(ruta)
+    return pd.read_excel(ruta, sheet_name=hoja)
+
+
+def escribir_reporte(df, ruta, hoja='Result'):
+    """Escribe un reporte según la extensión de la ruta (.pkl, .csv o .xlsx)."""
+    extension = os.path.splitext(ruta)[1].lower()
+    if extension == '.pkl':
+        df.to_pickle(ruta)
+    elif extension == '.csv':
+        df.to_csv(ruta, index=False)
+    else:
+        df.to_excel(ruta, sheet_name=hoja, index=False)
+
+
+# -------------------------
+# Subcomandos
+# -------------------------
+def validar(args):
+    """Lee cada archivo y valida su esquema, sin procesar. Retorna 1 si alguno no cumple."""
+    importar('pandas')
+    ingesta = importar('utilities.ingesta')
+    esquemas = importar('utilities.esquemas')
+
+    rutas = _rutas(args)
+    if not rutas:
+        print("Indique --periodo o al menos un --archivo CLAVE RUTA.")
+        return 2
+    errores = 0
+    for clave, ruta in rutas.items():
+        inicio = time.perf_counter()
+        try:
+            df, _ = ingesta.cargar_reporte(clave, ruta)
+            print(f"[OK] {clave}: {len(df)} filas, {df.shape[1]} columnas ({time.perf_counter() - inicio:.2f} s)")
+        except (esquemas.ErrorDeEsquema, FileNotFoundError, KeyError, ValueError) as e:
+            errores += 1
+            print(f"[ERROR] {clave} ({ruta}): {e}")
+    return 1 if errores else 0
+
+
+def procesar(args):
+    """Procesa un periodo completo y guarda el libro de salida."""
+    importar('pandas')
+    main_sin_streamlit = importar('mainSINSTREAMLIT')
+    importar('data_processing')
+
+    rutas = _rutas(args)
+    faltantes = [clave for clave in main_sin_streamlit.ARCHIVOS_PERIODO if clave not in rutas]
+    if faltantes:
+        print(f"Faltan archivos del periodo: {faltantes}")
+        return 2
+    files = [rutas[clave] for clave in main_sin_streamlit.ARCHIVOS_PERIODO]
+    result, processed_dataframes_dict = main_sin_streamlit.process_uploaded_files(
+        files, backend=args.backend, presupuesto_memoria=args.presupuesto_memoria, perfil=args.perfil)
+    main_sin_streamlit.guardar_resultado(result, processed_dataframes_dict, args.salida)
+    print(f"El archivo se ha guardado en {args.salida} ({len(result)} filas)")
+    return 0
+
+
+def exportar(args):
+    """Convierte un reporte guardado a otro formato, opcionalmente con las columnas de un perfil."""
+    df = leer_reporte(args.entrada, args.hoja)
+    if args.perfil:
+        linaje = importar('utilities.linaje_columnas')
+        columnas = [col for col in linaje.columnas_de_perfil(args.perfil) if col in df.columns]
+        df = df[columnas]
+    escribir_reporte(df, args.salida)
+    print(f"{len(df)} filas y {df.shape[1]} columnas exportadas a {args.salida}")
+    return 0
+
+
+def diferencias(args):
+    """Compara dos reportes guardados y escribe las hojas de diferencias en un libro Excel."""
+    pd = importar('pandas')
+    diferencias_util = importar('utilities.diferencias')
+
+    anterior = leer_reporte(args.anterior, args.hoja)
+    actual = leer_reporte(args.actual, args.hoja)
+    diferencia = diferencias_util.comparar_reportes(anterior, actual)
+    with pd.ExcelWriter(args.salida) as writer:
+        for sheet_name, df in diferencia.hojas().items():
+            df.to_excel(writer, sheet_name=sheet_name, index=False)
+    print(diferencia.resumen().to_string(index=False))
+    print(f"Las diferencias se han guardado en {args.salida}")
+    return 0
+
+
+def transporte(args):
+    """Compara el transporte Arrow con pickle sobre los archivos de un periodo (utilities.transporte_arrow)."""
+    importar('pandas')
+    ingesta = importar('utilities.ingesta')
+    transporte_arrow = importar('utilities.transporte_arrow')
+
+    rutas = _rutas(args)
+    if not rutas:
+        print("Indique --periodo o al menos un --archivo CLAVE RUTA.")
+        return 2
+    if not transporte_arrow.arrow_disponible():
+        print("pyarrow no está instalado: el transporte usará pickle. Instálelo con 'pip install pyarrow'.")
+    dfs = {clave: ingesta.cargar_reporte(clave, ruta)[0] for clave, ruta in rutas.items()}
+    tabla = transporte_arrow.comparar_con_pickle(dfs, repeticiones=args.repeticiones)
+    print(tabla.to_string(index=False))
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m utilities", description="Tareas sin interfaz gráfica.")
+    parser.add_argument("--tiempos", action="store_true", help="Detalla el tiempo de importación de cada módulo.")
+    subcomandos = parser.add_subparsers(dest="subcomando", required=True)
+
+    def con_archivos(sub):
+        sub.add_argument("--periodo", help="Carpeta del periodo, con los nombres de archivo de ARCHIVOS_PERIODO.")
+        sub.add_argument("--archivo", nargs=2, action="append", metavar=("CLAVE", "RUTA"),
+                         help="Archivo de un reporte (p. ej. --archivo ME5A solpeds.xlsx); se puede repetir.")
+
+    sub = subcomandos.add_parser("validar", aliases=["validate"], help="Valida el esquema de los archivos.")
+    con_archivos(sub)
+    sub.set_defaults(funcion=validar)
+
+    sub = subcomandos.add_parser("procesar", aliases=["process"], help="Procesa un periodo.")
+    con_archivos(sub)
+    sub.add_argument("--salida", default="resultado.xlsx", help="Libro de salida.")
+    sub.add_argument("--backend", default="pandas", type=nombre_backend,
+                     help="Backend de procesamiento (ver utilities.backends).")
+    sub.add_argument("--perfil", default="completo", help="Perfil del reporte (utilities.linaje_columnas).")
+    sub.add_argument("--presupuesto-memoria", action="store_true", help="Modo de poca memoria de process_data.")
+    sub.set_defaults(funcion=procesar)
+
+    sub = subcomandos.add_parser("exportar", aliases=["export"], help="Convierte un reporte guardado.")
+    sub.add_argument("entrada", help="Reporte (.pkl, .csv o .xlsx).")
+    sub.add_argument("salida", help="Archivo de salida (.pkl, .csv o .xlsx).")
+    sub.add_argument("--hoja", default="Result", help="Hoja del reporte si la entrada es .xlsx.")
+    sub.add_argument("--perfil", help="Exporta solo las columnas de este perfil.")
+    sub.set_defaults(funcion=exportar)
+
+    sub = subcomandos.add_parser("diferencias", aliases=["diff"], help="Compara dos reportes guardados.")
+    sub.add_argument("anterior", help="Reporte anterior (.pkl, .csv o .xlsx).")
+    sub.add_argument("actual", help="Reporte actual (.pkl, .csv o .xlsx).")
+    sub.add_argument("--hoja", default="Result", help="Hoja de los reportes .xlsx.")
+    sub.add_argument("--salida", default="diferencias.xlsx", help="Libro de salida.")
+    sub.set_defaults(funcion=diferencias)
+
+    sub = subcomandos.add_parser("transporte", aliases=["transport"],
+                                 help="Compara el transporte Arrow entre procesos con pickle.")
+    con_archivos(sub)
+    sub.add_argument("--repeticiones", type=int, default=3, help="Se informa el mejor tiempo de cada medición.")
+    sub.set_defaults(funcion=transporte)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    codigo = args.funcion(args)
+
+    total = time.perf_counter() - INICIO
+    importacion = sum(TIEMPOS_IMPORTACION.values())
+    print(f"Tiempo total: {total:.2f} s (importaciones: {importacion:.2f} s)")
+    if args.tiempos:
+        for nombre, segundos in TIEMPOS_IMPORTACION.items():
+            print(f"  {nombre}: {segundos:.3f} s")
+    return codigo
+
+
+if __name__ == "__main__":
+    sys.exit(main())
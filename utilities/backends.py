@@ -0,0 +1,184 @@
+import numpy as np
+import pandas as pd
+from utilities import process_dataframes as pd_util
+from utilities import merge_dataframes as md_util
+from utilities import refine_joined_data as rjd_util
+from utilities import calculate_additional_columns as cac_util
+
+#--------------------------------------------
+# BACKENDS DE EJECUCION DEL PIPELINE
+#--------------------------------------------
+
+class PandasBackend:
+    """
+    Backend por defecto: ejecuta las cuatro etapas del pipeline con las funciones de pandas
+    de utilities (process_dataframes_for_join, merge_dataframes, refine_joined_data y
+    calculate_additional_columns).
+    """
+    nombre = 'pandas'
+
+    def process_dataframes_for_join(self, *args, **kwargs):
+        return pd_util.process_dataframes_for_join(*args, **kwargs)
+
+    def merge_dataframes(self, *args, **kwargs):
+        return md_util.merge_dataframes(*args, **kwargs)
+
+    def refine_joined_data(self, *args, **kwargs):
+        return rjd_util.refine_joined_data(*args, **kwargs)
+
+    def calculate_additional_columns(self, *args, **kwargs):
+        return cac_util.calculate_additional_columns(*args, **kwargs)
+
+
+class PolarsJoinBackend(PandasBackend):
+    """
+    Estrategia de uniones con Polars: solo cambia cómo merge_dataframes resuelve las uniones
+    izquierdas. Polars calcula los pares de filas sobre las llaves y las columnas del DataFrame
+    derecho se recogen por posición con pandas, sin volver a copiar el DataFrame acumulado en cada
+    unión. Las demás etapas (procesamiento, refinado y columnas adicionales) son las de pandas.
+    """
+    nombre = 'polars-join'
+
+    def __init__(self):
+        try:
+            import polars  # noqa: F401
+        except ImportError as e:
+            raise ImportError("El backend 'polars-join' requiere el paquete polars (pip install polars).") from e
+
+    def merge_dataframes(self, *args, **kwargs):
+        kwargs.setdefault('join', left_join_polars)
+        return md_util.merge_dataframes(*args, **kwargs)
+
+
+BACKENDS = {
+    PandasBackend.nombre: PandasBackend,
+    PolarsJoinBackend.nombre: PolarsJoinBackend,
+}
+
+
+def obtener_backend(backend='pandas'):
+    """
+    Devuelve una instancia del backend solicitado.
+
+    Parámetros:
+    - backend (str o backend): Nombre registrado en BACKENDS o una instancia ya creada.
+
+    Retorna:
+    - Backend con los métodos de las cuatro etapas del pipeline.
+    """
+    if not isinstance(backend, str):
+        return backend
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend '{backend}' no soportado. Opciones: {list(BACKENDS)}")
+    return BACKENDS[backend]()
+
+
+def backends_disponibles():
+    """Lista los backends registrados cuyas dependencias están instaladas."""
+    disponibles = []
+    for nombre, clase in BACKENDS.items():
+        try:
+            clase()
+        except ImportError:
+            continue
+        disponibles.append(nombre)
+    return disponibles
+
+
+def _codigos_llave(llave_izquierda, llave_derecha):
+    """
+    Prepara las llaves de ambos lados para Polars. Si las dos son texto sin nulos se usan
+    tal cual; en otro caso se factorizan juntas para conservar la semántica de pandas
+    (sin mezclar tipos y con NaN coincidiendo con NaN).
+    """
+    if (pd.api.types.infer_dtype(llave_izquierda, skipna=False) == 'string'
+            and pd.api.types.infer_dtype(llave_derecha, skipna=False) == 'string'):
+        return llave_izquierda.to_numpy(), llave_derecha.to_numpy()
+    codigos, _ = pd.factorize(pd.concat([llave_izquierda, llave_derecha], ignore_index=True),
+                              use_na_sentinel=False)
+    return codigos[:len(llave_izquierda)], codigos[len(llave_izquierda):]
+
+
+def left_join_polars(data1, data2, on_column, columns_to_join):
+    """
+    Equivalente de merge_dataframes.left_join resuelto con Polars.
+
+    Polars solo calcula los pares (fila izquierda, fila derecha) sobre la llave; las columnas
+    se recogen después por posición. Si cada fila izquierda tiene a lo sumo una coincidencia,
+    el resultado reutiliza las columnas de data1 en lugar de copiarlas.
+
+    Parámetros:
+    - data1 (DataFrame): DataFrame izquierdo.
+    - data2 (DataFrame): DataFrame derecho.
+    - on_column (str): Columna para unir.
+    - columns_to_join (list): Columnas para incluir del DataFrame derecho.
+
+    Retorna:
+    - DataFrame: Mismo resultado que pd.merge(..., how='left').
+    """
+    import polars as pl
+
+    derecha = data2[[on_column] + columns_to_join].reset_index(drop=True)
+    llave_izq, llave_der = _codigos_llave(data1[on_column], derecha[on_column])
+
+    pares = (
+        pl.LazyFrame({'k': pl.Series(llave_izq), 'i': np.arange(len(llave_izq))})
+        .join(pl.LazyFrame({'k': pl.Series(llave_der), 'j': np.arange(len(llave_der))}), on='k', how='left')
+        .sort(['i', 'j'], nulls_last=True)
+        .collect()
+    )
+    filas_izq = pares['i'].to_numpy()
+    filas_der = pares['j'].fill_null(-1).to_numpy()
+
+    # Sufijos iguales a los de pandas para columnas repetidas
+    repetidas = [col for col in columns_to_join if col in data1.columns and col != on_column]
+    if len(filas_izq) == len(data1):
+        resultado = data1.copy(deep=False)
+    else:
+        resultado = data1.take(filas_izq)
+    if repetidas:
+        resultado.columns = [f'{col}_x' if col in repetidas else col for col in resultado.columns]
+    resultado.index = pd.RangeIndex(len(filas_izq))
+
+    recogidas = derecha[columns_to_join].reindex(filas_der)
+    recogidas.index = resultado.index
+    for col in columns_to_join:
+        nombre = f'{col}_y' if col in repetidas else col
+        resultado[nombre] = recogidas[col]
+    return resultado
+
+
+def verificar_paridad(entradas, backend='polars-join', referencia='pandas'):
+    """
+    Ejecuta process_data con dos backends sobre copias de las mismas entradas y compara la
+    salida final (column_order).
+
+    Parámetros:
+    - entradas (dict): Argumentos de process_data por nombre (df_ME5A, df_ZMM621_fechaAprobacion, ...).
+    - backend (str): Backend a verificar.
+    - referencia (str): Backend de referencia.
+
+    Retorna:
+    - list: Columnas cuyo contenido difiere (vacía si hay paridad).
+    """
+    from data_processing import process_data
+
+    resultados = {}
+    for nombre in (referencia, backend):
+        copia = {clave: df.copy(deep=True) for clave, df in entradas.items()}
+        resultados[nombre], _ = process_data(**copia, backend=nombre)
+
+    esperado, obtenido = resultados[referencia], resultados[backend]
+    if list(esperado.columns) != list(obtenido.columns) or len(esperado) != len(obtenido):
+        print(f"Paridad {backend} vs {referencia}: forma distinta {obtenido.shape} vs {esperado.shape}")
+        return sorted(set(esperado.columns) ^ set(obtenido.columns)) or list(esperado.columns)
+
+    diferentes = []
+    for col in esperado.columns:
+        try:
+            pd.testing.assert_series_equal(esperado[col], obtenido[col], check_dtype=False, check_index=False)
+        except AssertionError:
+            diferentes.append(col)
+    if diferentes:
+        print(f"Paridad {backend} vs {referencia}: columnas distintas {diferentes}")
+    return diferentes
@@ -1,6 +1,8 @@
 import pandas as pd 
 import numpy as np 
 from utilities.process_dataframes import CoincidenciaBuscadorFinal
+from utilities.tipos_cambio import obtener_servicio_tipo_cambio
+from utilities.fechas import asegurar_fechas
 
 
 def vectorized_calcular_estado_contable(df):
@@ -98,11 +100,8 @@ def vectorized_tipoCromprometido(df):
 def vectorized_calculate_days_difference(df):
     """Vectorized version of calculate_days_difference."""
     
-    # Convertir las columnas de fechas a datetime
-    # Fecha de elaboracion de compra
-    df['Fecha de OC'] = pd.to_datetime(df['Fecha de OC'], errors='coerce')
-    # Fecha de liberacion de la orden 
-    df['Fecha de aprobación de la orden de compr'] = pd.to_datetime(df['Fecha de aprobación de la orden de compr'], errors='coerce')
+    # Fechas de elaboración de compra y de liberación de la orden (ya parseadas en la ingesta)
+    asegurar_fechas(df, ['Fecha de OC', 'Fecha de aprobación de la orden de compr'])
     
     # Definir la columna de resultado
     df['DEMORA EN LIBERACIONES DE OC'] = None
@@ -119,8 +118,7 @@ def vectorized_calculate_days_difference(df):
 
 
 def vectorized_calculate_date_difference(df):
-    df['Fecha de OC'] = pd.to_datetime(df['Fecha de OC'], errors='coerce')
-    df['Fecha de SOLPED'] = pd.to_datetime(df['Fecha de SOLPED'], errors='coerce')
+    asegurar_fechas(df, ['Fecha de OC', 'Fecha de SOLPED'])
 
     df['DEMORA EN GENERAR OC (DIAS)'] = None
 
@@ -136,32 +134,66 @@ def vectorized_calculate_date_difference(df):
     # print(f"Número de filas al final: {len(df)}")
     return df  # Devuelve el DataFrame modificado completo
 
-def vectorized_get_tipo_cambio(df):
-    """Vectorized version of get_tipo_cambio."""
-    return np.where(df['Moneda'] == "PEN", df['Tipo_Cambio_PEN'],
-                    np.where(df['Moneda'] == "EUR", df['Tipo_Cambio_EUR'], 1))
-
 def vectorized_convertir_moneda(df):
     """Vectorized version of convertir_moneda."""
     return df['Precio neto'] / df['Tipo de Cambio']
 
-def costoComprasPorRetirar(df):
-    # Seleccionamos y ordenamos las columnas de interés
-    df_filtered = df[['Descripcion Material', 'Fecha de OC', 'Precio Convertido Dolares', 'Libre utilización',
-                      'Cantidad de pedido']].copy()
-    df_filtered = df_filtered.sort_values(by=['Descripcion Material', 'Fecha de OC'], ascending=[True, False])
-    # Calculamos el Precio Unitario
-    df_filtered['Precio Unitario'] = df_filtered['Precio Convertido Dolares'] / df_filtered['Cantidad de pedido']
-    # Tomamos solo la fecha contable más reciente por material
-    df_latest = df_filtered.drop_duplicates(subset='Descripcion Material', keep='first')
-    # Hacemos un left join entre el df original y df_latest para agregar la columna "Precio Unitario" al df original
-    df = pd.merge(df, df_latest[['Descripcion Material', 'Precio Unitario']], on='Descripcion Material', how='left')
-    # Hacemos el cálculo de Costo compras por retirar con la nueva columna "Precio Unitario"
-    df['Costo compras por retirar'] = np.where(df['TIPO COMPROMETIDO SUGERENCIA']=='COMPRA POR RETIRAR',df['Precio Unitario'] * df['Libre utilización'],'')
+def precio_unitario_reciente(df, clave='Descripcion Material'):
+    """
+    Precio unitario en dólares de la OC más reciente de cada clave, asignado a todas sus filas.
+
+    En lugar de ordenar todo el DataFrame y volver a unirlo, se factoriza la clave, se toma por
+    grupo la fila con la 'Fecha de OC' máxima (la primera en caso de empate; si el grupo no tiene
+    fechas, su primera fila) y el precio de esa fila se reparte con los códigos de la clave.
+
+    Parámetros:
+    - df (DataFrame): Datos con clave, 'Fecha de OC', 'Precio Convertido Dolares' y 'Cantidad de pedido'.
+    - clave (str): Columna que agrupa las compras ('Descripcion Material' o 'Material').
+
+    Retorna:
+    - ndarray: Precio unitario por fila (NaN si no se puede calcular).
+    """
+    codigos, _ = pd.factorize(df[clave], use_na_sentinel=False)
+    fechas = df['Fecha de OC']
+    if not pd.api.types.is_datetime64_any_dtype(fechas):
+        fechas = pd.to_datetime(fechas, errors='coerce')
+    # NaT queda como el menor entero, así solo se elige si el grupo no tiene ninguna fecha
+    fechas = fechas.to_numpy(dtype='datetime64[ns]').view('i8')
+
+    fecha_maxima = pd.Series(fechas).groupby(codigos).transform('max').to_numpy()
+    candidatas = np.flatnonzero(fechas == fecha_maxima)
+    fila_reciente = pd.Series(candidatas).groupby(codigos[candidatas]).first()
+
+    precio_unitario = (pd.to_numeric(df['Precio Convertido Dolares'], errors='coerce').to_numpy(dtype=float)
+                       / pd.to_numeric(df['Cantidad de pedido'], errors='coerce').to_numpy(dtype=float))
+    precio_por_grupo = np.full(len(fila_reciente), np.nan)
+    precio_por_grupo[fila_reciente.index.to_numpy()] = precio_unitario[fila_reciente.to_numpy()]
+    return precio_por_grupo[codigos]
+
+def costoComprasPorRetirar(df, clave='Descripcion Material'):
+    """
+    Agrega 'Precio Unitario' (de la OC más reciente por clave) y 'Costo compras por retirar'
+    (numérico; NaN en filas que no son COMPRA POR RETIRAR).
+    """
+    df['Precio Unitario'] = precio_unitario_reciente(df, clave)
+    por_retirar = df['TIPO COMPROMETIDO SUGERENCIA'] == 'COMPRA POR RETIRAR'
+    libre_utilizacion = pd.to_numeric(df['Libre utilización'], errors='coerce')
+    df['Costo compras por retirar'] = np.where(por_retirar, df['Precio Unitario'] * libre_utilizacion, np.nan)
     return df
 
-def calculate_additional_columns(joined_data, df_tipos_cambio,df_inmovilizados_converted,df_criticos):
-    """Calculate and add new columns based on the provided logic."""
+def calculate_additional_columns(joined_data, df_tipos_cambio,df_inmovilizados_converted,df_criticos,
+                                 clave_costo='Descripcion Material', columnas_requeridas=None):
+    """Calculate and add new columns based on the provided logic.
+
+    `df_tipos_cambio` puede ser la tabla mensual o un ServicioTipoCambio ya construido (por ejemplo,
+    con tasas diarias). `clave_costo` es la columna por la que se toma el precio más reciente en
+    costoComprasPorRetirar. `columnas_requeridas` (clave 'requeridas' de
+    utilities.linaje_columnas.resolver_linaje) limita el cálculo a las columnas que el perfil de
+    reporte necesita; None calcula todas.
+    """
+    def calcular(columna):
+        return columnas_requeridas is None or columna in columnas_requeridas
+
     def print_rows(df, operation):
         print(f"----[ {operation} ]----")
         print(f"Current number of rows: {df.shape[0]}")
@@ -169,64 +201,67 @@ def calculate_additional_columns(joined_data, df_tipos_cambio,df_inmovilizados_c
         
     print_rows(joined_data, "Start")
     
-    joined_data['Estado contable'] = vectorized_calcular_estado_contable(joined_data)
+    if calcular('Estado contable'):
+        joined_data['Estado contable'] = vectorized_calcular_estado_contable(joined_data)
     # Indicador de borrado SOLPED
-    joined_data['Indicador de borrado SOLPED'] = np.where(joined_data['Indicador de borrado SOLPED'] == 'True',
-                                                          'SOLPED BORRADA ', '')
+    if calcular('Indicador de borrado SOLPED'):
+        joined_data['Indicador de borrado SOLPED'] = np.where(joined_data['Indicador de borrado SOLPED'] == 'True',
+                                                              'SOLPED BORRADA ', '')
     # Indicador de borrado Orden de Compra
-    joined_data['Indicador de borrado Orden de Compra'] = np.where(
-        joined_data['Indicador de borrado Orden de Compra'] == 'L', 'OC.BORRADA', '')
+    if calcular('Indicador de borrado Orden de Compra'):
+        joined_data['Indicador de borrado Orden de Compra'] = np.where(
+            joined_data['Indicador de borrado Orden de Compra'] == 'L', 'OC.BORRADA', '')
 
-    joined_data['TIPO'] = np.where(joined_data['Material'].isna() | joined_data['Material'].isin(['', 'nan']),
-                                   'SERVICIO', 'COMPRA')
+    if calcular('TIPO'):
+        joined_data['TIPO'] = np.where(joined_data['Material'].isna() | joined_data['Material'].isin(['', 'nan']),
+                                       'SERVICIO', 'COMPRA')
     # Por entregar (STATUS)
-    mask = joined_data['Por entregar (cantidad)'].isna() | joined_data['Por entregar (cantidad)'].isin(['', 'nan']) | (
-                joined_data['Por entregar (cantidad)'] > 0)
-    joined_data['Por entregar (STATUS)'] = np.where(mask, 'PENDIENTE', 'CONCLUIDO')
+    if calcular('Por entregar (STATUS)'):
+        mask = joined_data['Por entregar (cantidad)'].isna() | joined_data['Por entregar (cantidad)'].isin(['', 'nan']) | (
+                    joined_data['Por entregar (cantidad)'] > 0)
+        joined_data['Por entregar (STATUS)'] = np.where(mask, 'PENDIENTE', 'CONCLUIDO')
 
     # PENDIENTE DE LIBERACIÓN DE OC
-    joined_data['PENDIENTE DE LIBERACIÓN DE OC'] = vectorized_calculate_status(joined_data)
+    if calcular('PENDIENTE DE LIBERACIÓN DE OC'):
+        joined_data['PENDIENTE DE LIBERACIÓN DE OC'] = vectorized_calculate_status(joined_data)
 
-    joined_data['TIPO COMPROMETIDO SUGERENCIA'] = vectorized_tipoCromprometido(joined_data)
+    if calcular('TIPO COMPROMETIDO SUGERENCIA'):
+        joined_data['TIPO COMPROMETIDO SUGERENCIA'] = vectorized_tipoCromprometido(joined_data)
     
     # DEMORA EN GENERAR OC 
     # vectorized_calculate_date_difference
-    joined_data = vectorized_calculate_date_difference(joined_data)
+    if calcular('DEMORA EN GENERAR OC (DIAS)'):
+        joined_data = vectorized_calculate_date_difference(joined_data)
 
     # DEMORA EN LIBERACIONES DE OC
-    joined_data = vectorized_calculate_days_difference(joined_data)
+    if calcular('DEMORA EN LIBERACIONES DE OC'):
+        joined_data = vectorized_calculate_days_difference(joined_data)
 
     # Año OC
-    joined_data['Año OC'] = pd.to_datetime(joined_data['Fecha de OC']).dt.year
+    if calcular('Año OC'):
+        joined_data['Año OC'] = joined_data['Fecha de OC'].dt.year
 
     # Mes OC
-    joined_data['Mes OC'] = pd.to_datetime(joined_data['Fecha de OC']).dt.month
+    if calcular('Mes OC'):
+        joined_data['Mes OC'] = joined_data['Fecha de OC'].dt.month
     
-    print_rows(joined_data, "Before merging with df_tipos_cambio")
-    # Merging with df_tipos_cambio
-    joined_data = pd.merge(joined_data, df_tipos_cambio, left_on=['Año OC', 'Mes OC'], right_on=['Año', 'Mes'],
-                           how='left')
-    print_rows(joined_data, "After merging with df_tipos_cambio")
-
-    # Tipo de Cambio
-    joined_data['Tipo de Cambio'] = vectorized_get_tipo_cambio(joined_data)
+    # Tipo de Cambio: acceso directo al arreglo (periodo x moneda) del servicio, sin merge
+    if calcular('Tipo de Cambio'):
+        servicio_tipo_cambio = obtener_servicio_tipo_cambio(df_tipos_cambio)
+        joined_data['Tipo de Cambio'] = servicio_tipo_cambio.tasas(joined_data['Fecha de OC'], joined_data['Moneda'])
 
     # Converting Precio neto
-    joined_data['Precio neto'] = pd.to_numeric(joined_data['Precio neto'], errors='coerce')
-
-    # Converting Tipo de Cambio
-    joined_data['Tipo de Cambio'] = pd.to_numeric(joined_data['Tipo de Cambio'], errors='coerce')
+    if calcular('Precio neto'):
+        joined_data['Precio neto'] = pd.to_numeric(joined_data['Precio neto'], errors='coerce')
 
     # Precio Convertido Dolares
-    joined_data['Precio Convertido Dolares'] = vectorized_convertir_moneda(joined_data)
+    if calcular('Precio Convertido Dolares'):
+        joined_data['Precio Convertido Dolares'] = vectorized_convertir_moneda(joined_data)
 
-    # Dropping columns
-    joined_data = joined_data.drop(columns=['Tipo_Cambio_PEN', 'Tipo_Cambio_EUR', 'Año', 'Mes'])
-    # print("Time for dropping columns:", time.time() - start_time, "seconds")
-    
-    print_rows(joined_data, "Before costoComprasPorRetirar")
-    joined_data = costoComprasPorRetirar(joined_data)
-    print_rows(joined_data, "After costoComprasPorRetirar")
+    if calcular('Costo compras por retirar'):
+        print_rows(joined_data, "Before costoComprasPorRetirar")
+        joined_data = costoComprasPorRetirar(joined_data, clave_costo)
+        print_rows(joined_data, "After costoComprasPorRetirar")
     
     # Verificación de duplicados en df_inmovilizados_converted antes del merge
     total_rows = df_inmovilizados_converted.shape[0]
@@ -0,0 +1,245 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from utilities.indice_registros import IndiceRegistros
+from utilities.resumenes import HOJAS_RESUMEN
+from utilities.transporte_arrow import TransporteArrow, recibir
+
+#--------------------------------------------
+# COLA DE TRABAJOS COMPARTIDA ENTRE SESIONES
+#--------------------------------------------
+
+# Procesos del pool por defecto: la mitad de las CPUs, para no dejar sin CPU al servidor de Streamlit
+PROCESOS_POR_DEFECTO = max(1, (os.cpu_count() or 2) // 2)
+
+# Segundos que se conservan las salidas de un trabajo terminado antes de borrarlas
+DURACION_RESULTADOS = 6 * 3600
+
+# Archivos de salida de cada trabajo, dentro de su carpeta
+ARCHIVO_CSV = "reporte_procesado.csv"
+ARCHIVO_EXCEL = "archivos_procesados.xlsx"
+ARCHIVO_PROGRESO = "progreso.json"
+ARCHIVO_RESUMENES = "resumenes.pkl"
+ARCHIVO_REPORTE = "reporte.pkl"
+ARCHIVO_INDICE = "indice.npz"
+
+# Orden de los reportes en process_data
+CLAVES_PROCESO = ["ME5A", "ZMM621", "IW38", "ME2N", "ZMB52", "MCBE", "CRITICOS", "INMOVILIZADOS", "tipos_cambio"]
+
+# Datos de referencia de process_data (utilities.datos_referencia) por clave de CLAVES_PROCESO
+CLAVES_REFERENCIA = {"CRITICOS": "criticos", "INMOVILIZADOS": "inmovilizados", "tipos_cambio": "tipos_cambio"}
+
+
+def _escribir_progreso(directorio, etapa, fraccion):
+    """Escribe el progreso de un trabajo de forma atómica, para que la sesión lo lea sin ver archivos a medias."""
+    ruta = os.path.join(directorio, ARCHIVO_PROGRESO)
+    with open(ruta + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"etapa": etapa, "fraccion": fraccion}, f)
+    os.replace(ruta + ".tmp", ruta)
+
+
+def _ejecutar_trabajo(dfs, opciones, directorio, huellas_archivos=None):
+    """
+    Ejecuta un trabajo en un proceso del pool: process_data y exportación a la carpeta del trabajo.
+
+    Parámetros:
+    - dfs (dict): DataFrames ya leídos y validados (utilities.ingesta), por clave de CLAVES_PROCESO,
+      o sus TablaCompartida si la cola los envía con utilities.transporte_arrow. Se vacía.
+    - opciones (dict): Argumentos de process_data (backend, presupuesto_memoria, ...).
+    - directorio (str): Carpeta exclusiva del trabajo.
+    - huellas_archivos (dict): sha256 de cada archivo, por clave: son la versión de los datos de
+      referencia y del stock, así process_data no vuelve a recorrer esas tablas para compararlas.
+
+    Retorna:
+    - dict: Rutas de las salidas (CSV, Excel, resúmenes para el tablero y reporte con sus índices de
+      búsqueda) y número de filas del reporte.
+    """
+    # Importación diferida: el proceso del pool solo carga el pipeline al recibir su primer trabajo
+    import data_processing as dp
+    from utilities.datos_referencia import REGISTRO_REFERENCIA
+
+    _escribir_progreso(directorio, "procesando", 0.1)
+    # Los DataFrames se sacan de dfs y se entregan en `entradas`, que process_data vacía: así queda con
+    # la única referencia y, con presupuesto_memoria, puede soltarlos en cuanto dejan de usarse
+    entradas = {nombre: recibir(dfs.pop(clave)) for nombre, clave in zip(dp.ENTRADAS_PROCESO, CLAVES_PROCESO)}
+    # Los datos de referencia quedan procesados en el proceso del pool para los trabajos siguientes
+    huellas_archivos = huellas_archivos or {}
+    versiones_referencia = {nombre: huellas_archivos[clave] for clave, nombre in CLAVES_REFERENCIA.items()
+                            if clave in huellas_archivos}
+    result, processed_dataframes_dict = dp.process_data(entradas=entradas, registro_referencia=REGISTRO_REFERENCIA,
+                                                        versiones_referencia=versiones_referencia,
+                                                        version_stock=huellas_archivos.get("ZMB52"), **opciones)
+
+    _escribir_progreso(directorio, "exportando", 0.8)
+    ruta_csv = os.path.join(directorio, ARCHIVO_CSV)
+    ruta_excel = os.path.join(directorio, ARCHIVO_EXCEL)
+    result.to_csv(ruta_csv, index=False)
+    with pd.ExcelWriter(ruta_excel) as writer:
+        result.to_excel(writer, sheet_name='Result', index=False)
+        for sheet_name, df in processed_dataframes_dict.items():
+            df.to_excel(writer, sheet_name=sheet_name, index=False)
+
+    # Los resúmenes (utilities.resumenes) se guardan aparte para que el tablero no lea el Excel
+    ruta_resumenes = os.path.join(directorio, ARCHIVO_RESUMENES)
+    pd.to_pickle({nombre: processed_dataframes_dict[nombre] for nombre in HOJAS_RESUMEN
+                  if nombre in processed_dataframes_dict}, ruta_resumenes)
+
+    # El reporte se guarda con sus índices (utilities.indice_registros) para las búsquedas de la aplicación
+    ruta_reporte = os.path.join(directorio, ARCHIVO_REPORTE)
+    ruta_indice = os.path.join(directorio, ARCHIVO_INDICE)
+    result.to_pickle(ruta_reporte)
+    IndiceRegistros.desde_reporte(result).guardar(ruta_indice)
+
+    _escribir_progreso(directorio, "listo", 1.0)
+    return {"csv": ruta_csv, "excel": ruta_excel, "resumenes": ruta_resumenes, "reporte": ruta_reporte,
+            "indice": ruta_indice, "filas": len(result), "muestra": result.attrs.get('muestra')}
+
+
+class _Trabajo:
+    """Trabajo enviado a la cola: identificador, huella, carpeta de salida, futuro y sesiones que lo pidieron."""
+    def __init__(self, id_trabajo, huella, directorio):
+        self.id = id_trabajo
+        self.huella = huella
+        self.directorio = directorio
+        self.futuro = None
+        self.creado = time.time()
+        self.terminado = None
+        self.sesiones = set()
+
+
+class ColaTrabajos:
+    """
+    Cola de trabajos de procesamiento compartida por todas las sesiones del servidor (en Streamlit se
+    crea una sola vez con st.cache_resource).
+
+    - Los trabajos corren en un pool de procesos acotado: con varios usuarios a la vez, los demás
+      esperan en cola en lugar de competir por la CPU dentro de sus hilos de sesión.
+    - Cada trabajo tiene un identificador y una carpeta de salida propia, de modo que las sesiones no
+      sobrescriben los archivos de las otras.
+    - Un trabajo idéntico a uno en curso o terminado (mismos archivos, según su sha256, y mismas
+      opciones) no se vuelve a ejecutar: se devuelve el identificador existente.
+    - Con `transporte` (por defecto), los DataFrames grandes llegan al worker como archivos Arrow en
+      memoria compartida (utilities.transporte_arrow) en lugar de serializarse enteros con pickle por
+      la tubería del pool (el worker lee sus columnas numéricas del archivo, sin copiarlas); se
+      borran cuando el trabajo termina.
+    """
+    def __init__(self, procesos=PROCESOS_POR_DEFECTO, directorio=None, duracion_resultados=DURACION_RESULTADOS,
+                 transporte=True):
+        # 'spawn': no se duplica el proceso del servidor (con sus hilos) en cada worker
+        self.pool = ProcessPoolExecutor(max_workers=procesos, mp_context=multiprocessing.get_context("spawn"))
+        self.directorio = directorio or tempfile.mkdtemp(prefix="trabajos_")
+        os.makedirs(self.directorio, exist_ok=True)
+        self.duracion_resultados = duracion_resultados
+        self.transporte = transporte
+        self.trabajos = {}
+        self.por_huella = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def huella(huellas_archivos, opciones):
+        """Huella de un trabajo: sha256 de las huellas de sus archivos (por clave) y de sus opciones."""
+        contenido = json.dumps({"archivos": huellas_archivos, "opciones": opciones}, sort_keys=True, default=str)
+        return hashlib.sha256(contenido.encode()).hexdigest()
+
+    def enviar(self, dfs, huellas_archivos, opciones=None, sesion=None):
+        """
+        Encola un trabajo, o reutiliza uno idéntico que esté en curso o terminado sin error.
+
+        Parámetros:
+        - dfs (dict): DataFrames ya leídos, por clave de CLAVES_PROCESO.
+        - huellas_archivos (dict): sha256 de cada archivo subido, por clave (IngestaEnSegundoPlano.huellas).
+        - opciones (dict): Argumentos de process_data.
+        - sesion (str): Identificador de la sesión que lo pide (solo informativo).
+
+        Retorna:
+        - str: Identificador del trabajo.
+        """
+        opciones = dict(opciones or {})
+        huella = self.huella(huellas_archivos, opciones)
+        self.limpiar()
+        with self.lock:
+            existente = self.trabajos.get(self.por_huella.get(huella))
+            if existente is not None and not (existente.futuro.done() and existente.futuro.exception()):
+                existente.sesiones.add(sesion)
+                return existente.id
+
+            id_trabajo = uuid.uuid4().hex[:12]
+            directorio = os.path.join(self.directorio, id_trabajo)
+            os.makedirs(directorio)
+            trabajo = _Trabajo(id_trabajo, huella, directorio)
+            trabajo.sesiones.add(sesion)
+            transporte = TransporteArrow() if self.transporte else None
+            if transporte is not None:
+                dfs = transporte.enviar_varios(dfs)
+            trabajo.futuro = self.pool.submit(_ejecutar_trabajo, dfs, opciones, directorio, huellas_archivos)
+            trabajo.futuro.add_done_callback(
+                lambda _, trabajo=trabajo, transporte=transporte: self._terminar(trabajo, transporte))
+            self.trabajos[id_trabajo] = trabajo
+            self.por_huella[huella] = id_trabajo
+            return id_trabajo
+
+    @staticmethod
+    def _terminar(trabajo, transporte):
+        """Marca el trabajo como terminado (o cancelado) y borra sus tablas compartidas."""
+        trabajo.terminado = time.time()
+        if transporte is not None:
+            transporte.cerrar()
+
+    def posicion_en_cola(self, id_trabajo):
+        """Trabajos que se enviaron antes que este y todavía no empiezan a ejecutarse (0 = no espera)."""
+        trabajo = self.trabajos[id_trabajo]
+        with self.lock:
+            return sum(1 for otro in self.trabajos.values()
+                       if otro.creado < trabajo.creado and not otro.futuro.done()
+                       and not os.path.exists(os.path.join(otro.directorio, ARCHIVO_PROGRESO)))
+
+    def estado(self, id_trabajo):
+        """
+        Estado de un trabajo para mostrarlo en la sesión.
+
+        Retorna:
+        - dict con 'estado' ('en cola', 'ejecutando', 'listo', 'error' o 'desconocido'), 'etapa',
+          'fraccion' (0 a 1), 'error' y, si terminó, 'salidas' (rutas de CSV y Excel y filas).
+        """
+        trabajo = self.trabajos.get(id_trabajo)
+        if trabajo is None:
+            return {"estado": "desconocido", "etapa": "", "fraccion": 0.0, "error": "El trabajo ya no existe."}
+        futuro = trabajo.futuro
+        if futuro.done():
+            error = futuro.exception()
+            if error is not None:
+                return {"estado": "error", "etapa": "", "fraccion": 1.0, "error": f"{type(error).__name__}: {error}"}
+            return {"estado": "listo", "etapa": "listo", "fraccion": 1.0, "error": "", "salidas": futuro.result()}
+
+        ruta_progreso = os.path.join(trabajo.directorio, ARCHIVO_PROGRESO)
+        if not os.path.exists(ruta_progreso):
+            return {"estado": "en cola", "etapa": f"{self.posicion_en_cola(id_trabajo)} trabajo(s) antes",
+                    "fraccion": 0.0, "error": ""}
+        with open(ruta_progreso, encoding="utf-8") as f:
+            progreso = json.load(f)
+        return {"estado": "ejecutando", "etapa": progreso["etapa"], "fraccion": progreso["fraccion"], "error": ""}
+
+    def limpiar(self):
+        """Borra los trabajos terminados hace más de duracion_resultados segundos y sus salidas."""
+        limite = time.time() - self.duracion_resultados
+        with self.lock:
+            vencidos = [trabajo for trabajo in self.trabajos.values()
+                        if trabajo.terminado is not None and trabajo.terminado < limite]
+            for trabajo in vencidos:
+                del self.trabajos[trabajo.id]
+                if self.por_huella.get(trabajo.huella) == trabajo.id:
+                    del self.por_huella[trabajo.huella]
+                shutil.rmtree(trabajo.directorio, ignore_errors=True)
+
+    def cerrar(self):
+        """Cancela los trabajos en cola y detiene el pool."""
+        self.pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,135 @@
+import hashlib
+import threading
+import time
+
+import pandas as pd
+from utilities.process_dataframes import CoincidenciaBuscadorFinal, inmovilizadosConverted
+from utilities.tipos_cambio import ServicioTipoCambio
+
+#--------------------------------------------
+# REGISTRO EN MEMORIA DE LOS DATOS DE REFERENCIA
+#--------------------------------------------
+
+# Segundos que una forma procesada se reutiliza antes de reconstruirla aunque su versión no cambie
+DURACION_REFERENCIA = 12 * 3600
+
+
+def version_de_datos(df):
+    """
+    Versión del contenido de un DataFrame: sha256 de sus columnas y del hash por fila de sus valores
+    (vectorizado con pandas, más barato que volver a procesar la tabla, pero la recorre entera). Solo
+    se usa cuando no se conoce una versión del archivo de origen (ver RegistroReferencia.preparar).
+    """
+    huella = hashlib.sha256()
+    huella.update(repr((list(map(str, df.columns)), df.shape)).encode())
+    huella.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return huella.hexdigest()
+
+
+class _Entrada:
+    """Forma procesada de un dato de referencia, con su versión y el momento en que se construyó."""
+    def __init__(self, version, valor):
+        self.version = version
+        self.valor = valor
+        self.creada = time.time()
+        self.usos = 0
+
+
+class RegistroReferencia:
+    """
+    Formas procesadas e indexadas de los datos de referencia (CRITICOS, INMOVILIZADOS y tipos de
+    cambio), que cambian poco entre ejecuciones. Se conservan en memoria del proceso y se reutilizan
+    mientras la versión de la tabla de origen no cambie y no hayan pasado `duracion` segundos; así
+    cada ejecución solo procesa los reportes transaccionales (ME5A, ME2N, ZMM621, ...).
+
+    Se guarda una sola versión por dato: una tabla nueva reemplaza a la anterior. El registro es
+    seguro entre hilos (sesiones de Streamlit); las formas guardadas se comparten y no deben
+    modificarse en el lugar.
+
+    Uso:
+        referencia = REGISTRO_REFERENCIA.preparar(df_criticos, df_inmovilizados, df_tipos_cambio)
+        referencia['indice_criticos'], referencia['inmovilizados'], referencia['tipos_cambio']
+    """
+    def __init__(self, duracion=DURACION_REFERENCIA):
+        self.duracion = duracion
+        self._entradas = {}
+        self.lock = threading.RLock()
+
+    def obtener(self, nombre, version, construir):
+        """
+        Devuelve la forma procesada `nombre` si está en el registro con la misma versión y vigente;
+        si no, la construye con `construir()` y la guarda.
+        """
+        with self.lock:
+            entrada = self._entradas.get(nombre)
+            if (entrada is None or entrada.version != version
+                    or time.time() - entrada.creada > self.duracion):
+                entrada = _Entrada(version, construir())
+                self._entradas[nombre] = entrada
+                print(f"Referencia '{nombre}' procesada (versión {str(version)[:12]})")
+            entrada.usos += 1
+            return entrada.valor
+
+    def invalidar(self, nombre=None):
+        """Descarta una forma procesada (o todas), para forzar su reconstrucción en el próximo uso."""
+        with self.lock:
+            if nombre is None:
+                self._entradas.clear()
+            else:
+                self._entradas.pop(nombre, None)
+
+    def estado(self):
+        """Tabla con la versión, la antigüedad (segundos) y los usos de cada forma procesada."""
+        ahora = time.time()
+        with self.lock:
+            filas = [{'Dato': nombre, 'Versión': str(entrada.version)[:12],
+                      'Antigüedad (s)': round(ahora - entrada.creada, 1), 'Usos': entrada.usos}
+                     for nombre, entrada in self._entradas.items()]
+        return pd.DataFrame(filas, columns=['Dato', 'Versión', 'Antigüedad (s)', 'Usos'])
+
+    def preparar(self, df_criticos, df_inmovilizados, df_tipos_cambio, versiones=None):
+        """
+        Formas procesadas de los datos de referencia para process_data.
+
+        Parámetros:
+        - df_criticos, df_inmovilizados, df_tipos_cambio (DataFrame): Tablas tal como se leyeron.
+          df_tipos_cambio también puede ser un ServicioTipoCambio ya construido (se usa tal cual).
+          df_inmovilizados puede ser None (p. ej. en vista previa, donde es una muestra que no debe
+          reemplazar a la tabla completa en el registro); entonces 'inmovilizados' es None.
+        - versiones (dict): Versión de cada tabla ('criticos', 'inmovilizados', 'tipos_cambio'), por
+          ejemplo el sha256 del archivo subido; las que falten se calculan con version_de_datos.
+
+        Retorna:
+        - dict: 'indice_criticos' (CoincidenciaBuscadorFinal sobre 'Código SAP.'), 'inmovilizados'
+          (resultado de inmovilizadosConverted) y 'tipos_cambio' (ServicioTipoCambio).
+        """
+        versiones = dict(versiones or {})
+        for nombre, df in (('criticos', df_criticos), ('inmovilizados', df_inmovilizados),
+                           ('tipos_cambio', df_tipos_cambio)):
+            if nombre not in versiones and isinstance(df, pd.DataFrame):
+                versiones[nombre] = version_de_datos(df)
+
+        indice_criticos = self.obtener('criticos', versiones['criticos'],
+                                       lambda: CoincidenciaBuscadorFinal.desde_busqueda(df_criticos, 'Código SAP.'))
+        inmovilizados = None
+        if df_inmovilizados is not None:
+            # Los días inmovilizados se cuentan hasta hoy: la forma procesada vale solo por el día
+            version_inmovilizados = f"{versiones['inmovilizados']}|{versiones['criticos']}|{pd.Timestamp.now().date()}"
+            inmovilizados = self.obtener('inmovilizados', version_inmovilizados,
+                                         lambda: inmovilizadosConverted(df_inmovilizados, df_criticos, indice_criticos))
+        if isinstance(df_tipos_cambio, ServicioTipoCambio):
+            tipos_cambio = df_tipos_cambio
+        else:
+            tipos_cambio = self.obtener('tipos_cambio', versiones['tipos_cambio'],
+                                        lambda: ServicioTipoCambio(df_tipos_cambio))
+        return {
+            'indice_criticos': indice_criticos,
+            # Copia superficial: quien la use puede agregar columnas sin tocar la guardada
+            'inmovilizados': None if inmovilizados is None else inmovilizados.copy(deep=False),
+            'tipos_cambio': tipos_cambio,
+        }
+
+
+# Registro compartido por todas las ejecuciones del proceso (sesiones de Streamlit, workers de la
+# cola de trabajos, vigilancia de carpeta)
+REGISTRO_REFERENCIA = RegistroReferencia()
@@ -0,0 +1,171 @@
+import numpy as np
+import pandas as pd
+
+#--------------------------------------------
+# DIFERENCIAS ENTRE DOS REPORTES (MES A MES)
+#--------------------------------------------
+
+LLAVES_DIFERENCIA = ['COMODIN SOLPED', 'COMODIN OC']
+
+# Columnas que cambian solas de un mes a otro (se calculan contra la fecha de hoy): no se comparan
+COLUMNAS_IGNORADAS = ['DEMORA EN GENERAR OC (DIAS)', 'DEMORA EN LIBERACIONES DE OC']
+
+# Columnas de estado cuyas transiciones (valor anterior -> actual) se resumen
+COLUMNAS_SEGUIMIENTO = ['TIPO COMPROMETIDO SUGERENCIA', 'Estado factura', 'Estado HES/HEM', 'Estado liberación',
+                        'Estado Inmovilizado']
+
+AGREGADA = 'AGREGADA'
+ELIMINADA = 'ELIMINADA'
+MODIFICADA = 'MODIFICADA'
+
+_OCURRENCIA = '_ocurrencia'
+
+
+def _hash_columna(serie, como):
+    """Hash por fila de una columna; `como` ('float', 'str' o None) iguala tipos distintos entre reportes."""
+    if como == 'float':
+        serie = pd.to_numeric(serie, errors='coerce').astype(float)
+    elif como == 'str':
+        serie = serie.astype(object).where(serie.notna(), None).astype(str)
+    return pd.util.hash_pandas_object(serie, index=False).to_numpy()
+
+
+def _tipo_comun(anterior, actual):
+    """Cómo comparar una columna que puede tener tipos distintos en cada reporte."""
+    if anterior.dtype == actual.dtype:
+        return None
+    if pd.api.types.is_numeric_dtype(anterior) and pd.api.types.is_numeric_dtype(actual):
+        return 'float'
+    return 'str'
+
+
+def _con_ocurrencia(df, llaves):
+    """Llaves del reporte más el número de ocurrencia de cada llave (las uniones pueden repetirlas)."""
+    claves = df[llaves].reset_index(drop=True)
+    claves[_OCURRENCIA] = claves.groupby(llaves, sort=False, dropna=False).cumcount()
+    claves['_fila'] = np.arange(len(claves))
+    return claves
+
+
+class DiferenciaReportes:
+    """
+    Resultado de comparar_reportes.
+
+    - filas: una fila por registro agregado, eliminado o modificado, con sus llaves, 'Cambio' y
+      'Columnas modificadas'.
+    - detalle: una fila por celda modificada: llaves, 'Columna', 'Valor anterior' y 'Valor actual'.
+    """
+    def __init__(self, filas, detalle, columnas):
+        self.filas = filas
+        self.detalle = detalle
+        self.columnas = columnas
+
+    def resumen(self):
+        """Registros por tipo de cambio y celdas modificadas por columna."""
+        por_cambio = self.filas['Cambio'].value_counts().reindex([AGREGADA, ELIMINADA, MODIFICADA], fill_value=0)
+        por_columna = self.detalle['Columna'].value_counts()
+        return pd.concat([
+            pd.DataFrame({'Grupo': 'Cambio', 'Valor': por_cambio.index, 'Registros': por_cambio.to_numpy()}),
+            pd.DataFrame({'Grupo': 'Columna modificada', 'Valor': por_columna.index,
+                          'Registros': por_columna.to_numpy()}),
+        ], ignore_index=True)
+
+    def transiciones(self, columnas=COLUMNAS_SEGUIMIENTO):
+        """Conteo de transiciones 'Valor anterior' -> 'Valor actual' de las columnas de estado."""
+        detalle = self.detalle[self.detalle['Columna'].isin(columnas)]
+        if detalle.empty:
+            return pd.DataFrame(columns=['Columna', 'Valor anterior', 'Valor actual', 'Registros'])
+        pares = detalle[['Columna', 'Valor anterior', 'Valor actual']].astype(str)
+        return (pares.value_counts(sort=False).rename('Registros').reset_index()
+                .sort_values(['Columna', 'Registros'], ascending=[True, False], ignore_index=True))
+
+    def hojas(self):
+        """Hojas para exportar la comparación junto al reporte."""
+        return {
+            'DIF_RESUMEN': self.resumen(),
+            'DIF_TRANSICIONES': self.transiciones(),
+            'DIF_REGISTROS': self.filas,
+            'DIF_DETALLE': self.detalle,
+        }
+
+
+def comparar_reportes(anterior, actual, llaves=LLAVES_DIFERENCIA, columnas=None, ignorar=COLUMNAS_IGNORADAS):
+    """
+    Compara dos reportes de process_data (por ejemplo, el del mes anterior y el actual).
+
+    Cada registro se identifica por `llaves` y su número de ocurrencia dentro de ellas. Se calcula un
+    hash por columna y fila (una pasada vectorizada por columna); los registros cuyo hash combinado
+    difiere son los modificados y la comparación de los hashes por columna da el detalle de cada
+    celda, sin recorrer filas en Python.
+
+    Parámetros:
+    - anterior, actual (DataFrame): Reportes a comparar.
+    - llaves (list): Columnas que identifican un registro.
+    - columnas (list): Columnas a comparar (por defecto, las comunes a ambos reportes menos las llaves).
+    - ignorar (list): Columnas que no se comparan (por defecto, las DEMORA que dependen de la fecha de hoy).
+
+    Retorna:
+    - DiferenciaReportes
+    """
+    if columnas is None:
+        columnas = [col for col in actual.columns
+                    if col in anterior.columns and col not in llaves and col not in ignorar]
+
+    claves_ant = _con_ocurrencia(anterior, llaves)
+    claves_act = _con_ocurrencia(actual, llaves)
+    union = claves_ant.merge(claves_act, on=llaves + [_OCURRENCIA], how='outer', suffixes=('_ant', '_act'),
+                             indicator=True, sort=False)
+    solo_ant = union['_merge'].to_numpy() == 'left_only'
+    solo_act = union['_merge'].to_numpy() == 'right_only'
+    ambos = ~(solo_ant | solo_act)
+    filas_ant = union['_fila_ant'].to_numpy()[ambos].astype(np.int64)
+    filas_act = union['_fila_act'].to_numpy()[ambos].astype(np.int64)
+
+    # Hashes por columna de los registros presentes en ambos reportes
+    distintos = np.zeros((len(filas_ant), len(columnas)), dtype=bool)
+    for j, col in enumerate(columnas):
+        como = _tipo_comun(anterior[col], actual[col])
+        hash_ant = _hash_columna(anterior[col], como)[filas_ant]
+        hash_act = _hash_columna(actual[col], como)[filas_act]
+        distintos[:, j] = hash_ant != hash_act
+    modificados = distintos.any(axis=1)
+    distintos = distintos[modificados]
+
+    # Detalle por celda modificada
+    pos_fila, pos_col = np.nonzero(distintos)
+    filas_ant_mod = filas_ant[modificados]
+    filas_act_mod = filas_act[modificados]
+    llaves_mod = union.loc[ambos, llaves].to_numpy()[modificados]
+    partes = []
+    for j, col in enumerate(columnas):
+        en_col = pos_col == j
+        if not en_col.any():
+            continue
+        filas = pos_fila[en_col]
+        parte = pd.DataFrame(llaves_mod[filas], columns=llaves)
+        parte['Columna'] = col
+        parte['Valor anterior'] = anterior[col].to_numpy()[filas_ant_mod[filas]]
+        parte['Valor actual'] = actual[col].to_numpy()[filas_act_mod[filas]]
+        parte['_registro'] = filas
+        partes.append(parte)
+    if partes:
+        detalle = pd.concat(partes, ignore_index=True).sort_values('_registro', kind='stable', ignore_index=True)
+    else:
+        detalle = pd.DataFrame(columns=llaves + ['Columna', 'Valor anterior', 'Valor actual', '_registro'])
+
+    # Columnas modificadas de cada registro, en el orden del reporte
+    nombres = np.array(columnas, dtype=object)
+    texto = np.full(len(filas_ant_mod), '', dtype=object)
+    for j in range(len(columnas)):
+        marca = distintos[:, j]
+        texto[marca] = np.where(texto[marca] == '', nombres[j], texto[marca] + ', ' + nombres[j])
+
+    registros = pd.concat([
+        pd.DataFrame({'Cambio': AGREGADA, **{col: union.loc[solo_act, col].to_numpy() for col in llaves},
+                      'Columnas modificadas': ''}),
+        pd.DataFrame({'Cambio': ELIMINADA, **{col: union.loc[solo_ant, col].to_numpy() for col in llaves},
+                      'Columnas modificadas': ''}),
+        pd.DataFrame({'Cambio': MODIFICADA, **{col: llaves_mod[:, i] for i, col in enumerate(llaves)},
+                      'Columnas modificadas': texto}),
+    ], ignore_index=True)
+    return DiferenciaReportes(registros, detalle.drop(columns='_registro'), columnas)
@@ -0,0 +1,246 @@
+import numpy as np
+import pandas as pd
+from utilities.fechas import FECHAS_VACIAS_SAP, parsear_fechas
+
+#--------------------------------------------
+# ESQUEMAS DE LOS REPORTES SAP
+#--------------------------------------------
+
+class ErrorDeEsquema(ValueError):
+    """
+    Un reporte subido no cumple su esquema. `problemas` tiene un texto por columna con el detalle
+    (columna faltante, nulos no permitidos o valores que no se pueden convertir).
+    """
+    def __init__(self, problemas):
+        self.problemas = problemas
+        super().__init__("Los archivos no cumplen el esquema esperado:\n" + "\n".join(f"- {p}" for p in problemas))
+
+
+def _columna(tipo=None, nulos=True, alias=()):
+    """
+    Especificación de una columna:
+    - tipo: 'float', 'int', 'str', 'fecha' o None (solo se exige que la columna exista).
+    - nulos: si se permiten valores nulos.
+    - alias: otros nombres con los que SAP exporta la columna (se estandarizan más adelante).
+    """
+    return {'tipo': tipo, 'nulos': nulos, 'alias': tuple(alias)}
+
+
+# Columnas que el proceso usa de cada reporte. Los tipos 'float', 'int' y 'str' son los mismos con los
+# que se arman las columnas COMODIN, para que los hash no cambien.
+ESQUEMAS = {
+    'ME5A': {
+        'Solicitud de pedido': _columna('float', nulos=False),
+        'Material': _columna('str'),
+        'Pos.solicitud pedido': _columna('int', nulos=False),
+        # Vacía en las SOLPED abiertas que todavía no tienen orden de compra
+        'Posición de pedido': _columna('int'),
+        'Pedido': _columna('float'),
+        'Solicitante': _columna(alias=['SOLICITANTE']),
+        'Indicador de borrado': _columna(),
+        'Indicador liberación': _columna(alias=['Indicador de Liberación']),
+        'Fecha de solicitud': _columna('fecha'),
+        'Unidad de medida': _columna(),
+        'Cantidad solicitada': _columna(),
+        'Texto breve': _columna(),
+    },
+    'ZMM621': {
+        'Nro Pedido': _columna('float', nulos=False),
+        'Material': _columna('str'),
+        'Pos. Pedido': _columna('int', nulos=False),
+        'Orden de mantenimiento': _columna(alias=['Numero de orden']),
+        'Solicitante de la solicitud pedido': _columna(),
+        'Fecha de registro.1': _columna('fecha'),
+        'Fecha contable': _columna('fecha'),
+        'Fecha Doc. Fact.': _columna(),
+        'Fecha de aprobación de la orden de compr': _columna('fecha'),
+        'Condición de pago del pedido': _columna(),
+        'Valor net. Solped': _columna(),
+        'Numero de activo': _columna(),
+    },
+    'IW38': {
+        'Orden': _columna(),
+        'Pto.tbjo.responsable': _columna(),
+        'Denominación de la ubicación técnica': _columna(),
+        'Denominación de objeto técnico': _columna(),
+        'Equipo': _columna(),
+    },
+    'ME2N': {
+        'Documento compras': _columna('float', nulos=False),
+        'Material': _columna('str'),
+        'Posición': _columna('int', nulos=False),
+        'Solicitante': _columna(alias=['SOLICITANTE']),
+        'Proveedor/Centro suministrador': _columna(),
+        'Estado liberación': _columna(),
+        'Indicador de borrado': _columna(),
+        'Fecha documento': _columna('fecha'),
+        'Por entregar (cantidad)': _columna(),
+        'Cantidad de pedido': _columna(),
+        'Precio neto': _columna(),
+        'Moneda': _columna(),
+        'Por entregar (valor)': _columna(),
+        'Ind.liberación': _columna(),
+        'Estrategia liberac.': _columna(alias=['ESTRATÉGIA DE LIBERACIÓN']),
+    },
+    'ZMB52': {
+        'Material': _columna(),
+        'Valor libre util.': _columna('float'),
+        'Libre utilización': _columna('float'),
+    },
+    'MCBE': {
+        'Material': _columna(),
+        'Últ.salida': _columna(),
+        'Últ.cons.': _columna(),
+        ' Últ.mov.': _columna(),
+    },
+    'CRITICOS': {
+        'Código SAP.': _columna(),
+    },
+    'INMOVILIZADOS': {
+        'Material': _columna(),
+        'Valor stock': _columna('float'),
+        ' Últ.mov.': _columna('fecha'),
+        'Tipo de Repuesto': _columna(),
+    },
+    'TIPOS_CAMBIO': {
+        'Año': _columna(),
+        'Mes': _columna(),
+    },
+}
+
+# Nombres con que el pipeline se refiere a algunos reportes (argumentos de process_data y hojas
+# procesadas) y el esquema que les corresponde
+REPORTES_DERIVADOS = {
+    'ZMM621_FECHAAPROBACION': 'ZMM621',
+    'ME2N_OC': 'ME2N',
+}
+
+# Cuántas filas de ejemplo se muestran por problema
+EJEMPLOS_POR_PROBLEMA = 5
+
+
+def _nombre_reporte(nombre):
+    """
+    Acepta 'ME5A', 'df_ME5A', 'criticos', 'df_ME2N_OC', ... y devuelve la clave de ESQUEMAS.
+    Lanza KeyError si el reporte no tiene esquema (así un nombre mal escrito no deja sin validar).
+    """
+    reporte = (nombre[3:] if nombre.startswith('df_') else nombre).upper()
+    reporte = REPORTES_DERIVADOS.get(reporte, reporte)
+    if reporte not in ESQUEMAS:
+        raise KeyError(f"El reporte '{nombre}' no tiene esquema. Reportes: {sorted(ESQUEMAS)}")
+    return reporte
+
+
+def _filas(mascara):
+    """Texto con las primeras filas de datos (empezando en 1) donde la máscara es verdadera."""
+    posiciones = np.flatnonzero(mascara)
+    ejemplos = ", ".join(str(pos + 1) for pos in posiciones[:EJEMPLOS_POR_PROBLEMA])
+    return f"{len(posiciones)} fila(s), p. ej. {ejemplos}"
+
+
+def _convertir(serie, tipo, nombre):
+    """
+    Convierte una columna a su tipo. Retorna la columna convertida y una máscara con los valores
+    no nulos que no se pudieron convertir. Si la columna ya tiene el tipo no se toca.
+    """
+    sin_errores = np.zeros(len(serie), dtype=bool)
+    if tipo == 'float':
+        if pd.api.types.is_float_dtype(serie):
+            return serie, sin_errores
+        convertida = pd.to_numeric(serie, errors='coerce').astype(float)
+        return convertida, (serie.notna() & convertida.isna()).to_numpy()
+    if tipo == 'int':
+        if pd.api.types.is_integer_dtype(serie):
+            return serie, sin_errores
+        convertida = pd.to_numeric(serie, errors='coerce')
+        malos = (serie.notna() & (convertida.isna() | (convertida % 1 != 0))).to_numpy()
+        if malos.any():
+            return serie, malos
+        if convertida.isna().any():
+            # Con vacíos: enteros de Python y NaN (object), para que las llaves COMODIN sigan siendo '10' y no '10.0'
+            return convertida.astype('Int64').astype(object).where(convertida.notna(), np.nan), sin_errores
+        return convertida.astype(np.int64), sin_errores
+    if tipo == 'str':
+        if pd.api.types.infer_dtype(serie, skipna=False) == 'string':
+            return serie, sin_errores
+        return serie.astype(str), sin_errores
+    if tipo == 'fecha':
+        convertida = parsear_fechas(serie, nombre)
+        if serie.dtype == object:
+            vacios = serie.isna() | serie.astype(str).str.strip().isin(FECHAS_VACIAS_SAP + [''])
+        else:
+            vacios = serie.isna()
+        return convertida, (~vacios & convertida.isna()).to_numpy()
+    return serie, sin_errores
+
+
+def _validar(df, reporte):
+    """Valida y convierte un reporte; retorna el DataFrame convertido y la lista de problemas."""
+    problemas = []
+    convertido = df.copy(deep=False)
+    for columna, spec in ESQUEMAS[reporte].items():
+        nombre = next((n for n in (columna,) + spec['alias'] if n in df.columns), None)
+        if nombre is None:
+            alias = f" (o {', '.join(spec['alias'])})" if spec['alias'] else ""
+            problemas.append(f"{reporte}: falta la columna '{columna}'{alias}.")
+            continue
+
+        serie = df[nombre]
+        if not spec['nulos']:
+            nulos = serie.isna().to_numpy()
+            if nulos.any():
+                problemas.append(f"{reporte}: la columna '{nombre}' no admite vacíos; {_filas(nulos)}.")
+                continue
+
+        convertida, malos = _convertir(serie, spec['tipo'], nombre)
+        if malos.any():
+            ejemplos = serie[malos].astype(str).unique()[:EJEMPLOS_POR_PROBLEMA]
+            problemas.append(f"{reporte}: la columna '{nombre}' tiene valores que no son de tipo "
+                             f"{spec['tipo']} ({', '.join(ejemplos)}); {_filas(malos)}.")
+            continue
+        if convertida is not serie:
+            convertido[nombre] = convertida
+    return convertido, problemas
+
+
+def validar_y_convertir(df, nombre):
+    """
+    Valida un reporte contra su esquema y convierte sus columnas en una sola pasada.
+
+    Parámetros:
+    - df (DataFrame): Reporte recién cargado.
+    - nombre (str): Reporte ('ME5A', 'df_ME5A', 'criticos', 'ME2N_OC', ...; ver REPORTES_DERIVADOS).
+
+    Retorna:
+    - DataFrame con las columnas del esquema convertidas (el DataFrame recibido no se modifica).
+
+    Lanza ErrorDeEsquema con todos los problemas encontrados en el reporte y KeyError si el
+    reporte no tiene esquema.
+    """
+    reporte = _nombre_reporte(nombre)
+    convertido, problemas = _validar(df, reporte)
+    if problemas:
+        raise ErrorDeEsquema(problemas)
+    return convertido
+
+
+def validar_reportes(dfs):
+    """
+    Valida todos los reportes de una carga antes de procesarlos y reporta juntos los problemas de
+    todos los archivos.
+
+    Parámetros:
+    - dfs (dict): DataFrames por nombre de reporte (claves de ARCHIVOS_PERIODO o de main.py).
+
+    Retorna:
+    - dict: Los mismos reportes ya convertidos.
+    """
+    convertidos = {}
+    problemas = []
+    for nombre, df in dfs.items():
+        reporte = _nombre_reporte(nombre)
+        convertidos[nombre], problemas_reporte = _validar(df, reporte)
+        problemas.extend(problemas_reporte)
+    if problemas:
+        raise ErrorDeEsquema(problemas)
+    return convertidos
@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+
+#--------------------------------------------
+# INGESTA DE FECHAS SAP
+#--------------------------------------------
+
+# Formatos de texto que se prueban al detectar fechas SAP, en orden de preferencia
+FORMATOS_FECHA = ['%d.%m.%Y', '%d/%m/%Y', '%Y-%m-%d', '%d-%m-%Y', '%Y%m%d',
+                  '%d.%m.%Y %H:%M:%S', '%d/%m/%Y %H:%M:%S', '%Y-%m-%d %H:%M:%S']
+
+# Números de serie de Excel: días desde 1899-12-30, hasta 9999-12-31
+ORIGEN_EXCEL = pd.Timestamp('1899-12-30')
+MAXIMO_SERIAL_EXCEL = 2958465
+
+# Textos con los que SAP exporta una fecha vacía
+FECHAS_VACIAS_SAP = ['00.00.0000', '00/00/0000', '0000-00-00', '00000000']
+
+# Formato detectado por columna, para no volver a detectarlo en cada carga
+_formatos_detectados = {}
+
+
+def detectar_formato(textos, clave=None, muestra=50):
+    """
+    Detecta el formato de fecha de una serie de textos probando FORMATOS_FECHA sobre una muestra.
+    Si se da `clave` (por ejemplo, el nombre de la columna), el formato detectado se guarda y en
+    las siguientes cargas solo se comprueba que siga siendo válido.
+
+    Retorna:
+    - str o None: Formato para pd.to_datetime, o None si ninguno interpreta toda la muestra.
+    """
+    ejemplos = pd.Series(textos.unique()[:muestra])
+    if ejemplos.empty:
+        return None
+
+    guardado = _formatos_detectados.get(clave)
+    candidatos = ([guardado] if guardado else []) + [fmt for fmt in FORMATOS_FECHA if fmt != guardado]
+    for formato in candidatos:
+        if pd.to_datetime(ejemplos, format=formato, errors='coerce').notna().all():
+            if clave is not None:
+                _formatos_detectados[clave] = formato
+            return formato
+    return None
+
+
+def parsear_fechas(serie, clave=None):
+    """
+    Convierte una columna de fechas SAP a datetime64[ns] en una sola pasada vectorizada.
+
+    Acepta en la misma columna fechas reales (datetime/Timestamp), números de serie de Excel y
+    textos ('dd.mm.aaaa' y los demás FORMATOS_FECHA, con detección de formato cacheada por
+    `clave`). Los textos que no siguen el formato detectado en la muestra se interpretan uno a uno.
+    Los nulos, vacíos ('00.00.0000' incluido) y valores no interpretables quedan como NaT (los textos
+    no interpretables se cuentan en un aviso); no se usan fechas centinela. Si la columna ya es
+    datetime64 se devuelve tal cual.
+
+    Parámetros:
+    - serie (Series): Columna a convertir.
+    - clave (str): Nombre con el que se cachea el formato detectado (normalmente la columna).
+
+    Retorna:
+    - Series: Columna datetime64[ns] con el mismo índice.
+    """
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie
+    serie = pd.Series(serie)
+    # Solo fechas reales y nulos (celdas de fecha leídas de Excel): una conversión, sin buscar seriales ni textos
+    if serie.dtype == object and pd.api.types.infer_dtype(serie, skipna=True) in ('datetime', 'date'):
+        convertidas = pd.to_datetime(serie, errors='coerce').to_numpy(dtype='datetime64[ns]')
+        return pd.Series(convertidas, index=serie.index, name=serie.name)
+    fechas = np.full(len(serie), np.datetime64('NaT'), dtype='datetime64[ns]')
+    if pd.api.types.is_bool_dtype(serie):
+        return pd.Series(fechas, index=serie.index)
+
+    # Números de serie de Excel
+    numeros = pd.to_numeric(serie, errors='coerce').to_numpy(dtype=float)
+    es_serial = (numeros >= 1) & (numeros <= MAXIMO_SERIAL_EXCEL)
+    if es_serial.any():
+        fechas[es_serial] = (ORIGEN_EXCEL + pd.to_timedelta(numeros[es_serial], unit='D')).to_numpy()
+
+    if serie.dtype == object:
+        pendientes = ~es_serial & serie.notna().to_numpy()
+        es_texto = np.zeros(len(serie), dtype=bool)
+        es_texto[pendientes] = serie[pendientes].map(lambda valor: isinstance(valor, str)).to_numpy(dtype=bool)
+
+        # Textos, con el formato detectado para la columna
+        if es_texto.any():
+            textos = serie[es_texto].str.strip()
+            textos = textos.mask(textos.isin(FECHAS_VACIAS_SAP), '')
+            formato = detectar_formato(textos[textos != ''], clave)
+            if formato is not None:
+                convertidas = pd.to_datetime(textos, format=formato, errors='coerce')
+                # La muestra no cubre toda la columna: los textos que no siguen el formato detectado
+                # se interpretan uno a uno en vez de quedar como NaT
+                fallidas = convertidas.isna() & (textos != '')
+                if fallidas.any():
+                    convertidas[fallidas] = pd.to_datetime(textos[fallidas], errors='coerce', dayfirst=True,
+                                                           format='mixed')
+            else:
+                convertidas = pd.to_datetime(textos, errors='coerce', dayfirst=True, format='mixed')
+            sin_fecha = int((convertidas.isna() & (textos != '')).sum())
+            if sin_fecha:
+                print(f"Precaución: {sin_fecha} textos de la columna {clave or serie.name} no se pudieron "
+                      f"interpretar como fecha y quedan vacíos")
+            fechas[es_texto] = convertidas.to_numpy(dtype='datetime64[ns]')
+
+        # Fechas reales (datetime, date, Timestamp)
+        otras = pendientes & ~es_texto
+        if otras.any():
+            fechas[otras] = pd.to_datetime(serie[otras], errors='coerce').to_numpy(dtype='datetime64[ns]')
+
+    return pd.Series(fechas, index=serie.index, name=serie.name)
+
+
+def asegurar_fechas(df, columnas):
+    """
+    Garantiza que las columnas indicadas sean datetime64. Las que ya lo son (parseadas en la
+    ingesta) no se vuelven a procesar.
+    """
+    for columna in columnas:
+        if columna in df.columns and not pd.api.types.is_datetime64_any_dtype(df[columna]):
+            df[columna] = parsear_fechas(df[columna], columna)
+    return df
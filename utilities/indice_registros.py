@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+
+#--------------------------------------------
+# ÍNDICES DE BÚSQUEDA SOBRE EL REPORTE FINAL
+#--------------------------------------------
+
+# Columnas del reporte con índice de búsqueda
+COLUMNAS_INDICE = ['Pedido', 'Solicitud de pedido', 'Orden', 'Material']
+
+# Mayor carácter unicode: cota superior de todas las llaves que empiezan con un prefijo
+_FIN_PREFIJO = '\U0010ffff'
+
+
+def normalizar_llaves(valores):
+    """
+    Llaves de búsqueda como texto. Los números se escriben como enteros cuando lo son (en una
+    columna float, Pedido 4500012345.0 -> '4500012345'); los textos solo se recortan y pasan a
+    mayúsculas, sin convertirlos a número, para conservar los ceros a la izquierda de los códigos
+    SAP ('0001234' sigue siendo '0001234'). Los vacíos quedan como ''.
+    """
+    serie = pd.Series(valores)
+    if pd.api.types.is_float_dtype(serie):
+        vacios = serie.isna()
+        enteros = ~vacios & (serie % 1 == 0) & (serie.abs() < 2**63)
+        texto = serie.astype(str)
+        texto[enteros] = serie[enteros].astype('int64').astype(str)
+        texto[vacios] = ''
+        return texto.to_numpy(dtype=str)
+    if pd.api.types.is_integer_dtype(serie):
+        return serie.astype(str).to_numpy(dtype=str)
+    return np.array([_normalizar_consulta(valor) for valor in serie], dtype=str)
+
+
+def _normalizar_consulta(valor):
+    """normalizar_llaves para un solo valor (también la usa para las columnas object, valor por valor)."""
+    if valor is None:
+        return ''
+    if isinstance(valor, (int, np.integer)):
+        return str(int(valor))
+    if isinstance(valor, (float, np.floating)):
+        if np.isnan(valor):
+            return ''
+        return str(int(valor)) if np.isfinite(valor) and valor % 1 == 0 else str(valor)
+    texto = str(valor).strip().upper()
+    return '' if texto in ('NAN', 'NONE', 'NAT') else texto
+
+
+class IndiceRegistros:
+    """
+    Índices secundarios ordenados sobre columnas del reporte final: para cada columna, las llaves
+    normalizadas ordenadas y la posición de su fila en el reporte. Las búsquedas exactas y por
+    prefijo son dos searchsorted (O(log n)) en lugar de filtrar todo el reporte.
+
+    Uso:
+        indice = IndiceRegistros.desde_reporte(result)
+        result.iloc[indice.buscar('Pedido', 4500012345)]
+        result.iloc[indice.buscar_prefijo('Material', '1000')]
+    """
+    def __init__(self, llaves, posiciones, filas):
+        self.llaves = llaves
+        self.posiciones = posiciones
+        self.filas = filas
+
+    @classmethod
+    def desde_reporte(cls, result, columnas=COLUMNAS_INDICE):
+        """Construye los índices de las columnas indicadas que existan en el reporte."""
+        llaves = {}
+        posiciones = {}
+        for columna in columnas:
+            if columna not in result.columns:
+                continue
+            normalizadas = normalizar_llaves(result[columna].to_numpy())
+            orden = np.argsort(normalizadas, kind='stable')
+            llaves[columna] = normalizadas[orden]
+            posiciones[columna] = orden.astype(np.int64)
+        return cls(llaves, posiciones, len(result))
+
+    @property
+    def columnas(self):
+        return list(self.llaves)
+
+    def _rango(self, columna, desde, hasta):
+        if columna not in self.llaves:
+            raise KeyError(f"La columna '{columna}' no tiene índice. Disponibles: {self.columnas}")
+        llaves = self.llaves[columna]
+        inicio = np.searchsorted(llaves, desde, side='left')
+        fin = np.searchsorted(llaves, hasta, side='right')
+        return np.sort(self.posiciones[columna][inicio:fin])
+
+    def buscar(self, columna, valor):
+        """Posiciones (para .iloc) de las filas cuya llave es exactamente `valor`, en el orden del reporte."""
+        llave = _normalizar_consulta(valor)
+        return self._rango(columna, llave, llave)
+
+    def buscar_prefijo(self, columna, prefijo, limite=None):
+        """Posiciones de las filas cuya llave empieza con `prefijo` (como máximo `limite`, si se indica)."""
+        prefijo = _normalizar_consulta(prefijo)
+        if not prefijo:
+            return np.array([], dtype=np.int64)
+        posiciones = self._rango(columna, prefijo, prefijo + _FIN_PREFIJO)
+        return posiciones[:limite] if limite is not None else posiciones
+
+    def guardar(self, ruta):
+        """Guarda los índices en un .npz (junto al reporte que indexan)."""
+        arreglos = {'filas': np.array([self.filas])}
+        for columna in self.llaves:
+            arreglos[f"llaves::{columna}"] = self.llaves[columna]
+            arreglos[f"posiciones::{columna}"] = self.posiciones[columna]
+        np.savez(ruta, **arreglos)
+
+    @classmethod
+    def cargar(cls, ruta, reporte=None):
+        """
+        Carga índices guardados con `guardar`. Si se da el reporte, comprueba que tenga el mismo
+        número de filas que cuando se indexó.
+        """
+        with np.load(ruta, allow_pickle=False) as datos:
+            llaves = {nombre.split('::', 1)[1]: datos[nombre] for nombre in datos.files if nombre.startswith('llaves::')}
+            posiciones = {nombre.split('::', 1)[1]: datos[nombre] for nombre in datos.files
+                          if nombre.startswith('posiciones::')}
+            filas = int(datos['filas'][0])
+        if reporte is not None and len(reporte) != filas:
+            raise ValueError(f"El índice es de un reporte de {filas} filas y el reporte tiene {len(reporte)}.")
+        return cls(llaves, posiciones, filas)
@@ -0,0 +1,218 @@
+import hashlib
+import io
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import pandas as pd
+from utilities.esquemas import ErrorDeEsquema, validar_y_convertir
+from utilities.lectura import leer_MCBE, leer_inmovilizados
+from utilities.process_dataframes import validate_and_create_comodin_columns
+
+#--------------------------------------------
+# INGESTA DE REPORTES EN SEGUNDO PLANO
+#--------------------------------------------
+
+# Reportes a los que se les crean las columnas COMODIN al cargarlos
+REPORTES_COMODIN = ("ME5A", "ZMM621", "ME2N")
+
+# Hilos de lectura por sesión: la lectura de Excel usa sobre todo CPU en Python, así que más hilos
+# no la aceleran; dos bastan para que un archivo pequeño no espere detrás de uno grande
+TRABAJADORES_INGESTA = 2
+
+# Hilos del pool de lectura compartido por todas las sesiones de la aplicación (ver main.py)
+TRABAJADORES_INGESTA_COMPARTIDOS = 4
+
+
+def cargar_reporte(clave, archivo):
+    """
+    Lee un archivo de un periodo y aplica el preprocesamiento propio de su reporte:
+    encabezado real de MCBE e INMOVILIZADOS, validación de esquema y columnas COMODIN de ME5A,
+    ZMM621 y ME2N.
+
+    Parámetros:
+    - clave (str): Reporte ('ME5A', 'MCBE', 'inmovilizados', 'CRITICOS', ...; sin distinguir mayúsculas).
+    - archivo (str o archivo): Ruta o archivo Excel abierto.
+
+    Retorna:
+    - DataFrame listo para process_data.
+    - str: Mensaje de la creación de columnas COMODIN (vacío para los demás reportes).
+
+    Lanza ErrorDeEsquema si el archivo no cumple el esquema de su reporte (utilities.esquemas).
+    """
+    reporte = clave.upper()
+    if reporte == "MCBE":
+        df = leer_MCBE(archivo)
+    elif reporte == "INMOVILIZADOS":
+        df = leer_inmovilizados(archivo)
+    else:
+        df = pd.read_excel(archivo, engine='openpyxl')
+    if reporte in REPORTES_COMODIN:
+        # Valida el esquema y crea las columnas COMODIN
+        return validate_and_create_comodin_columns(df, f"df_{reporte}")
+    return validar_y_convertir(df, clave), ""
+
+
+class _Tarea:
+    """Lectura en curso de un archivo: su huella, el futuro y los tiempos de inicio y fin."""
+    def __init__(self, nombre, huella):
+        self.nombre = nombre
+        self.huella = huella
+        self.futuro = None
+        self.inicio = None
+        self.fin = None
+
+
+def _cancelar_tareas(tareas):
+    """Cancela las lecturas que no empezaron y suelta las demás (y sus DataFrames)."""
+    for tarea in tareas.values():
+        tarea.futuro.cancel()
+    tareas.clear()
+
+
+class IngestaEnSegundoPlano:
+    """
+    Lee, valida y crea las columnas COMODIN de cada archivo en un pool de hilos apenas se sube,
+    mientras el usuario sigue subiendo los demás. Pensado para guardarse en st.session_state
+    (una por sesión): en cada recarga de la página se vuelve a llamar a `enviar` con los archivos
+    de los file_uploader y solo se leen los que cambiaron.
+
+    Con `pool` las lecturas usan un ThreadPoolExecutor ajeno, p. ej. uno compartido por todas las
+    sesiones, que `cerrar` no apaga; si no, se crea uno propio de `trabajadores` hilos. Cuando la
+    ingesta se descarta (al terminar la sesión) sus lecturas pendientes se cancelan igual que con `cerrar`.
+    """
+    def __init__(self, trabajadores=TRABAJADORES_INGESTA, cargar=cargar_reporte, pool=None):
+        self.pool_propio = pool is None
+        self.pool = pool or ThreadPoolExecutor(max_workers=trabajadores, thread_name_prefix="ingesta")
+        self.cargar = cargar
+        self.tareas = {}
+        self._finalizador = weakref.finalize(self, _cancelar_tareas, self.tareas)
+
+    @staticmethod
+    def _contenido(archivo):
+        """Bytes del archivo (UploadedFile de Streamlit, archivo abierto o ruta)."""
+        if hasattr(archivo, 'getvalue'):
+            return archivo.getvalue()
+        if hasattr(archivo, 'read'):
+            archivo.seek(0)
+            return archivo.read()
+        with open(archivo, 'rb') as f:
+            return f.read()
+
+    def enviar(self, clave, archivo):
+        """
+        Encola la lectura de un archivo si es nuevo o cambió respecto del último enviado para esa clave.
+        Si archivo es None (se quitó del file_uploader) se descarta la lectura de esa clave.
+
+        Retorna:
+        - bool: True si se encoló una lectura nueva.
+        """
+        if archivo is None:
+            self.quitar(clave)
+            return False
+        contenido = self._contenido(archivo)
+        huella = hashlib.sha256(contenido).hexdigest()
+        tarea = self.tareas.get(clave)
+        if tarea is not None and tarea.huella == huella:
+            return False
+        self.quitar(clave)
+
+        tarea = _Tarea(getattr(archivo, 'name', str(archivo)), huella)
+        # Cada lectura trabaja sobre su propia copia en memoria, independiente del archivo subido. La
+        # tarea no referencia a la ingesta, para que descartarla cancele lo que sigue en cola
+        tarea.futuro = self.pool.submit(self._leer, self.cargar, tarea, clave, io.BytesIO(contenido))
+        self.tareas[clave] = tarea
+        return True
+
+    @staticmethod
+    def _leer(cargar, tarea, clave, contenido):
+        tarea.inicio = time.time()
+        try:
+            return cargar(clave, contenido)
+        finally:
+            tarea.fin = time.time()
+
+    def quitar(self, clave):
+        """Descarta la lectura de una clave y su DataFrame (se cancela si todavía no empezó)."""
+        tarea = self.tareas.pop(clave, None)
+        if tarea is not None:
+            tarea.futuro.cancel()
+
+    def estado(self, clave):
+        """
+        Estado de la lectura de una clave.
+
+        Retorna:
+        - str: 'sin archivo', 'en cola', 'procesando', 'listo' o 'error'.
+        - str: Detalle (tiempo transcurrido, mensaje COMODIN o error).
+        """
+        tarea = self.tareas.get(clave)
+        if tarea is None:
+            return 'sin archivo', ""
+        futuro = tarea.futuro
+        if not futuro.done():
+            if tarea.inicio is None:
+                return 'en cola', tarea.nombre
+            return 'procesando', f"{tarea.nombre} ({time.time() - tarea.inicio:.1f} s)"
+        error = futuro.exception()
+        if error is not None:
+            return 'error', f"{type(error).__name__}: {error}"
+        _, mensaje = futuro.result()
+        detalle = f"{tarea.nombre} ({tarea.fin - tarea.inicio:.1f} s)"
+        return 'listo', " ".join(f"{detalle} {mensaje}".split())
+
+    def progreso(self, claves):
+        """Fracción de las claves cuya lectura ya terminó (con o sin error)."""
+        terminadas = sum(1 for clave in claves if clave in self.tareas and self.tareas[clave].futuro.done())
+        return terminadas / len(claves) if claves else 1.0
+
+    def pendientes(self, claves):
+        """True si alguna de las claves tiene una lectura en cola o en curso."""
+        return any(clave in self.tareas and not self.tareas[clave].futuro.done() for clave in claves)
+
+    def huellas(self, claves):
+        """sha256 del contenido de cada archivo enviado, por clave (identifica la carga en la cola de trabajos)."""
+        return {clave: self.tareas[clave].huella for clave in claves if clave in self.tareas}
+
+    def resultados(self, claves, timeout=None):
+        """
+        Espera las lecturas de las claves y devuelve sus DataFrames.
+
+        Parámetros:
+        - claves (list): Reportes a devolver; todos deben haberse enviado.
+        - timeout (float): Segundos máximos de espera (None = sin límite).
+
+        Retorna:
+        - dict: DataFrame por clave.
+
+        Lanza KeyError si falta algún archivo, TimeoutError si no terminan a tiempo y ErrorDeEsquema con
+        los problemas de todos los archivos que no cumplen su esquema. Otros errores de lectura se
+        relanzan tal cual.
+        """
+        faltantes = [clave for clave in claves if clave not in self.tareas]
+        if faltantes:
+            raise KeyError(f"Faltan archivos: {faltantes}")
+        futuros = [self.tareas[clave].futuro for clave in claves]
+        _, sin_terminar = wait(futuros, timeout=timeout)
+        if sin_terminar:
+            raise TimeoutError(f"{len(sin_terminar)} archivo(s) siguen en lectura.")
+
+        dfs = {}
+        problemas = []
+        for clave, futuro in zip(claves, futuros):
+            error = futuro.exception()
+            if isinstance(error, ErrorDeEsquema):
+                problemas.extend(error.problemas)
+            elif error is not None:
+                raise error
+            else:
+                dfs[clave], _ = futuro.result()
+        if problemas:
+            raise ErrorDeEsquema(problemas)
+        return dfs
+
+    def cerrar(self):
+        """Cancela las lecturas en cola, suelta los DataFrames leídos y apaga el pool si es propio."""
+        self._finalizador()
+        if self.pool_propio:
+            self.pool.shutdown(wait=False, cancel_futures=True)
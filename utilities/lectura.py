@@ -0,0 +1,114 @@
+import pandas as pd
+from utilities.process_dataframes import COLUMNAS_INMOVILIZADOS
+
+#--------------------------------------------
+# LECTURA DE REPORTES CON ENCABEZADO DESPLAZADO
+#--------------------------------------------
+
+# Disposición de los reportes SAP cuyo encabezado no está en la primera fila:
+# - encabezado: columnas que deben aparecer juntas en la fila de encabezado.
+# - columnas: columnas a conservar (None = todas las del encabezado).
+# - omitir_primera_columna: la primera columna del reporte es un margen sin datos.
+# - filas_omitidas: filas fijas entre el encabezado y los datos (subtítulos del reporte).
+DISENOS_REPORTE = {
+    'MCBE': {
+        'encabezado': ['Material', 'Últ.salida', 'Últ.cons.', ' Últ.mov.'],
+        'columnas': None,
+        'omitir_primera_columna': True,
+        'filas_omitidas': 2,
+    },
+    'INMOVILIZADOS': {
+        'encabezado': COLUMNAS_INMOVILIZADOS,
+        'columnas': COLUMNAS_INMOVILIZADOS,
+        'omitir_primera_columna': False,
+        'filas_omitidas': 0,
+    },
+}
+
+# Filas iniciales que se leen para detectar el encabezado
+FILAS_DETECCION = 30
+
+
+def _rebobinar(archivo):
+    """Vuelve al inicio los archivos abiertos (p. ej. los subidos en Streamlit) para poder leerlos de nuevo."""
+    if hasattr(archivo, 'seek'):
+        archivo.seek(0)
+
+
+def detectar_disposicion(muestra, diseno):
+    """
+    Ubica el encabezado y el inicio de los datos en las primeras filas de un reporte.
+
+    Parámetros:
+    - muestra (DataFrame): Primeras filas de la hoja, leídas con header=None.
+    - diseno (dict): Entrada de DISENOS_REPORTE.
+
+    Retorna:
+    - int: Fila (en la hoja) del encabezado.
+    - int: Primera fila (en la hoja) con datos.
+    - list: Posiciones de las columnas a leer.
+    - list: Nombres de esas columnas, en el orden de la hoja.
+    """
+    requeridas = diseno['encabezado']
+    fila_encabezado = None
+    for fila, valores in enumerate(muestra.itertuples(index=False)):
+        if all(col in valores for col in requeridas):
+            fila_encabezado = fila
+            break
+    if fila_encabezado is None:
+        raise KeyError(f"No se encontró una fila de encabezado con las columnas {requeridas} "
+                       f"en las primeras {len(muestra)} filas.")
+
+    encabezado = list(muestra.iloc[fila_encabezado])
+    if diseno['columnas'] is None:
+        inicio_columnas = 1 if diseno['omitir_primera_columna'] else 0
+        posiciones = list(range(inicio_columnas, len(encabezado)))
+    else:
+        posiciones = sorted(encabezado.index(col) for col in diseno['columnas'])
+    nombres = [encabezado[pos] for pos in posiciones]
+
+    # Los datos empiezan después de las filas fijas, en la primera fila con llave (primera columna requerida)
+    fila_datos = fila_encabezado + 1 + diseno['filas_omitidas']
+    llave = muestra.iloc[fila_datos:, encabezado.index(requeridas[0])]
+    con_llave = llave.notna() & (llave.astype(str).str.strip() != '')
+    if con_llave.any():
+        fila_datos = con_llave.idxmax()
+    return fila_encabezado, fila_datos, posiciones, nombres
+
+
+def leer_reporte(archivo, nombre_reporte, filas_deteccion=FILAS_DETECCION):
+    """
+    Lee un reporte de DISENOS_REPORTE detectando su encabezado en las primeras filas y parseando el
+    resto de la hoja una sola vez, ya con los nombres correctos y solo las columnas deseadas.
+
+    Parámetros:
+    - archivo (str o archivo): Ruta o archivo Excel abierto.
+    - nombre_reporte (str): Clave de DISENOS_REPORTE ('MCBE' o 'INMOVILIZADOS').
+    - filas_deteccion (int): Filas iniciales que se inspeccionan.
+
+    Retorna:
+    - DataFrame con el encabezado real y los datos desde la primera fila útil.
+    """
+    diseno = DISENOS_REPORTE[nombre_reporte]
+    _rebobinar(archivo)
+    muestra = pd.read_excel(archivo, header=None, nrows=filas_deteccion)
+    _, fila_datos, posiciones, nombres = detectar_disposicion(muestra, diseno)
+
+    _rebobinar(archivo)
+    # Como object, igual que al leer la hoja entera: una fila en blanco o de totales no debe volver
+    # float la columna 'Material' (las llaves quedarían como '12345.0' y 'nan')
+    df = pd.read_excel(archivo, header=None, skiprows=fila_datos, usecols=posiciones, dtype=object)
+    df.columns = nombres
+    if diseno['columnas'] is not None and nombres != list(diseno['columnas']):
+        df = df[diseno['columnas']]
+    return df
+
+
+def leer_MCBE(archivo):
+    """Lee el reporte MCBE con su encabezado real (equivale a read_excel seguido de process_MCBE)."""
+    return leer_reporte(archivo, 'MCBE')
+
+
+def leer_inmovilizados(archivo):
+    """Lee el reporte INMOVILIZADOS con su encabezado real y solo COLUMNAS_INMOVILIZADOS."""
+    return leer_reporte(archivo, 'INMOVILIZADOS')
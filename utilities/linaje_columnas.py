@@ -0,0 +1,195 @@
+import pandas as pd
+
+#--------------------------------------------
+# LINAJE DE COLUMNAS Y PERFILES DE REPORTE
+#--------------------------------------------
+
+# Columnas del reporte completo, en orden
+COLUMNAS_REPORTE = [
+    'COMODIN OC', 'COMODIN SOLPED', 'TIPO', 'Solicitante','Solicitante Corregido', 'Pto.tbjo.responsable',
+    'Estado HES/HEM', 'Fecha de reg. Factura', 'Estado factura',
+    'Fecha contable', 'Estado contable', 'Fecha de HES/EM','Material', 'Numero de activo',
+    'Cantidad solicitada', 'Unidad de medida', 'Solicitud de pedido','Pos.solicitud pedido','Cantidad de pedido',
+    'Por entregar (cantidad)', 'Pedido','Posición', 'Indicador liberación', 'Orden', 'Condición de pago del pedido',
+    'Valor net. Solped', 'Denominación de la ubicación técnica', 'Denominación de objeto técnico', 'Equipo',
+    'Por entregar (STATUS)', 'Por entregar (valor)', 'Precio neto', 'Descripcion Material', 'Moneda',
+    'Libre utilización', 'Indicador de borrado SOLPED', 'Año OC', 'Mes OC', 'Indicador de borrado Orden de Compra',
+    'Fecha de SOLPED',
+    'Fecha de OC', 'PENDIENTE DE LIBERACIÓN DE OC', 'Fecha de aprobación de la orden de compr',
+    'DEMORA EN GENERAR OC (DIAS)', 'DEMORA EN LIBERACIONES DE OC', 'Proveedor/Centro suministrador',
+    'Estado liberación', 'Estrategia liberac.', 'Tipo de Cambio', 'Precio Convertido Dolares',
+    'TIPO COMPROMETIDO SUGERENCIA', ' Últ.mov.', 'Últ.cons.', 'Últ.salida','Costo compras por retirar',
+    'Dias Inmovilizados','Estado Inmovilizado','Valor stock','Stock','Material Critico?']
+
+# Perfiles de reporte: nombre -> columnas de salida, en orden
+PERFILES_REPORTE = {
+    'completo': COLUMNAS_REPORTE,
+    'liberaciones': [
+        'COMODIN OC', 'COMODIN SOLPED', 'Solicitante', 'Pedido', 'Posición', 'Proveedor/Centro suministrador',
+        'Fecha de OC', 'Estrategia liberac.', 'Estado liberación', 'PENDIENTE DE LIBERACIÓN DE OC',
+        'Fecha de aprobación de la orden de compr', 'DEMORA EN LIBERACIONES DE OC'],
+    'costos': [
+        'COMODIN OC', 'COMODIN SOLPED', 'Material', 'Descripcion Material', 'Moneda', 'Precio neto',
+        'Tipo de Cambio', 'Precio Convertido Dolares', 'TIPO COMPROMETIDO SUGERENCIA', 'Libre utilización',
+        'Costo compras por retirar'],
+    'inventario': [
+        'COMODIN SOLPED', 'Material', 'Descripcion Material', 'Libre utilización', ' Últ.mov.', 'Últ.cons.',
+        'Últ.salida', 'Dias Inmovilizados', 'Estado Inmovilizado', 'Valor stock', 'Stock', 'Material Critico?'],
+}
+
+# Columnas que llegan por unión: nombre en el reporte -> (unión de merge_dataframes, columna en su DataFrame).
+# La unión 'base' son las columnas de ME5A con las que empieza el reporte.
+FUENTES = {
+    'COMODIN SOLPED': ('base', 'COMODIN SOLPED'),
+    'COMODIN OC': ('base', 'COMODIN OC'),
+    'Orden': ('ZMM621_OMant', 'Orden'),
+    'Material': ('ME5A', 'Material'),
+    'Pedido': ('ME5A', 'Pedido'),
+    'Solicitud de pedido': ('ME5A', 'Solicitud de pedido'),
+    'Pos.solicitud pedido': ('ME5A', 'Pos.solicitud pedido'),
+    'Solicitante': ('ME5A', 'Solicitante'),
+    'Solicitante Corregido': ('ME5A', 'Solicitante Corregido'),
+    'Indicador de borrado SOLPED': ('ME5A', 'Indicador de borrado'),
+    'Indicador liberación': ('ME5A', 'Indicador liberación'),
+    'Fecha de SOLPED': ('ME5A', 'Fecha de solicitud'),
+    'Unidad de medida': ('ME5A', 'Unidad de medida'),
+    'Cantidad solicitada': ('ME5A', 'Cantidad solicitada'),
+    'Descripcion Material': ('ME5A', 'Texto breve'),
+    'Estado factura': ('ZMM621_OCompras', 'Estado factura'),
+    'Fecha de reg. Factura': ('ZMM621_OCompras', 'Fecha Doc. Fact.'),
+    'Fecha de HES/EM': ('ZMM621_OCompras', 'Fecha de registro.1'),
+    'Fecha contable': ('ZMM621_OCompras', 'Fecha contable'),
+    'Condición de pago del pedido': ('ZMM621_OCompras', 'Condición de pago del pedido'),
+    'Fecha de aprobación de la orden de compr': ('ZMM621_OCompras', 'Fecha de aprobación de la orden de compr'),
+    'Valor net. Solped': ('ZMM621_OCompras', 'Valor net. Solped'),
+    'Numero de activo': ('ZMM621_OCompras', 'Numero de activo'),
+    'Pto.tbjo.responsable': ('IW38', 'Pto.tbjo.responsable'),
+    'Denominación de la ubicación técnica': ('IW38', 'Denominación de la ubicación técnica'),
+    'Denominación de objeto técnico': ('IW38', 'Denominación de objeto técnico'),
+    'Equipo': ('IW38', 'Equipo'),
+    'Proveedor/Centro suministrador': ('ME2N_OC', 'Proveedor/Centro suministrador'),
+    'Posición': ('ME2N_OC', 'Posición'),
+    'Estado liberación': ('ME2N_OC', 'Estado liberación'),
+    'Indicador de borrado Orden de Compra': ('ME2N_OC', 'Indicador de borrado'),
+    'Fecha de OC': ('ME2N_OC', 'Fecha documento'),
+    'Por entregar (cantidad)': ('ME2N_OC', 'Por entregar (cantidad)'),
+    'Cantidad de pedido': ('ME2N_OC', 'Cantidad de pedido'),
+    'Precio neto': ('ME2N_OC', 'Precio neto'),
+    'Moneda': ('ME2N_OC', 'Moneda'),
+    'Por entregar (valor)': ('ME2N_OC', 'Por entregar (valor)'),
+    'Ind.liberación': ('ME2N_OC', 'Ind.liberación'),
+    'Estrategia liberac.': ('ME2N_OC', 'Estrategia liberac.'),
+    'Libre utilización': ('ZMB52', 'Libre utilización'),
+    'Últ.salida': ('MCBE', 'Últ.salida'),
+    'Últ.cons.': ('MCBE', 'Últ.cons.'),
+    ' Últ.mov.': ('MCBE', ' Últ.mov.'),
+    'Estado HES/HEM': ('ZMM621_HES_HEM', 'Estado HES/HEM'),
+    'Dias Inmovilizados': ('inmovilizados', 'Dias Inmovilizados'),
+    'Estado Inmovilizado': ('inmovilizados', 'Estado Inmovilizado'),
+    'Valor stock': ('inmovilizados', 'Valor stock'),
+    'Stock': ('inmovilizados', 'Stock'),
+}
+
+# Llave con la que cada unión se engancha al reporte (las demás usan llaves que siempre están)
+LLAVES_UNION = {'ZMB52': 'Material', 'MCBE': 'Material', 'inmovilizados': 'Material'}
+
+# Columnas calculadas (merge_dataframes y calculate_additional_columns) -> columnas de las que dependen.
+# 'Precio Unitario' depende además de la clave de costo (ver resolver_linaje).
+DERIVADAS = {
+    'Material Critico?': ['Material'],
+    'Estado contable': ['Pedido', 'Fecha contable'],
+    'TIPO': ['Material'],
+    'Por entregar (STATUS)': ['Por entregar (cantidad)'],
+    'PENDIENTE DE LIBERACIÓN DE OC': ['Por entregar (cantidad)', 'Estrategia liberac.', 'Estado liberación'],
+    'TIPO COMPROMETIDO SUGERENCIA': ['TIPO', 'Por entregar (STATUS)', 'Indicador de borrado SOLPED',
+                                     'Indicador de borrado Orden de Compra', 'Por entregar (cantidad)',
+                                     'Estado factura', 'Libre utilización'],
+    'DEMORA EN GENERAR OC (DIAS)': ['TIPO COMPROMETIDO SUGERENCIA', 'Indicador de borrado Orden de Compra',
+                                    'Fecha de OC', 'Fecha de SOLPED'],
+    'DEMORA EN LIBERACIONES DE OC': ['PENDIENTE DE LIBERACIÓN DE OC', 'TIPO COMPROMETIDO SUGERENCIA',
+                                     'Indicador de borrado Orden de Compra', 'Fecha de OC',
+                                     'Fecha de aprobación de la orden de compr'],
+    'Año OC': ['Fecha de OC'],
+    'Mes OC': ['Fecha de OC'],
+    'Tipo de Cambio': ['Fecha de OC', 'Moneda'],
+    'Precio Convertido Dolares': ['Precio neto', 'Tipo de Cambio'],
+    'Precio Unitario': ['Fecha de OC', 'Precio Convertido Dolares', 'Cantidad de pedido'],
+    'Costo compras por retirar': ['Precio Unitario', 'TIPO COMPROMETIDO SUGERENCIA', 'Libre utilización'],
+}
+
+# ME5A y ME2N traen las dos 'Indicador de borrado'; solo se distinguen por los sufijos _x/_y del merge
+# cuando se unen ambas, así que se piden siempre juntas
+_INDICADORES_BORRADO = ('Indicador de borrado SOLPED', 'Indicador de borrado Orden de Compra')
+
+
+def columnas_de_perfil(perfil):
+    """Columnas de salida de un perfil de PERFILES_REPORTE, o la lista de columnas dada."""
+    if isinstance(perfil, str):
+        if perfil not in PERFILES_REPORTE:
+            raise ValueError(f"Perfil de reporte desconocido: '{perfil}'. Disponibles: {list(PERFILES_REPORTE)}")
+        return list(PERFILES_REPORTE[perfil])
+    return list(perfil)
+
+
+def resolver_linaje(perfil='completo', clave_costo='Descripcion Material'):
+    """
+    Recorre el linaje desde las columnas de salida hasta las columnas de origen de cada unión.
+
+    Parámetros:
+    - perfil (str o list): Perfil de PERFILES_REPORTE o lista de columnas de salida.
+    - clave_costo (str): Clave de 'Precio Unitario' ('Descripcion Material' o 'Material').
+
+    Retorna:
+    - dict con:
+      - 'columnas': columnas de salida, en orden.
+      - 'requeridas': todas las columnas que hay que tener en el reporte (salida e intermedias).
+      - 'uniones': columnas a traer en cada unión de merge_dataframes (uniones ausentes no se hacen).
+      - 'solicitantes': reportes a los que hay que corregir el solicitante (None = todos, como en
+        el reporte completo, porque las hojas exportadas también los muestran).
+    """
+    columnas = columnas_de_perfil(perfil)
+    desconocidas = [col for col in columnas if col not in FUENTES and col not in DERIVADAS]
+    if desconocidas:
+        raise ValueError(f"Columnas sin linaje conocido: {desconocidas}")
+
+    dependencias = dict(DERIVADAS)
+    dependencias['Precio Unitario'] = DERIVADAS['Precio Unitario'] + [clave_costo]
+
+    requeridas = set()
+    pendientes = list(columnas)
+    while pendientes:
+        columna = pendientes.pop()
+        if columna in requeridas:
+            continue
+        requeridas.add(columna)
+        pendientes.extend(dependencias.get(columna, []))
+        if columna in _INDICADORES_BORRADO:
+            pendientes.extend(_INDICADORES_BORRADO)
+
+    uniones = {}
+    for columna in requeridas:
+        if columna in FUENTES:
+            union, origen = FUENTES[columna]
+            uniones.setdefault(union, []).append(origen)
+    if 'Material Critico?' in requeridas:
+        # 'Material Critico?' se etiqueta en merge_dataframes con la llave de CRITICOS
+        uniones['criticos'] = ['Código SAP.']
+    for union, llave in LLAVES_UNION.items():
+        if union in uniones and llave not in requeridas:
+            requeridas.add(llave)
+            union_llave, origen = FUENTES[llave]
+            uniones.setdefault(union_llave, []).append(origen)
+
+    completo = set(COLUMNAS_REPORTE) <= set(columnas)
+    # La corrección de solicitantes también pasa 'Solicitante' a mayúsculas
+    usa_solicitante = bool(requeridas & {'Solicitante', 'Solicitante Corregido'})
+    solicitantes = None if completo else ({'ME5A'} if usa_solicitante else set())
+    return {'columnas': columnas, 'requeridas': requeridas, 'uniones': uniones, 'solicitantes': solicitantes}
+
+
+def ensamblar_reporte(joined_data, columnas):
+    """
+    Arma el reporte final con las columnas pedidas, en orden, reutilizando los arreglos de
+    joined_data en lugar de copiarlos (a diferencia de joined_data[columnas]).
+    """
+    return pd.DataFrame({col: joined_data[col] for col in columnas}, copy=False)
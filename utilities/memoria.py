@@ -0,0 +1,120 @@
+import os
+import shutil
+import sys
+import tempfile
+import weakref
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+
+#--------------------------------------------
+# MODO DE PRESUPUESTO DE MEMORIA
+#--------------------------------------------
+
+# Columnas numéricas que se reducen en modo de presupuesto de memoria, por reporte procesado
+COLUMNAS_REDUCIBLES = {
+    'ME5A': ['Cantidad solicitada'],
+    'ME2N_OC': ['Cantidad de pedido', 'Por entregar (cantidad)', 'Precio neto', 'Por entregar (valor)'],
+    'ZMB52': ['Libre utilización', 'Valor libre util.'],
+    'inmovilizados': ['Valor stock', 'Stock', 'Deducción', 'SALDO'],
+}
+
+# Error máximo aceptado al pasar montos y cantidades a float32 (medio céntimo)
+TOLERANCIA_FLOAT32 = 0.005
+
+
+def reducir_numericos(df, columnas, tolerancia=TOLERANCIA_FLOAT32):
+    """
+    Reduce el tamaño de columnas numéricas:
+    - Enteras (o decimales sin parte fraccionaria ni nulos): al entero más pequeño que las contiene.
+    - Decimales: a float32 solo si ningún valor cambia más que `tolerancia`.
+    Las columnas que no son numéricas (p. ej. con textos) no se tocan.
+
+    Parámetros:
+    - df (DataFrame): DataFrame a reducir.
+    - columnas (list): Columnas candidatas (las que no existan se ignoran).
+    - tolerancia (float): Error absoluto máximo permitido al pasar a float32.
+
+    Retorna:
+    - DataFrame nuevo con las columnas reducidas (el recibido no se modifica).
+    """
+    df = df.copy(deep=False)
+    for columna in columnas:
+        if columna not in df.columns or not pd.api.types.is_numeric_dtype(df[columna]) \
+                or pd.api.types.is_bool_dtype(df[columna]):
+            continue
+        valores = df[columna]
+        if pd.api.types.is_integer_dtype(valores):
+            df[columna] = pd.to_numeric(valores, downcast='integer')
+            continue
+
+        arreglo = valores.to_numpy(dtype=float)
+        if not np.isnan(arreglo).any() and (arreglo % 1 == 0).all():
+            df[columna] = pd.to_numeric(valores, downcast='integer')
+            continue
+        reducido = arreglo.astype(np.float32)
+        error = np.abs(reducido.astype(float) - arreglo)
+        if np.nanmax(error, initial=0) <= tolerancia:
+            df[columna] = pd.Series(reducido, index=valores.index, name=columna)
+    return df
+
+
+def reducir_procesados(procesados):
+    """Aplica reducir_numericos a los DataFrames procesados según COLUMNAS_REDUCIBLES."""
+    return {nombre: reducir_numericos(df, COLUMNAS_REDUCIBLES[nombre]) if nombre in COLUMNAS_REDUCIBLES else df
+            for nombre, df in procesados.items()}
+
+
+class DiccionarioEnDisco(Mapping):
+    """
+    Diccionario de DataFrames guardados en disco (pickle) en una carpeta temporal.
+
+    Al asignar una hoja se escribe a disco y no se conserva en memoria; al leerla se carga de nuevo.
+    Así, al exportar con `.items()` solo hay una hoja en memoria a la vez. La carpeta se borra
+    cuando el diccionario deja de usarse (o al llamar a `limpiar`).
+    """
+    def __init__(self, directorio=None):
+        self.directorio = tempfile.mkdtemp(prefix="hojas_", dir=directorio)
+        self.rutas = {}
+        self._finalizador = weakref.finalize(self, shutil.rmtree, self.directorio, True)
+
+    def __setitem__(self, nombre, df):
+        ruta = os.path.join(self.directorio, f"{len(self.rutas):02d}.pkl")
+        ruta = self.rutas.get(nombre, ruta)
+        df.to_pickle(ruta)
+        self.rutas[nombre] = ruta
+
+    def __getitem__(self, nombre):
+        return pd.read_pickle(self.rutas[nombre])
+
+    def __iter__(self):
+        return iter(self.rutas)
+
+    def __len__(self):
+        return len(self.rutas)
+
+    def limpiar(self):
+        """Borra la carpeta temporal con las hojas."""
+        self._finalizador()
+        self.rutas = {}
+
+
+def pico_rss_mb():
+    """
+    Memoria residente máxima del proceso (MB) desde que empezó, o None si no se puede medir.
+    Usa `resource` (Linux/macOS) y, en Windows, psutil si está instalado.
+    """
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        memoria = psutil.Process().memory_info()
+        return getattr(memoria, 'peak_wset', memoria.rss) / 2**20
+
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss está en KB en Linux y en bytes en macOS
+    return pico / 2**20 if sys.platform == 'darwin' else pico / 2**10
@@ -105,12 +105,20 @@ def merge_dataframes(df_ME5A,
                      df_inmovilizados_converted,
                      df_ZMM621_OCompras,
                      df_ZMM621_OMant,
-                     df_ZMM621_HES_HEM):
+                     df_ZMM621_HES_HEM,
+                     join=left_join,
+                     indice_criticos=None,
+                     columnas_por_union=None):
     """
    Fusiona múltiples DataFrames basándose en una lógica definida.
 
    Parámetros:
    - df_ME5A, df_ZMM621_fechaAprobacion, df_IW38, df_ME2N_OC, df_ZMB52, df_MCBE, df_tipos_cambio (DataFrames): Los DataFrames que se fusionarán.
+   - join (callable): Función de unión izquierda con la firma de left_join (la cambia el backend).
+   - indice_criticos (CoincidenciaBuscadorFinal): Índice sobre 'Código SAP.' de CRITICOS; si no se indica, se crea.
+   - columnas_por_union (dict): Columnas a traer en cada unión (clave 'uniones' de
+     utilities.linaje_columnas.resolver_linaje). Las uniones sin columnas se omiten, igual que
+     'Material Critico?' si no se pide. None = todas las columnas (reporte completo).
 
    Retorna:
    - DataFrame: Resultado de la fusión de DataFrames.
@@ -118,30 +126,35 @@ def merge_dataframes(df_ME5A,
    # Se inicia con un DataFrame base usando ciertas columnas de df_ME5A
     joined_data = df_ME5A[['COMODIN SOLPED', 'COMODIN OC']]
 
-    joined_data = left_join(joined_data, df_ZMM621_OMant, 'COMODIN OC', ['Orden'])
+    joined_data = join(joined_data, df_ZMM621_OMant, 'COMODIN OC', ['Orden'])
     
     # Se definen las operaciones de fusión (unión izquierda) que se realizarán en orden
     left_join_operations = [
-        (df_ME5A, 'COMODIN SOLPED',
+        ('ME5A', df_ME5A, 'COMODIN SOLPED',
          ['Material', 'Pedido', 'Solicitud de pedido', 'Pos.solicitud pedido', 'Solicitante','Solicitante Corregido', 'Indicador de borrado',
           'Indicador liberación', 'Fecha de solicitud', 'Unidad de medida', 'Cantidad solicitada', 'Texto breve']),
-        (df_ZMM621_OCompras, 'COMODIN OC',
+        ('ZMM621_OCompras', df_ZMM621_OCompras, 'COMODIN OC',
          ['Estado factura', 'Fecha Doc. Fact.', 'Fecha de registro.1', 'Fecha contable',
           'Condición de pago del pedido', 'Fecha de aprobación de la orden de compr', 'Valor net. Solped',
           'Numero de activo']),
-        (df_IW38, 'Orden',
+        ('IW38', df_IW38, 'Orden',
          ['Pto.tbjo.responsable', 'Denominación de la ubicación técnica', 'Denominación de objeto técnico', 'Equipo']),
-        (df_ME2N_OC, 'COMODIN OC',
+        ('ME2N_OC', df_ME2N_OC, 'COMODIN OC',
          ['Proveedor/Centro suministrador','Posición', 'Estado liberación', 'Indicador de borrado', 'Fecha documento',
           'Por entregar (cantidad)', 'Cantidad de pedido', 'Precio neto', 'Moneda', 'Por entregar (valor)',
           'Ind.liberación', 'Estrategia liberac.']),
-        (df_ZMB52, 'Material', ['Libre utilización']),
-        (df_MCBE, 'Material', ['Últ.salida', 'Últ.cons.', ' Últ.mov.']),
-        (df_ZMM621_HES_HEM, 'COMODIN OC', ['Estado HES/HEM']),
-        (df_inmovilizados_converted,'Material',['Dias Inmovilizados','Estado Inmovilizado','Valor stock','Stock'])
+        ('ZMB52', df_ZMB52, 'Material', ['Libre utilización']),
+        ('MCBE', df_MCBE, 'Material', ['Últ.salida', 'Últ.cons.', ' Últ.mov.']),
+        ('ZMM621_HES_HEM', df_ZMM621_HES_HEM, 'COMODIN OC', ['Estado HES/HEM']),
+        ('inmovilizados', df_inmovilizados_converted,'Material',['Dias Inmovilizados','Estado Inmovilizado','Valor stock','Stock'])
     ]
     
-    for df, key, columns in left_join_operations:
+    for nombre, df, key, columns in left_join_operations:
+        if columnas_por_union is not None:
+            # Solo las columnas que el perfil de reporte necesita, en el orden original
+            columns = [col for col in columns if col in columnas_por_union.get(nombre, [])]
+            if not columns:
+                continue
     # Verificar asunciones y realizar la unión
         if check_left_join_assumptions(joined_data, df, key):
             # Realizar comprobaciones adicionales
@@ -152,10 +165,12 @@ def merge_dataframes(df_ME5A,
             check_null_values(joined_data, key)
             
             # Realizar la unión
-            joined_data = left_join(joined_data, df, key, columns)
+            joined_data = join(joined_data, df, key, columns)
         else:
             print(f"Falló la unión de DataFrames con la columna clave '{key}'. Revise los mensajes de error anteriores.")
-    buscadorCriticos = CoincidenciaBuscadorFinal(joined_data, df_criticos_converted)
-    joined_data = buscadorCriticos.buscar_coincidencia('Material','Código SAP.','Critico', 
-                                                        'Material Critico?')
+    if columnas_por_union is not None and 'criticos' not in columnas_por_union:
+        return joined_data
+    if indice_criticos is None:
+        indice_criticos = CoincidenciaBuscadorFinal.desde_busqueda(df_criticos_converted, 'Código SAP.')
+    joined_data['Material Critico?'] = indice_criticos.etiquetar(joined_data['Material'], 'Código SAP.', 'Critico')
     return joined_data
\ No newline at end of file
@@ -0,0 +1,95 @@
+import pandas as pd
+from utilities.process_dataframes import (COLUMNAS_INMOVILIZADOS, convertir_orden_mantenimiento,
+                                         normalizar_encabezado_inmovilizados, vectorized_process_material)
+
+#--------------------------------------------
+# VISTA PREVIA SOBRE UNA MUESTRA DE LAS ENTRADAS
+#--------------------------------------------
+
+# Resolución del muestreo por hash (la fracción se redondea a millonésimas)
+_ESCALA_HASH = 10**6
+
+HOJA_AVISO_MUESTRA = 'AVISO_MUESTRA'
+
+
+def fraccion_de_muestra(muestra, filas):
+    """
+    Fracción de ME5A a conservar: `muestra` puede ser una fracción (0 < muestra < 1) o un número
+    aproximado de filas de ME5A (muestra >= 1).
+    """
+    if muestra <= 0:
+        raise ValueError("La muestra debe ser una fracción mayor que 0 o un número de filas.")
+    if muestra < 1:
+        return float(muestra)
+    return min(1.0, muestra / filas) if filas else 1.0
+
+
+def _en_muestra(llaves, fraccion):
+    """Máscara de las filas cuya llave cae en la muestra según su hash (mismo resultado en cada ejecución)."""
+    hashes = pd.util.hash_pandas_object(llaves, index=False).to_numpy()
+    return (hashes % _ESCALA_HASH) < round(fraccion * _ESCALA_HASH)
+
+
+def _materiales(serie):
+    """Material normalizado como en process_dataframes_for_join, para comparar entre reportes."""
+    return vectorized_process_material(serie.to_frame('Material'), ['Material'])['Material']
+
+
+def muestrear_entradas(df_ME5A, df_ZMM621_fechaAprobacion, df_IW38, df_ME2N_OC, df_ZMB52, df_MCBE,
+                       df_inmovilizados, muestra):
+    """
+    Reduce las entradas de process_data a una muestra consistente entre reportes.
+
+    ME5A se muestrea por el hash de 'COMODIN SOLPED' (todas las filas de una misma llave entran o
+    salen juntas) y el resto de reportes se restringe a las llaves de esa muestra: ZMM621 y ME2N a
+    sus 'COMODIN OC' (ZMM621 también a las demás filas de sus órdenes de mantenimiento), IW38 a
+    esas órdenes y ZMB52, MCBE e INMOVILIZADOS a sus materiales. Así las uniones encuentran las mismas filas que en el proceso completo.
+    CRITICOS y los tipos de cambio no se muestrean (son tablas de referencia).
+
+    Parámetros:
+    - muestra (float o int): Fracción de ME5A (0 < muestra < 1) o número aproximado de filas.
+
+    Retorna:
+    - tuple: Los siete DataFrames muestreados, en el orden de los parámetros.
+    - float: Fracción de ME5A usada.
+    """
+    fraccion = fraccion_de_muestra(muestra, len(df_ME5A))
+    df_ME5A = df_ME5A[_en_muestra(df_ME5A['COMODIN SOLPED'], fraccion)]
+
+    comodin_oc = df_ME5A['COMODIN OC']
+    df_ME2N_OC = df_ME2N_OC[df_ME2N_OC['COMODIN OC'].isin(comodin_oc)]
+
+    # ZMM621: las filas de la muestra y, como ZMM621_OMant conserva una fila por orden, también las
+    # demás filas de esas órdenes (para que la fila elegida por orden sea la misma que sin muestra)
+    en_oc = df_ZMM621_fechaAprobacion['COMODIN OC'].isin(comodin_oc)
+    columna_orden = next((col for col in ['Orden de mantenimiento', 'Numero de orden']
+                          if col in df_ZMM621_fechaAprobacion.columns), None)
+    if columna_orden is not None:
+        ordenes_zmm621 = convertir_orden_mantenimiento(df_ZMM621_fechaAprobacion[columna_orden])
+        ordenes = ordenes_zmm621[en_oc].dropna().unique()
+        df_ZMM621_fechaAprobacion = df_ZMM621_fechaAprobacion[en_oc | ordenes_zmm621.isin(ordenes)]
+        if 'Orden' in df_IW38.columns:
+            df_IW38 = df_IW38[pd.to_numeric(df_IW38['Orden'], errors='coerce').isin(ordenes)]
+    else:
+        df_ZMM621_fechaAprobacion = df_ZMM621_fechaAprobacion[en_oc]
+
+    materiales = _materiales(df_ME5A['Material']).dropna().unique()
+    df_ZMB52 = df_ZMB52[_materiales(df_ZMB52['Material']).isin(materiales).to_numpy()]
+    df_MCBE = df_MCBE[_materiales(df_MCBE['Material']).isin(materiales).to_numpy()]
+    # INMOVILIZADOS leído sin leer_inmovilizados trae el encabezado desplazado: se normaliza primero
+    if not set(COLUMNAS_INMOVILIZADOS).issubset(df_inmovilizados.columns):
+        df_inmovilizados = normalizar_encabezado_inmovilizados(df_inmovilizados)
+    df_inmovilizados = df_inmovilizados[_materiales(df_inmovilizados['Material']).isin(materiales).to_numpy()]
+
+    entradas = (df_ME5A, df_ZMM621_fechaAprobacion, df_IW38, df_ME2N_OC, df_ZMB52, df_MCBE, df_inmovilizados)
+    return entradas, fraccion
+
+
+def aviso_muestra(fraccion, filas_ME5A, filas_reporte):
+    """Hoja que identifica un resultado como vista previa sobre una muestra."""
+    return pd.DataFrame({
+        'Aviso': ["VISTA PREVIA: el reporte se calculó sobre una muestra de las entradas y no está completo.",
+                  "Los totales, resúmenes y 'Costo compras por retirar' (precio de la OC más reciente) "
+                  "pueden diferir del proceso completo."],
+        'Detalle': [f"{fraccion:.2%} de ME5A ({filas_ME5A} filas)", f"{filas_reporte} filas en el reporte"],
+    })
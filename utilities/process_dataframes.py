@@ -1,23 +1,55 @@
 import pandas as pd 
 import numpy as np
+import functools
 import hashlib
-from rapidfuzz import process
+from utilities.fechas import parsear_fechas
+from utilities.esquemas import validar_y_convertir
 #--------------------------------------------
 #FUNCIONES DE MANIPULACION DE DATASETS BRUTOS
 #---------------------------------------------
 
+# Lista maestra de solicitantes: usuario SAP -> puesto de trabajo responsable
+LISTA_MAESTRA_SOLICITANTES = {
+    "EMANCHEGOM": "JEF-MM03",
+    "MLAGUNAR(G)": "JEF-GE01",
+    "MLAGUNAR": "JEF-ME02",
+    "YPANDIAP": "JEF-ME01",
+    "CTICSER": "JEF-MG01",
+    "JPACCOC": "JEF-EM01",
+    "ARADOP": "JEF-PL01",
+    "MMELGARN":"JEF-MG01",
+    "MMAGOB":"JEF-MG01",
+    "PPAREDEST":"",
+    "JDELGADOCH":"",
+    "GLUNAR":"",
+    "331_TECCOMUN":"",
+}
+
+@functools.lru_cache(maxsize=65536)
+def _corregir_solicitante(solic, maestro_keys):
+    """Coincidencia más cercana de un solicitante en la lista maestra (memoizada entre ejecuciones)."""
+    # Importación diferida: rapidfuzz solo se carga si hay solicitantes que corregir
+    from rapidfuzz import process
+    match = process.extractOne(solic, maestro_keys)
+    return match[0] if match[1] > 80 else solic
+
 def corregir_solicitantes_vectorizado(df, lista_maestra_dict, columna):
-    maestro_keys = list(lista_maestra_dict.keys())
+    """
+    Pasa la columna de solicitantes a mayúsculas y agrega '<columna> Corregido' con la coincidencia
+    más cercana de lista_maestra_dict. Retorna un DataFrame nuevo; el recibido no se modifica.
+
+    La búsqueda difusa se hace una vez por solicitante distinto y queda memoizada por lista maestra:
+    los solicitantes ya vistos en ejecuciones anteriores no se vuelven a buscar.
+    """
+    maestro_keys = tuple(lista_maestra_dict.keys())
+    df = df.copy(deep=False)
     df[columna] = df[columna].str.upper()
-    # Obtiene los mejores matches para cada solicitante
-    best_matches = [process.extractOne(solic, maestro_keys) for solic in df[columna]]
-    
-    # Extrae los nombres de las coincidencias
-    best_match_names = [match[0] if match[1] > 80 else solic for solic, match in zip(df[columna], best_matches)]
-    
+    solicitantes = df[columna].tolist()
+    corregidos = {solic: _corregir_solicitante(solic, maestro_keys) for solic in dict.fromkeys(solicitantes)}
+
     # En lugar de sobrescribir la columna original, crearemos una nueva columna con los nombres corregidos
     # Esta columna tendrá el mismo nombre que la columna original con el sufijo "Corregido"
-    df[columna + ' Corregido'] = best_match_names
+    df[columna + ' Corregido'] = [corregidos[solic] for solic in solicitantes]
     return df
 
 
@@ -40,8 +72,7 @@ def sort_and_remove_duplicates(data, columns_to_sort, duplicate_check_column):
     - DataFrame: DataFrame procesado.
     """
     sorted_data = data.sort_values(by=columns_to_sort, ascending=[True, False])
-    sorted_data.drop_duplicates(subset=duplicate_check_column, keep='first', inplace=True)
-    return sorted_data
+    return sorted_data.drop_duplicates(subset=duplicate_check_column, keep='first')
 def rename_column(data, current_name, new_name):
     """
     Renombra una columna en un DataFrame.
@@ -52,10 +83,9 @@ def rename_column(data, current_name, new_name):
     - nuevo_nombre (str): Nuevo nombre de la columna.
 
     Retorna:
-    - DataFrame: DataFrame con columna renombrada.
+    - DataFrame: DataFrame nuevo con la columna renombrada (el recibido no se modifica).
     """
-    data.rename(columns={current_name: new_name}, inplace=True)
-    return data
+    return data.rename(columns={current_name: new_name}, copy=False)
 
 def create_ZMM621_COMODIN_OC_HES_HEM(df_ZMM621_fechaAprobacion):
     """
@@ -87,18 +117,21 @@ def create_ZMM621_Orden_unique(df_ZMM621_fechaAprobacion):
     Retorna:
     - DataFrame: DataFrame procesado.
     """
-    # Convertir valores 'Unknown' a NaN
-    df_ZMM621_fechaAprobacion['Orden de mantenimiento'] = df_ZMM621_fechaAprobacion['Orden de mantenimiento'].replace('Unknown', np.nan)
-    
-    # Convertir la columna a numérico
-    df_ZMM621_fechaAprobacion['Orden de mantenimiento'] = pd.to_numeric(df_ZMM621_fechaAprobacion['Orden de mantenimiento'], errors='coerce').dropna()
+    # La columna normalmente ya viene numérica (process_dataframes_for_join la convierte una vez);
+    # si no, se convierte en una copia sin modificar el DataFrame recibido
+    if not pd.api.types.is_numeric_dtype(df_ZMM621_fechaAprobacion['Orden de mantenimiento']):
+        df_ZMM621_fechaAprobacion = df_ZMM621_fechaAprobacion.copy(deep=False)
+        df_ZMM621_fechaAprobacion['Orden de mantenimiento'] = convertir_orden_mantenimiento(
+            df_ZMM621_fechaAprobacion['Orden de mantenimiento'])
     
     df_ZMM621_OMant = sort_and_remove_duplicates(df_ZMM621_fechaAprobacion,
                                                           ['Orden de mantenimiento', 'Fecha contable'],
                                                           'Orden de mantenimiento')
-    rename_column(df_ZMM621_OMant, 'Orden de mantenimiento', 'Orden')
-    
-    return df_ZMM621_OMant
+    return rename_column(df_ZMM621_OMant, 'Orden de mantenimiento', 'Orden')
+
+def convertir_orden_mantenimiento(ordenes):
+    """Convierte 'Orden de mantenimiento' a numérico; 'Unknown' y los valores no numéricos quedan en NaN."""
+    return pd.to_numeric(ordenes.replace('Unknown', np.nan), errors='coerce')
 
 def create_ZMM621_COMODIN_OC_unique(df_ZMM621_fechaAprobacion):
     """
@@ -135,16 +168,13 @@ def convert_column_to_int(df, column_name):
     mensaje = ""
     try:
         # Convertir a float primero para eliminar el ".0" al final si es necesario
-        df[column_name] = df[column_name].astype(float)
-
-        # Reemplazar NaNs por un valor ficticio
-        df[column_name].fillna(1, inplace=True)
+        valores = df[column_name].astype(float)
 
-        # Convertir la columna a int64
-        df[column_name] = df[column_name].astype(np.int64)
+        # Reemplazar NaNs por un valor ficticio, convertir a int64 y devolver los ficticios a NaN
+        valores = valores.fillna(1).astype(np.int64).replace(1, np.nan)
 
-        # Convertir los valores ficticios de nuevo a NaN
-        df[column_name].replace(1, np.nan, inplace=True)
+        df = df.copy(deep=False)
+        df[column_name] = valores
 
     except Exception as e:
         mensaje = f"Error al convertir la columna '{column_name}': {str(e)}"
@@ -154,39 +184,9 @@ def convert_column_to_int(df, column_name):
 def validate_and_create_comodin_columns(df, df_name):
     """
     Valida y crea las columnas 'COMODIN' en un DataFrame basado en las especificaciones dadas, usando un hash SHA256.
+    Los tipos de las columnas salen de utilities.esquemas; si el reporte no cumple su esquema se lanza ErrorDeEsquema.
     """
 
-    # Función para establecer los tipos de columnas según df_name
-    def _set_column_dtypes(df, df_name):
-        column_types = {}
-        if df_name == 'df_ME5A':
-            column_types = {
-                'Solicitud de pedido': 'float',
-                'Material': 'str',
-                'Pos.solicitud pedido': 'int',
-                'Posición de pedido': 'int',
-                'Pedido': 'float'
-            }
-        elif df_name == 'df_ME2N':
-            column_types = {
-                'Documento compras': 'float',
-                'Material': 'str',
-                'Posición': 'int'
-            }
-        elif df_name == 'df_ZMM621':
-            column_types = {
-                'Nro Pedido': 'float',
-                'Material': 'str',
-                'Pos. Pedido': 'int'
-            }
-
-        for col, col_type in column_types.items():
-            try:
-                df[col] = df[col].astype(col_type)
-            except Exception as e:
-                print(f"Error convirtiendo la columna '{col}' al tipo '{col_type}': {e}")
-        return df
-
     # Función para procesar las columnas 'COMODIN'
     def _process_comodins(df, comodin_specs):
         mensajes = []
@@ -201,11 +201,8 @@ def validate_and_create_comodin_columns(df, df_name):
                 mensajes.append(mensaje_error)
         return df, mensajes
 
-    # Cuerpo principal de la función
-    if df_name == 'df_ME5A':
-        df, message = convert_column_to_int(df, 'Pedido')
-
-    df = _set_column_dtypes(df, df_name)
+    # Cuerpo principal de la función: tipos de las columnas según el esquema del reporte
+    df = validar_y_convertir(df, df_name)
 
     comodin_specs = {
         'df_ME5A': {
@@ -240,7 +237,22 @@ def process_MCBE(df):
     df = df.reset_index(drop=True)
     return df
 
+def _como_texto(valores):
+    """Devuelve los valores como texto para comparar llaves, sin convertir si ya lo son."""
+    valores = pd.Series(valores) if not isinstance(valores, (pd.Series, pd.Index)) else valores
+    if pd.api.types.infer_dtype(valores, skipna=False) == 'string':
+        return valores
+    return valores.astype(str)
+
 class CoincidenciaBuscadorFinal:
+    """
+    Índice de búsqueda exacta sobre dataset_busqueda.
+
+    Por cada columna de búsqueda se construye una sola vez un índice hash de sus valores como
+    texto; después cada búsqueda es una consulta vectorizada O(n) contra ese índice, sin merges y
+    sin copiar ni modificar el DataFrame de entrada. El mismo buscador puede reutilizarse para
+    distintos DataFrames (ver desde_busqueda).
+    """
     def __init__(self, dataset_entrada, dataset_busqueda, columna_verificacion=None):
         self.dataset_entrada = dataset_entrada
         
@@ -256,7 +268,48 @@ class CoincidenciaBuscadorFinal:
                 dataset_busqueda = dataset_busqueda.drop_duplicates(subset=columna_verificacion, keep='first')
                 
         self.dataset_busqueda = dataset_busqueda
+        self._indices = {}
 
+    @classmethod
+    def desde_busqueda(cls, dataset_busqueda, columna_busqueda, columna_verificacion=None):
+        """
+        Crea un buscador reutilizable, sin dataset de entrada, con el índice de columna_busqueda ya construido.
+        Ejemplo: CoincidenciaBuscadorFinal.desde_busqueda(df_criticos, 'Código SAP.').
+        """
+        buscador = cls(None, dataset_busqueda, columna_verificacion)
+        buscador.indice(columna_busqueda)
+        return buscador
+
+    def indice(self, columna_busqueda):
+        """
+        Devuelve el índice hash (valor como texto -> primera fila) de columna_busqueda,
+        construyéndolo la primera vez que se pide.
+        """
+        if columna_busqueda not in self._indices:
+            claves = _como_texto(self.dataset_busqueda[columna_busqueda])
+            primeras = ~claves.duplicated().to_numpy()
+            self._indices[columna_busqueda] = (pd.Index(claves.to_numpy()[primeras]), np.flatnonzero(primeras))
+        return self._indices[columna_busqueda][0]
+
+    def posiciones(self, valores, columna_busqueda):
+        """Fila de dataset_busqueda que coincide con cada valor, o -1 si no hay coincidencia."""
+        indice = self.indice(columna_busqueda)
+        filas = self._indices[columna_busqueda][1]
+        encontrados = indice.get_indexer(_como_texto(valores))
+        return np.where(encontrados >= 0, filas[encontrados], -1)
+
+    def contiene(self, valores, columna_busqueda):
+        """Máscara booleana: True donde el valor existe en columna_busqueda."""
+        return self.indice(columna_busqueda).get_indexer(_como_texto(valores)) >= 0
+
+    def obtener(self, valores, columna_busqueda, columna_valor):
+        """Valor de columna_valor en la fila coincidente de dataset_busqueda (NaN si no hay coincidencia)."""
+        posiciones = self.posiciones(valores, columna_busqueda)
+        return self.dataset_busqueda[columna_valor].reset_index(drop=True).reindex(posiciones).to_numpy()
+
+    def etiquetar(self, valores, columna_busqueda, valor_coincidencia, valor_sin_coincidencia=''):
+        """Arreglo con valor_coincidencia donde hay coincidencia y valor_sin_coincidencia en el resto."""
+        return np.where(self.contiene(valores, columna_busqueda), valor_coincidencia, valor_sin_coincidencia)
 
     def buscar_coincidencia(self, columna_a_buscar, columna_busqueda, valor_coincidencia, 
                             nombre_columna_resultado="Resultado", nombre_columna_busqueda=None):
@@ -264,107 +317,123 @@ class CoincidenciaBuscadorFinal:
        Busca coincidencias exactas entre columna_a_buscar (en dataset_entrada) y 
        columna_busqueda (en dataset_busqueda). Si encuentra una coincidencia, 
        asigna valor_coincidencia en la columna resultado.
+
+       Devuelve un DataFrame nuevo con columna_a_buscar como texto, la columna de búsqueda
+       (valor coincidente o NaN) y la columna resultado; dataset_entrada no se modifica.
        """
-        # Si no se especifica un nombre para la columna de búsqueda en el resultado, 
-        # se usa el mismo nombre que columna_busqueda
         # Si no se especifica un nombre para la columna de búsqueda en el resultado, se usa el mismo nombre que columna_busqueda
         if not nombre_columna_busqueda:
             nombre_columna_busqueda = columna_busqueda
-        
-        # Convertir las columnas a tipo string
-        self.dataset_entrada[columna_a_buscar] = self.dataset_entrada[columna_a_buscar].astype(str)
-        self.dataset_busqueda[columna_busqueda] = self.dataset_busqueda[columna_busqueda].astype(str)
-        
-        # Cambiamos el nombre de la columna de búsqueda para el merge
-        df_busqueda_renombrado = self.dataset_busqueda.rename(columns={columna_busqueda: nombre_columna_busqueda})
-        
-        # Utilizamos un merge left para buscar coincidencias
-        resultado = pd.merge(self.dataset_entrada, df_busqueda_renombrado[[nombre_columna_busqueda]], 
-                             left_on=columna_a_buscar, right_on=nombre_columna_busqueda, 
-                             how='left', indicator=True)
-        
-        # Si la columna '_merge' es 'both', entonces hubo coincidencia
-        resultado[nombre_columna_resultado] = (resultado['_merge'] == 'both').astype(str).replace({'True': valor_coincidencia, 'False': ''})
-        
-        # Eliminamos las columnas extra
-        resultado.drop(['_merge'], axis=1, inplace=True)
+
+        valores = _como_texto(self.dataset_entrada[columna_a_buscar])
+        coincide = self.contiene(valores, columna_busqueda)
+
+        resultado = self.dataset_entrada.copy(deep=False)
+        resultado.index = pd.RangeIndex(len(resultado))
+        resultado[columna_a_buscar] = valores.to_numpy()
+        resultado[nombre_columna_busqueda] = np.where(coincide, valores.to_numpy(), np.nan)
+        resultado[nombre_columna_resultado] = np.where(coincide, valor_coincidencia, '')
         return resultado
     
-def inmovilizadosConverted(df_inmovilizados, df_criticos):
+# Tramos de días inmovilizados y tasa de deducción de cada uno:
+# menos de 180 -> 0, de 180 a 360 -> 0.5, de 361 a 720 -> 0.6, más de 720 -> 1
+LIMITES_TASA_INMOVILIZADO = [180, 361, 721]
+TASAS_INMOVILIZADO = np.array([0, 0.5, 0.6, 1])
+
+# Columnas que se conservan del reporte de INMOVILIZADOS
+COLUMNAS_INMOVILIZADOS = ['Material', 'Descripcion', 'Valor stock', 'Moneda', 'Stock', 'AREA', 'PEDIDO POR',
+                          'RESPONSABLE', 'OBSERVACIONES', 'Und', 'Últ.entr.', ' Últ.mov.', 'Tipo de Repuesto']
+
+def tasa_inmovilizado(dias):
+    """
+    Tasa de deducción por días inmovilizados, calculada por tramos con np.digitize.
+    Los días nulos tienen tasa 0.
+    """
+    dias = np.asarray(dias, dtype=float)
+    tasas = TASAS_INMOVILIZADO[np.digitize(dias, LIMITES_TASA_INMOVILIZADO)]
+    return np.where(np.isnan(dias), 0, tasas)
+
+def normalizar_encabezado_inmovilizados(df_inmovilizados):
+    """
+    Toma la tercera fila del reporte como encabezado (las dos primeras filas son títulos) y
+    conserva solo COLUMNAS_INMOVILIZADOS, en una sola selección y sin modificar el DataFrame recibido.
+    """
+    encabezado = list(df_inmovilizados.iloc[1])
+    posiciones = [encabezado.index(col) if col in encabezado else None for col in COLUMNAS_INMOVILIZADOS]
+    faltantes = [col for col, pos in zip(COLUMNAS_INMOVILIZADOS, posiciones) if pos is None]
+    if faltantes:
+        raise KeyError(f"Columns {faltantes} not found in DataFrame!")
+
+    # La selección ya es un DataFrame nuevo: se le cambian encabezado e índice sin volver a copiarlo
+    df = df_inmovilizados.iloc[2:, posiciones]
+    df.columns = COLUMNAS_INMOVILIZADOS
+    df.index = pd.RangeIndex(len(df))
+    return df
+
+def inmovilizadosConverted(df_inmovilizados, df_criticos, indice_criticos=None):
     """
     Procesa un DataFrame de acuerdo a las especificaciones dadas:
-    - Elimina el nombre de las columnas y lo transforma en una fila.
-    - Elimina las dos primeras filas.
-    - Establece la tercera fila como encabezados.
-    - Conserva solo las columnas deseadas.
-    - Restablece el índice.
+    - Establece la tercera fila como encabezados y conserva solo las columnas deseadas (salvo que
+      ya venga leído con leer_inmovilizados).
     - Busca coincidencias con df_criticos y etiqueta como "CRITICO" o "NO CRITICO".
     - Calcula días inmovilizados.
     - Calcula la deducción y el saldo.
-    """
-    
-    # Mover los nombres de las columnas a una fila en el DataFrame
-    df_inmovilizados.columns = range(df_inmovilizados.shape[1])
-    df_inmovilizados = df_inmovilizados.reset_index(drop=True)
 
-    # Eliminar las dos primeras filas
-    df_inmovilizados = df_inmovilizados.iloc[1:]
+    indice_criticos es un CoincidenciaBuscadorFinal ya construido sobre df_criticos; si no se
+    indica, se crea uno.
+    """
+    # Si ya viene con el encabezado real (leer_inmovilizados), no hay que normalizarlo
+    if set(COLUMNAS_INMOVILIZADOS).issubset(df_inmovilizados.columns):
+        df_inmovilizados = df_inmovilizados[COLUMNAS_INMOVILIZADOS].copy(deep=False)
+    else:
+        df_inmovilizados = normalizar_encabezado_inmovilizados(df_inmovilizados)
+
+    # Etiquetar como "CRITICO" o "NO CRITICO" con el índice de códigos de df_criticos
+    if indice_criticos is None:
+        indice_criticos = CoincidenciaBuscadorFinal.desde_busqueda(df_criticos, 'Código SAP.')
+    df_inmovilizados['Material'] = df_inmovilizados['Material'].astype(str)
+    es_critico = pd.Series(indice_criticos.contiene(df_inmovilizados['Material'], 'Código SAP.'),
+                           index=df_inmovilizados.index)
+    df_inmovilizados['Código SAP.'] = df_inmovilizados['Material'].where(es_critico)
+    df_inmovilizados['Tipo de repuesto'] = np.where(es_critico, "CRITICO", "NO CRITICO")
 
-    # Establecer la tercera fila (ahora la primera fila) como encabezados
-    df_inmovilizados.columns = df_inmovilizados.iloc[0]
-    df_inmovilizados = df_inmovilizados.iloc[1:]
-    
-    # Conservar solo las columnas deseadas
-    desired_columns = ['Material', 'Descripcion', 'Valor stock', 'Moneda', 'Stock', 'AREA', 'PEDIDO POR', 
-                       'RESPONSABLE', 'OBSERVACIONES', 'Und', 'Últ.entr.', ' Últ.mov.', 'Tipo de Repuesto']
-    df_inmovilizados = df_inmovilizados[desired_columns]
-    
-    # Restablecer el índice
-    df_inmovilizados.reset_index(drop=True, inplace=True)
-    
-    # Buscar coincidencias y etiquetar como "CRITICO" o "NO CRITICO"
-    buscador = CoincidenciaBuscadorFinal(df_inmovilizados, df_criticos)
-    df_inmovilizados = buscador.buscar_coincidencia("Material", "Código SAP.", "CRITICO", "Tipo de repuesto", None)
-    df_inmovilizados["Tipo de repuesto"].replace("", "NO CRITICO", inplace=True)
-    
     # Convertir 'Últ.mov.' a datetime y calcular días inmovilizados
-    df_inmovilizados[' Últ.mov.'] = pd.to_datetime(df_inmovilizados[' Últ.mov.'])
+    df_inmovilizados[' Últ.mov.'] = parsear_fechas(df_inmovilizados[' Últ.mov.'], ' Últ.mov.')
     df_inmovilizados['Dias Inmovilizados'] = (pd.Timestamp.now() - df_inmovilizados[' Últ.mov.']).dt.days
-    
-    # Define la función que calcula la tasa basada en los días inmovilizados
-    def get_tasa(days):
-        if 180 <= days <= 360:
-            return 0.5
-        elif 361 <= days <= 720:
-            return 0.6
-        elif days > 720:
-            return 1
-        return 0
-    
+
     # Calcular deducción y saldo
+    valor_stock = df_inmovilizados["Valor stock"].astype(float)
     mask_no_critico = df_inmovilizados["Tipo de Repuesto"] == "NO CRITICO"
-    df_inmovilizados.loc[mask_no_critico, "Deducción"] = df_inmovilizados.loc[mask_no_critico, "Dias Inmovilizados"].apply(get_tasa) * df_inmovilizados.loc[mask_no_critico, "Valor stock"].astype(float)
-    df_inmovilizados["SALDO"] = df_inmovilizados["Valor stock"].astype(float) - df_inmovilizados["Deducción"]
-    
+    df_inmovilizados["Deducción"] = np.where(mask_no_critico,
+                                             tasa_inmovilizado(df_inmovilizados["Dias Inmovilizados"]) * valor_stock,
+                                             np.nan)
+    df_inmovilizados["SALDO"] = valor_stock - df_inmovilizados["Deducción"]
+
     # Etiquetar como 'inmovilizado' si los días inmovilizados son >= 180 y el tipo de repuesto es "NO CRITICO"
-    condition = (df_inmovilizados["Dias Inmovilizados"] >= 180) & (df_inmovilizados["Tipo de repuesto"] == "NO CRITICO")
+    condition = (df_inmovilizados["Dias Inmovilizados"] >= 180) & ~es_critico
     df_inmovilizados["Estado Inmovilizado"] = np.where(condition, "inmovilizado", "")
-    # Eliminar valores duplicados basados en todas las columnas
-    df_inmovilizados.drop_duplicates(inplace=True)
+    # Eliminar valores duplicados basados en todas las columnas (sin copiar si no los hay)
+    duplicados = df_inmovilizados.duplicated()
+    if duplicados.any():
+        df_inmovilizados = df_inmovilizados[~duplicados]
     return df_inmovilizados
 
 def vectorized_process_material(df, columns):
     """
     Procesa las columnas especificadas en un DataFrame para que sean consistentes y manejables.
     En particular, ajusta los tipos de datos de las columnas, convirtiendo la columna en un tipo de dato string.
+    Retorna un DataFrame nuevo; el recibido no se modifica.
     """
-    
+    df = df.copy(deep=False)
     for col in columns:
-        is_nan = pd.isna(df[col])
-        is_numeric = df[col].astype(str).str.isnumeric()
+        # Columnas leídas ya tipadas (p. ej. int64) pasan a object para poder guardar texto
+        valores = df[col].astype(object)
+        is_nan = pd.isna(valores)
+        is_numeric = valores.astype(str).str.isnumeric()
         
-        df.loc[is_numeric, col] = df.loc[is_numeric, col].astype(int).astype(str)
-        df.loc[is_nan, col] = np.nan
+        valores = valores.where(~is_numeric, valores[is_numeric].astype(int).astype(str))
+        df[col] = valores.where(~is_nan, np.nan)
+    return df
 
 def set_column_dtypes(data, column_type_mapping):
     """
@@ -375,20 +444,24 @@ def set_column_dtypes(data, column_type_mapping):
     - column_type_mapping (dict): Diccionario que mapea nombres de columnas a tipos de datos deseados.
 
     Retorna:
-    - DataFrame con tipos de columna modificados.
+    - DataFrame nuevo con tipos de columna modificados (el recibido no se modifica).
     """
     default_na_values = {
         'float64': 0,
         'int64': 0,
-        'datetime64[ns]': pd.Timestamp('1970-01-01'),
         'str': 'Unknown'
     }
 
+    data = data.copy(deep=False)
     for column_name, data_type in column_type_mapping.items():
         if column_name in data.columns:
+            # Fechas: se parsean una sola vez y los nulos quedan como NaT (sin fecha centinela)
+            if data_type == 'datetime64[ns]':
+                data[column_name] = parsear_fechas(data[column_name], column_name)
+                continue
             try:
                 default_value = default_na_values.get(data_type, "Unknown")
-                data[column_name].fillna(default_value, inplace=True)
+                data[column_name] = data[column_name].fillna(default_value)
                 data[column_name] = data[column_name].astype(data_type)
                 #print(f"La columna {column_name} se ha convertido a {data_type}.")
             except Exception as e:
@@ -403,9 +476,30 @@ def process_dataframes_for_join(df_ME5A,
                                 df_ME2N_OC,
                                 df_ZMB52,
                                 df_MCBE,df_inmovilizados,
-                                df_criticos
+                                df_criticos,
+                                indice_criticos=None,
+                                corregir_solicitantes=None,
+                                inmovilizados_convertidos=None,
+                                stock_agregado=None
                                 ):
-    """Prepara DataFrames para las operaciones de join."""
+    """Prepara DataFrames para las operaciones de join.
+
+    indice_criticos es el CoincidenciaBuscadorFinal sobre CRITICOS compartido con merge_dataframes.
+
+    corregir_solicitantes indica a qué reportes ('ME5A', 'ZMM621_fechaAprobacion', 'ME2N_OC') se les
+    agrega 'Solicitante Corregido' (clave 'solicitantes' de utilities.linaje_columnas.resolver_linaje);
+    None corrige los tres, como en el reporte completo.
+
+    inmovilizados_convertidos es el resultado de inmovilizadosConverted ya calculado (por ejemplo, desde
+    utilities.datos_referencia.RegistroReferencia); si se indica, df_inmovilizados no se vuelve a procesar.
+
+    stock_agregado es ZMB52 ya agregado por material (utilities.stock, por ejemplo desde una instantánea);
+    si no se indica, df_ZMB52 se agrega con utilities.stock.agregar_stock.
+
+    Los DataFrames recibidos no se modifican: cada paso devuelve un DataFrame nuevo que reemplaza
+    columnas en lugar de escribir sobre las del llamador (con copy-on-write de pandas activo estas
+    copias son diferidas y no duplican datos).
+    """
     column_types = {
         'Fecha de solicitud': 'datetime64[ns]',
         'Fecha de reg. Factura': 'datetime64[ns]',
@@ -416,12 +510,12 @@ def process_dataframes_for_join(df_ME5A,
         # Añade cualquier otra columna que necesites definir aquí
     }
 
-    set_column_dtypes(df_ME5A, column_types)
-    set_column_dtypes(df_ZMM621_fechaAprobacion, column_types)
-    set_column_dtypes(df_IW38, column_types)
-    set_column_dtypes(df_ME2N_OC, column_types)
-    set_column_dtypes(df_ZMB52, column_types)
-    set_column_dtypes(df_MCBE, column_types)
+    df_ME5A = set_column_dtypes(df_ME5A, column_types)
+    df_ZMM621_fechaAprobacion = set_column_dtypes(df_ZMM621_fechaAprobacion, column_types)
+    df_IW38 = set_column_dtypes(df_IW38, column_types)
+    df_ME2N_OC = set_column_dtypes(df_ME2N_OC, column_types)
+    df_ZMB52 = set_column_dtypes(df_ZMB52, column_types)
+    df_MCBE = set_column_dtypes(df_MCBE, column_types)
     
     
     #######################################
@@ -434,46 +528,47 @@ def process_dataframes_for_join(df_ME5A,
     }
     
     def standardize_columns_for_dataframe(df, column_mapping):
-        df.rename(columns=column_mapping, inplace=True)
+        # Sin copia si no hay columnas que renombrar
+        if not any(col in df.columns for col in column_mapping):
+            return df
+        return df.rename(columns=column_mapping, copy=False)
     
-    standardize_columns_for_dataframe(df_ME5A, column_name_mapping)
-    standardize_columns_for_dataframe(df_ZMM621_fechaAprobacion, column_name_mapping)
-    standardize_columns_for_dataframe(df_IW38, column_name_mapping)
-    standardize_columns_for_dataframe(df_ME2N_OC, column_name_mapping)
-    standardize_columns_for_dataframe(df_ZMB52, column_name_mapping)
-    standardize_columns_for_dataframe(df_MCBE, column_name_mapping)
+    df_ME5A = standardize_columns_for_dataframe(df_ME5A, column_name_mapping)
+    df_ZMM621_fechaAprobacion = standardize_columns_for_dataframe(df_ZMM621_fechaAprobacion, column_name_mapping)
+    df_IW38 = standardize_columns_for_dataframe(df_IW38, column_name_mapping)
+    df_ME2N_OC = standardize_columns_for_dataframe(df_ME2N_OC, column_name_mapping)
+    df_ZMB52 = standardize_columns_for_dataframe(df_ZMB52, column_name_mapping)
+    df_MCBE = standardize_columns_for_dataframe(df_MCBE, column_name_mapping)
     
-    lista_maestra_dict = {
-    "EMANCHEGOM": "JEF-MM03",
-    "MLAGUNAR(G)": "JEF-GE01",
-    "MLAGUNAR": "JEF-ME02",
-    "YPANDIAP": "JEF-ME01",
-    "CTICSER": "JEF-MG01",
-    "JPACCOC": "JEF-EM01",
-    "ARADOP": "JEF-PL01",
-    "MMELGARN":"JEF-MG01",
-    "MMAGOB":"JEF-MG01",
-    "PPAREDEST":"",
-    "JDELGADOCH":"",
-    "GLUNAR":"",
-    "331_TECCOMUN":"",
-    }
+    lista_maestra_dict = LISTA_MAESTRA_SOLICITANTES
     
     # Corrigiendo la columna por defecto 'Solicitante'
 
-    corregir_solicitantes_vectorizado(df_ME5A, lista_maestra_dict,'Solicitante')
-    corregir_solicitantes_vectorizado(df_ZMM621_fechaAprobacion,lista_maestra_dict,'Solicitante de la solicitud pedido')
-    corregir_solicitantes_vectorizado(df_ME2N_OC,lista_maestra_dict,'Solicitante')
+    def corregir(nombre):
+        return corregir_solicitantes is None or nombre in corregir_solicitantes
+
+    if corregir('ME5A'):
+        df_ME5A = corregir_solicitantes_vectorizado(df_ME5A, lista_maestra_dict,'Solicitante')
+    if corregir('ZMM621_fechaAprobacion'):
+        df_ZMM621_fechaAprobacion = corregir_solicitantes_vectorizado(df_ZMM621_fechaAprobacion,lista_maestra_dict,'Solicitante de la solicitud pedido')
+    if corregir('ME2N_OC'):
+        df_ME2N_OC = corregir_solicitantes_vectorizado(df_ME2N_OC,lista_maestra_dict,'Solicitante')
     
-    df_ZMB52 = df_ZMB52.pivot_table(
-        index=['Material'],
-        values=['Valor libre util.', 'Libre utilización'],
-        aggfunc='sum').reset_index()
+    # Stock por material con la llave ya normalizada (importación diferida: utilities.stock usa este módulo)
+    if stock_agregado is not None:
+        df_ZMB52 = stock_agregado
+    else:
+        from utilities.stock import agregar_stock
+        df_ZMB52 = agregar_stock(df_ZMB52)
     
     # Columnas a procesar
     cols_to_process = ['Material']
-    vectorized_process_material(df_ZMB52, cols_to_process)
-    vectorized_process_material(df_ME5A, cols_to_process)
+    df_ME5A = vectorized_process_material(df_ME5A, cols_to_process)
+    df_MCBE = vectorized_process_material(df_MCBE, cols_to_process)
+    
+    # 'Orden de mantenimiento' se convierte a numérico una sola vez, antes de derivar las tablas de ZMM621
+    df_ZMM621_fechaAprobacion['Orden de mantenimiento'] = convertir_orden_mantenimiento(
+        df_ZMM621_fechaAprobacion['Orden de mantenimiento'])
     
     # Se crean versiones procesadas de ciertos DataFrames para usar en la fusión
     df_ZMM621_OCompras = create_ZMM621_COMODIN_OC_unique(df_ZMM621_fechaAprobacion)
@@ -481,9 +576,12 @@ def process_dataframes_for_join(df_ME5A,
     df_ZMM621_HES_HEM = create_ZMM621_COMODIN_OC_HES_HEM(df_ZMM621_fechaAprobacion)
     
     cols_to_process=['Orden']
-    vectorized_process_material(df_ZMM621_OMant,cols_to_process)
-    vectorized_process_material(df_IW38,cols_to_process)
+    df_ZMM621_OMant = vectorized_process_material(df_ZMM621_OMant,cols_to_process)
+    df_IW38 = vectorized_process_material(df_IW38,cols_to_process)
     
-    df_inmovilizados_converted = inmovilizadosConverted(df_inmovilizados,df_criticos)
+    if inmovilizados_convertidos is not None:
+        df_inmovilizados_converted = inmovilizados_convertidos
+    else:
+        df_inmovilizados_converted = inmovilizadosConverted(df_inmovilizados,df_criticos,indice_criticos)
     
     return df_ME5A, df_ZMM621_fechaAprobacion, df_IW38, df_ME2N_OC, df_ZMB52, df_MCBE, df_inmovilizados_converted, df_criticos,df_ZMM621_OCompras,df_ZMM621_OMant,df_ZMM621_HES_HEM
\ No newline at end of file
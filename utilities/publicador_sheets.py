@@ -0,0 +1,309 @@
+import hashlib
+import json
+import os
+import random
+import time
+
+import numpy as np
+import pandas as pd
+
+#--------------------------------------------
+# PUBLICACIÓN DEL REPORTE EN GOOGLE SHEETS
+#--------------------------------------------
+
+# Filas por bloque: unidad de comparación entre publicaciones (solo se reenvían los bloques que cambian)
+FILAS_POR_BLOQUE = 1000
+
+# Celdas máximas por llamada a values_batch_update (varios bloques viajan en una sola llamada)
+CELDAS_POR_LLAMADA = 200_000
+
+# Límite de celdas de un libro de Google Sheets
+LIMITE_CELDAS_LIBRO = 10_000_000
+
+# Reintentos ante errores transitorios (cuota excedida, errores 5xx) con espera exponencial
+REINTENTOS = 5
+ESPERA_INICIAL = 1.0
+ESPERA_MAXIMA = 64.0
+
+# Códigos HTTP de la API de Sheets que se reintentan
+CODIGOS_TRANSITORIOS = {429, 500, 502, 503, 504}
+
+
+class ErrorTransitorio(Exception):
+    """Error que vale la pena reintentar (lo usa ClienteSheetsMemoria para simular cuotas y caídas)."""
+
+
+def columna_a1(numero):
+    """Letra de columna A1 de la columna `numero` (1 -> 'A', 27 -> 'AA')."""
+    letras = ''
+    while numero > 0:
+        numero, resto = divmod(numero - 1, 26)
+        letras = chr(65 + resto) + letras
+    return letras
+
+
+def rango_a1(hoja, fila_inicial, filas, columnas):
+    """Rango A1 con el nombre de la hoja entre comillas: "'Result'!A2:BH1001"."""
+    nombre = hoja.replace("'", "''")
+    return f"'{nombre}'!A{fila_inicial}:{columna_a1(columnas)}{fila_inicial + filas - 1}"
+
+
+_TIPOS_JSON = [str, int, float, bool]
+
+
+def preparar_valores(df):
+    """
+    DataFrame con valores que la API acepta tal cual: fechas como texto 'AAAA-MM-DD HH:MM:SS' (o
+    'AAAA-MM-DD' si no tienen hora), vacíos como '' y el resto como escalares de Python.
+    """
+    columnas = {}
+    for col in df.columns:
+        serie = df[col]
+        if pd.api.types.is_datetime64_any_dtype(serie):
+            formato = '%Y-%m-%d' if (serie.dropna().dt.normalize() == serie.dropna()).all() else '%Y-%m-%d %H:%M:%S'
+            serie = serie.dt.strftime(formato)
+        elif pd.api.types.is_float_dtype(serie):
+            serie = serie.where(np.isfinite(serie.to_numpy(dtype=float, na_value=np.nan)))
+        valores = serie.astype(object)
+        valores = valores.where(valores.notna(), '')
+        if serie.dtype == object:
+            # Columnas mixtas: escalares de numpy como números de Python y fechas u otros objetos como texto
+            otros = ~valores.map(type).isin(_TIPOS_JSON)
+            if otros.any():
+                valores[otros] = valores[otros].map(lambda v: v.item() if isinstance(v, np.generic) else str(v))
+        columnas[str(col)] = valores
+    return pd.DataFrame(columnas, index=pd.RangeIndex(len(df)))
+
+
+# -------------------------
+# Clientes
+# -------------------------
+class ClienteSheetsGspread:
+    """
+    Cliente sobre gspread para un libro de Google Sheets.
+
+    Parámetros:
+    - id_libro (str): Identificador del libro (la parte /d/<id>/ de su URL).
+    - credenciales (str): Ruta al JSON de la cuenta de servicio con acceso al libro.
+    """
+    def __init__(self, id_libro, credenciales):
+        try:
+            import gspread
+        except ImportError as e:
+            raise ImportError("La publicación en Google Sheets requiere gspread (pip install gspread).") from e
+        self.gspread = gspread
+        self.identificador = id_libro
+        self.libro = gspread.service_account(filename=credenciales).open_by_key(id_libro)
+
+    def es_transitorio(self, error):
+        respuesta = getattr(error, 'response', None)
+        return (isinstance(error, self.gspread.exceptions.APIError)
+                and getattr(respuesta, 'status_code', None) in CODIGOS_TRANSITORIOS)
+
+    def asegurar_hoja(self, hoja, filas, columnas):
+        """Crea la hoja si no existe y la redimensiona para que quepan `filas` x `columnas`."""
+        try:
+            worksheet = self.libro.worksheet(hoja)
+        except self.gspread.exceptions.WorksheetNotFound:
+            self.libro.add_worksheet(title=hoja, rows=filas, cols=columnas)
+            return
+        if worksheet.row_count != filas or worksheet.col_count < columnas:
+            worksheet.resize(rows=filas, cols=max(columnas, worksheet.col_count))
+
+    def escribir(self, actualizaciones):
+        """Una llamada values_batch_update con varios rangos: [{'range': ..., 'values': [[...]]}, ...]."""
+        self.libro.values_batch_update({'valueInputOption': 'RAW', 'data': actualizaciones})
+
+    def limpiar(self, rango):
+        self.libro.values_clear(rango)
+
+
+class ClienteSheetsMemoria:
+    """
+    Cliente en memoria con la misma interfaz que ClienteSheetsGspread, para probar la publicación
+    sin red: guarda las celdas por hoja, registra cada llamada y puede simular latencia por llamada
+    y errores transitorios (las primeras `fallos` llamadas a escribir fallan).
+    """
+    def __init__(self, identificador='memoria', latencia=0.0, fallos=0):
+        self.identificador = identificador
+        self.latencia = latencia
+        self.fallos = fallos
+        self.hojas = {}
+        self.llamadas = []
+
+    def es_transitorio(self, error):
+        return isinstance(error, ErrorTransitorio)
+
+    def asegurar_hoja(self, hoja, filas, columnas):
+        self.llamadas.append(('asegurar_hoja', hoja, filas, columnas))
+        celdas = self.hojas.setdefault(hoja, {})
+        for fila, columna in [clave for clave in celdas if clave[0] > filas]:
+            del celdas[(fila, columna)]
+
+    def escribir(self, actualizaciones):
+        if self.latencia:
+            time.sleep(self.latencia)
+        if self.fallos:
+            self.fallos -= 1
+            self.llamadas.append(('error', len(actualizaciones)))
+            raise ErrorTransitorio("Cuota excedida (simulado)")
+        celdas_escritas = 0
+        for actualizacion in actualizaciones:
+            hoja, fila_inicial = self._origen(actualizacion['range'])
+            celdas = self.hojas.setdefault(hoja, {})
+            for i, fila in enumerate(actualizacion['values']):
+                for j, valor in enumerate(fila):
+                    celdas[(fila_inicial + i, j + 1)] = valor
+                celdas_escritas += len(fila)
+        self.llamadas.append(('escribir', len(actualizaciones), celdas_escritas))
+
+    def limpiar(self, rango):
+        self.llamadas.append(('limpiar', rango))
+        hoja, fila_inicial = self._origen(rango)
+        if hoja not in self.hojas:
+            # Como la API: limpiar una hoja que no existe es un error no transitorio
+            raise ValueError(f"Unable to parse range: {rango}")
+        celdas = self.hojas[hoja]
+        for clave in [clave for clave in celdas if clave[0] >= fila_inicial]:
+            del celdas[clave]
+
+    @staticmethod
+    def _origen(rango):
+        if '!' not in rango:
+            return rango[1:-1].replace("''", "'"), 1
+        hoja, celdas = rango.rsplit('!', 1)
+        inicio = celdas.split(':')[0]
+        return hoja[1:-1].replace("''", "'"), int(inicio.lstrip('ABCDEFGHIJKLMNOPQRSTUVWXYZ'))
+
+    def como_dataframe(self, hoja):
+        """Contenido de una hoja (primera fila como encabezado), para comparar con lo publicado."""
+        celdas = self.hojas.get(hoja, {})
+        if not celdas:
+            return pd.DataFrame()
+        filas = max(fila for fila, _ in celdas)
+        columnas = max(columna for _, columna in celdas)
+        matriz = [[celdas.get((fila, columna), '') for columna in range(1, columnas + 1)]
+                  for fila in range(1, filas + 1)]
+        return pd.DataFrame(matriz[1:], columns=matriz[0])
+
+
+# -------------------------
+# Publicador
+# -------------------------
+class PublicadorSheets:
+    """
+    Publica DataFrames (reporte final y hojas de resumen) en un libro de Google Sheets.
+
+    - Cada hoja se divide en bloques de `filas_por_bloque` filas con una huella (sha256 de los hashes
+      por fila de pandas); al volver a publicar solo se envían los bloques cuya huella cambió y la hoja
+      se redimensiona a las filas publicadas. Si cambian las columnas, la hoja se limpia y se reenvía entera.
+    - Los bloques se agrupan en llamadas values_batch_update de hasta `celdas_por_llamada` celdas.
+    - Los errores transitorios (cuota, 5xx) se reintentan con espera exponencial y variación aleatoria.
+    - Las huellas se guardan en `archivo_huellas` (si se indica) para comparar entre ejecuciones.
+
+    Parámetros:
+    - cliente: ClienteSheetsGspread, ClienteSheetsMemoria u otro con la misma interfaz.
+    - dormir (callable): Función de espera (time.sleep; se sustituye en pruebas).
+    """
+    def __init__(self, cliente, filas_por_bloque=FILAS_POR_BLOQUE, celdas_por_llamada=CELDAS_POR_LLAMADA,
+                 reintentos=REINTENTOS, espera_inicial=ESPERA_INICIAL, archivo_huellas=None, dormir=time.sleep):
+        self.cliente = cliente
+        self.filas_por_bloque = filas_por_bloque
+        self.celdas_por_llamada = celdas_por_llamada
+        self.reintentos = reintentos
+        self.espera_inicial = espera_inicial
+        self.archivo_huellas = archivo_huellas
+        self.dormir = dormir
+        self.huellas = {}
+        if archivo_huellas and os.path.exists(archivo_huellas):
+            with open(archivo_huellas, encoding="utf-8") as f:
+                self.huellas = json.load(f)
+
+    def _con_reintentos(self, funcion, *args):
+        """Llama a funcion(*args) reintentando los errores transitorios con espera exponencial."""
+        for intento in range(self.reintentos + 1):
+            try:
+                return funcion(*args)
+            except Exception as e:
+                if intento == self.reintentos or not self.cliente.es_transitorio(e):
+                    raise
+                espera = min(ESPERA_MAXIMA, self.espera_inicial * 2 ** intento) * (1 + random.random())
+                print(f"Error transitorio de Sheets ({e}); reintento {intento + 1} en {espera:.1f} s")
+                self.dormir(espera)
+
+    def _huellas_bloques(self, valores):
+        """Huella de cada bloque de filas, a partir del hash por fila de todo el DataFrame."""
+        por_fila = pd.util.hash_pandas_object(valores, index=False).to_numpy()
+        return [hashlib.sha256(por_fila[inicio:inicio + self.filas_por_bloque].tobytes()).hexdigest()
+                for inicio in range(0, len(valores), self.filas_por_bloque)]
+
+    def publicar_hoja(self, hoja, df, forzar=False):
+        """
+        Publica un DataFrame en una hoja (encabezado en la fila 1).
+
+        Retorna:
+        - dict: 'Hoja', 'Filas', 'Bloques', 'Bloques enviados', 'Llamadas', 'Celdas' y 'Segundos'.
+        """
+        inicio = time.time()
+        valores = preparar_valores(df)
+        filas, columnas = valores.shape
+        if (filas + 1) * max(columnas, 1) > LIMITE_CELDAS_LIBRO:
+            raise ValueError(f"La hoja '{hoja}' tiene {(filas + 1) * columnas} celdas y Google Sheets admite "
+                             f"{LIMITE_CELDAS_LIBRO} por libro. Publique un perfil con menos columnas.")
+
+        clave = f"{self.cliente.identificador}::{hoja}"
+        anterior = {} if forzar else self.huellas.get(clave, {})
+        encabezado = list(valores.columns)
+        bloques = self._huellas_bloques(valores)
+        # Si cambian las columnas, cambia el contenido de todos los bloques: se reenvía todo
+        mismas_columnas = anterior.get('columnas') == encabezado
+        previos = anterior.get('bloques', []) if mismas_columnas else []
+        cambiados = [i for i, huella in enumerate(bloques) if i >= len(previos) or previos[i] != huella]
+
+        # La hoja se crea si no existe (limpiar una hoja inexistente es un error 400 de la API) y queda con
+        # exactamente las filas publicadas: las sobrantes de una publicación anterior se eliminan
+        self._con_reintentos(self.cliente.asegurar_hoja, hoja, filas + 1, max(columnas, 1))
+        if not mismas_columnas:
+            # Primera publicación o columnas distintas: se limpia la hoja entera antes de escribir
+            self._con_reintentos(self.cliente.limpiar, "'" + hoja.replace("'", "''") + "'")
+        actualizaciones = [] if mismas_columnas else [{'range': rango_a1(hoja, 1, 1, columnas), 'values': [encabezado]}]
+        for i in cambiados:
+            bloque = valores.iloc[i * self.filas_por_bloque:(i + 1) * self.filas_por_bloque]
+            actualizaciones.append({'range': rango_a1(hoja, 2 + i * self.filas_por_bloque, len(bloque), columnas),
+                                    'values': bloque.to_numpy().tolist()})
+
+        # Llamadas de hasta celdas_por_llamada celdas
+        llamadas = 0
+        lote, celdas_lote = [], 0
+        for actualizacion in actualizaciones + [None]:
+            celdas = 0 if actualizacion is None else len(actualizacion['values']) * max(columnas, 1)
+            if lote and (actualizacion is None or celdas_lote + celdas > self.celdas_por_llamada):
+                self._con_reintentos(self.cliente.escribir, lote)
+                llamadas += 1
+                lote, celdas_lote = [], 0
+            if actualizacion is not None:
+                lote.append(actualizacion)
+                celdas_lote += celdas
+
+        self.huellas[clave] = {'columnas': encabezado, 'bloques': bloques, 'filas': filas}
+        return {'Hoja': hoja, 'Filas': filas, 'Bloques': len(bloques), 'Bloques enviados': len(cambiados),
+                'Llamadas': llamadas, 'Celdas': sum(len(a['values']) for a in actualizaciones) * columnas,
+                'Segundos': round(time.time() - inicio, 2)}
+
+    def publicar(self, hojas, forzar=False):
+        """
+        Publica varias hojas y guarda las huellas.
+
+        Parámetros:
+        - hojas (dict): Nombre de hoja -> DataFrame.
+        - forzar (bool): Reenvía todo aunque las huellas no hayan cambiado (p. ej. si se editó el libro a mano).
+
+        Retorna:
+        - DataFrame: Una fila por hoja con lo publicado (ver publicar_hoja).
+        """
+        resumen = [self.publicar_hoja(hoja, df, forzar) for hoja, df in hojas.items()]
+        if self.archivo_huellas:
+            with open(self.archivo_huellas + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(self.huellas, f)
+            os.replace(self.archivo_huellas + ".tmp", self.archivo_huellas)
+        return pd.DataFrame(resumen)
@@ -8,13 +8,15 @@ def rename_column(data, current_name, new_name):
     - nuevo_nombre (str): Nuevo nombre de la columna.
 
     Retorna:
-    - DataFrame: DataFrame con columna renombrada.
+    - DataFrame: DataFrame nuevo con la columna renombrada (el recibido no se modifica).
     """
-    data.rename(columns={current_name: new_name}, inplace=True)
-    return data
+    return data.rename(columns={current_name: new_name}, copy=False)
 
 def refine_joined_data(joined_data):
-    """Refine the joined data by renaming columns and filling missing values."""
+    """Refine the joined data by renaming columns and filling missing values.
+
+    Returns a new DataFrame; the input is not modified.
+    """
     rename_mappings = {
         'Fecha de solicitud': 'Fecha de SOLPED',
         'Indicador de borrado_x': 'Indicador de borrado SOLPED',
@@ -27,8 +29,8 @@ def refine_joined_data(joined_data):
         
     }
 
-    for current_name, new_name in rename_mappings.items():
-        rename_column(joined_data, current_name, new_name)
+    # Un solo rename con todo el mapeo, en lugar de una copia por columna
+    joined_data = joined_data.rename(columns=rename_mappings, copy=False)
 
     fill_mappings = {
         'Estado factura': 'SIN OC',
@@ -36,6 +38,8 @@ def refine_joined_data(joined_data):
     }
 
     for col, value in fill_mappings.items():
-        joined_data[col].fillna(value, inplace=True)
+        # Con un perfil de reporte reducido algunas uniones no se hacen (ver utilities.linaje_columnas)
+        if col in joined_data.columns:
+            joined_data[col] = joined_data[col].fillna(value)
 
     return joined_data   
\ No newline at end of file
@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+
+#--------------------------------------------
+# RESÚMENES PRECALCULADOS DEL REPORTE
+#--------------------------------------------
+
+# Dimensiones del cubo de resumen (además del periodo de la OC)
+DIMENSIONES_RESUMEN = ['TIPO COMPROMETIDO SUGERENCIA', 'Pto.tbjo.responsable', 'Solicitante Corregido', 'Estado factura']
+COLUMNA_PERIODO = 'Periodo OC'
+
+# Medidas sumables del cubo: nombre en el resumen -> columna del reporte
+MEDIDAS_RESUMEN = {
+    'Monto USD': 'Precio Convertido Dolares',
+    'Costo compras por retirar': 'Costo compras por retirar',
+}
+
+COLUMNAS_DEMORA = ['DEMORA EN GENERAR OC (DIAS)', 'DEMORA EN LIBERACIONES DE OC']
+PERCENTILES_DEMORA = [0.5, 0.75, 0.9, 0.95]
+
+# Texto para los valores vacíos de las dimensiones (los filtros no manejan NaN)
+SIN_DATO = '(vacío)'
+
+# Nombres de las hojas de resumen (se exportan junto a las hojas procesadas)
+HOJA_CUBO = 'RESUMEN_CUBO'
+HOJA_DEMORAS = 'RESUMEN_DEMORAS'
+HOJA_INDICADORES = 'RESUMEN_INDICADORES'
+HOJAS_RESUMEN = [HOJA_CUBO, HOJA_DEMORAS, HOJA_INDICADORES]
+
+
+def _dimension(serie):
+    """Dimensión como texto, con SIN_DATO en los vacíos."""
+    texto = serie.astype(object).where(serie.notna(), SIN_DATO).astype(str)
+    return texto.mask(texto.str.strip().isin(['', 'nan']), SIN_DATO)
+
+
+def _periodo(fechas):
+    """'AAAA-MM' de la fecha de OC (SIN_DATO si no tiene)."""
+    if not pd.api.types.is_datetime64_any_dtype(fechas):
+        fechas = pd.to_datetime(fechas, errors='coerce')
+    return fechas.dt.strftime('%Y-%m').fillna(SIN_DATO)
+
+
+def calcular_cubo(result):
+    """
+    Agrega el reporte por DIMENSIONES_RESUMEN y periodo de la OC, en una sola pasada.
+
+    Retorna:
+    - DataFrame con una fila por combinación presente: las dimensiones, 'Periodo OC', 'Registros'
+      y las sumas de MEDIDAS_RESUMEN. Las dimensiones o medidas que el reporte no tiene (perfiles
+      reducidos, ver utilities.linaje_columnas) se omiten.
+    """
+    claves = {col: _dimension(result[col]) for col in DIMENSIONES_RESUMEN if col in result.columns}
+    if 'Fecha de OC' in result.columns:
+        claves[COLUMNA_PERIODO] = _periodo(result['Fecha de OC'])
+    datos = pd.DataFrame(claves, index=result.index)
+    datos['Registros'] = 1
+    for nombre, columna in MEDIDAS_RESUMEN.items():
+        if columna in result.columns:
+            datos[nombre] = pd.to_numeric(result[columna], errors='coerce')
+    if not claves:
+        return datos.sum().to_frame().T
+    return datos.groupby(list(claves), sort=True).sum().reset_index()
+
+
+def calcular_demoras(result, dimension='TIPO COMPROMETIDO SUGERENCIA', percentiles=PERCENTILES_DEMORA):
+    """
+    Percentiles de las columnas DEMORA (días), en total y por una dimensión.
+
+    Retorna:
+    - DataFrame con 'Demora', 'Grupo' ('TOTAL' o el valor de la dimensión), 'Registros' (filas con
+      demora calculada), 'Promedio' y una columna por percentil ('P50', 'P75', ...).
+    """
+    filas = []
+    for columna in COLUMNAS_DEMORA:
+        if columna not in result.columns:
+            continue
+        dias = pd.to_numeric(result[columna], errors='coerce')
+        grupos = [('TOTAL', dias)]
+        if dimension in result.columns:
+            grupos += list(dias.groupby(_dimension(result[dimension]), sort=True))
+        for grupo, valores in grupos:
+            valores = valores.dropna().to_numpy(dtype=float)
+            fila = {'Demora': columna, 'Grupo': grupo, 'Registros': len(valores),
+                    'Promedio': valores.mean() if len(valores) else np.nan}
+            cuantiles = np.quantile(valores, percentiles) if len(valores) else [np.nan] * len(percentiles)
+            for p, valor in zip(percentiles, cuantiles):
+                fila[f"P{int(p * 100)}"] = valor
+            filas.append(fila)
+    return pd.DataFrame(filas)
+
+
+def calcular_indicadores(cubo):
+    """Totales generales (registros y medidas del cubo) como tabla Indicador / Valor."""
+    medidas = ['Registros'] + [nombre for nombre in MEDIDAS_RESUMEN if nombre in cubo.columns]
+    totales = cubo[medidas].sum()
+    return pd.DataFrame({'Indicador': totales.index, 'Valor': totales.to_numpy(dtype=float)})
+
+
+def calcular_resumenes(result):
+    """
+    Resúmenes del reporte para el tablero de la aplicación y el Excel de salida.
+
+    Parámetros:
+    - result (DataFrame): Reporte final de process_data.
+
+    Retorna:
+    - dict: HOJA_CUBO, HOJA_DEMORAS y HOJA_INDICADORES. Son tablas pequeñas: los filtros y gráficos
+      del tablero se resuelven sobre el cubo sin volver a recorrer el reporte.
+    """
+    cubo = calcular_cubo(result)
+    return {
+        HOJA_CUBO: cubo,
+        HOJA_DEMORAS: calcular_demoras(result),
+        HOJA_INDICADORES: calcular_indicadores(cubo),
+    }
+
+
+def filtrar_cubo(cubo, filtros):
+    """
+    Filtra el cubo por valores de sus dimensiones.
+
+    Parámetros:
+    - cubo (DataFrame): Hoja HOJA_CUBO.
+    - filtros (dict): Dimensión -> lista de valores aceptados (las listas vacías no filtran).
+    """
+    mascara = np.ones(len(cubo), dtype=bool)
+    for dimension, valores in filtros.items():
+        if valores and dimension in cubo.columns:
+            mascara &= cubo[dimension].isin(valores).to_numpy()
+    return cubo[mascara]
+
+
+def agregar_cubo(cubo, dimension):
+    """Vuelve a agregar el cubo (ya filtrado) por una sola dimensión, para graficarla."""
+    medidas = ['Registros'] + [nombre for nombre in MEDIDAS_RESUMEN if nombre in cubo.columns]
+    return cubo.groupby(dimension, sort=True)[medidas].sum()
@@ -0,0 +1,139 @@
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+from utilities.datos_referencia import version_de_datos
+from utilities.process_dataframes import vectorized_process_material
+
+#--------------------------------------------
+# AGREGACIÓN DE STOCK (ZMB52) E INSTANTÁNEAS POR FECHA
+#--------------------------------------------
+
+# Columnas de ZMB52 que se suman por material, en el orden de la tabla agregada
+COLUMNAS_STOCK = ['Libre utilización', 'Valor libre util.']
+
+# Prefijo de los archivos de instantánea: stock_<fecha>.pkl
+PREFIJO_INSTANTANEA = "stock_"
+
+
+def agregar_stock(df_ZMB52, columnas=COLUMNAS_STOCK):
+    """
+    Suma el stock de ZMB52 por material, con la llave ya normalizada como en vectorized_process_material.
+
+    El listado se factoriza una sola vez sobre 'Material'; la normalización de la llave se aplica solo
+    a los materiales distintos y las sumas son np.bincount sobre los códigos enteros resultantes, sin
+    pivot_table ni conversiones fila a fila. Los materiales que solo se diferencian en el tipo (1000
+    y '1000') quedan en una sola fila.
+
+    Retorna:
+    - DataFrame con 'Material' y las columnas sumadas, ordenado por material (numérico primero).
+      Equivale a pivot_table(index='Material', aggfunc='sum') seguido de vectorized_process_material.
+    """
+    material = df_ZMB52['Material']
+    if pd.api.types.is_integer_dtype(material) and (len(material) == 0 or material.min() >= 0):
+        # Llaves enteras: np.unique ya las devuelve ordenadas y solo se pasan a texto las distintas
+        enteros, grupo = np.unique(material.to_numpy(dtype=np.int64), return_inverse=True)
+        claves = enteros.astype(str).astype(object)
+        con_material = slice(None)
+        ordenadas = True
+    else:
+        codigos, materiales = pd.factorize(material)
+        normalizadas = vectorized_process_material(pd.DataFrame({'Material': materiales}), ['Material'])['Material']
+        codigos_clave, claves = pd.factorize(normalizadas.to_numpy())
+        con_material = codigos >= 0
+        grupo = codigos_clave[codigos[con_material]]
+        ordenadas = False
+
+    stock = {'Material': claves}
+    for columna in columnas:
+        numeros = pd.to_numeric(df_ZMB52[columna], errors='coerce')[con_material]
+        suma = np.bincount(grupo, weights=numeros.fillna(0).to_numpy(dtype=float), minlength=len(claves))
+        stock[columna] = suma.astype(np.int64) if pd.api.types.is_integer_dtype(numeros) else suma
+    stock = pd.DataFrame(stock)
+    if ordenadas:
+        return stock
+
+    # Mismo orden que pivot_table: materiales numéricos de menor a mayor y luego los de texto
+    numericos = pd.to_numeric(stock['Material'], errors='coerce').to_numpy()
+    orden = np.lexsort((stock['Material'].astype(str).to_numpy(), np.nan_to_num(numericos, nan=0.0),
+                        np.isnan(numericos)))
+    return stock.take(orden).reset_index(drop=True)
+
+
+def version_de_archivo(ruta):
+    """Versión barata de un archivo para las instantáneas: tamaño y fecha de modificación, sin leerlo."""
+    estado = os.stat(ruta)
+    return f"{estado.st_size}-{estado.st_mtime_ns}"
+
+
+class InstantaneasStock:
+    """
+    Stock agregado por material guardado en disco por fecha (stock_<fecha>.pkl en `directorio`).
+
+    - obtener: devuelve el stock agregado de una fecha; si ya hay instantánea de ese mismo listado
+      (misma versión), la carga en lugar de volver a agregar el listado completo. La versión debe ser
+      barata (huella o tamaño y fecha del archivo, ver version_de_archivo): calcularla sobre el
+      listado cuesta casi lo mismo que agregarlo.
+    - historial: une todas las instantáneas con una columna 'Fecha' (historia de stock barata).
+    """
+    def __init__(self, directorio):
+        self.directorio = directorio
+        os.makedirs(directorio, exist_ok=True)
+
+    def ruta(self, fecha):
+        return os.path.join(self.directorio, f"{PREFIJO_INSTANTANEA}{fecha}.pkl")
+
+    def fechas(self):
+        """Fechas (etiquetas) con instantánea guardada, en orden."""
+        rutas = glob.glob(os.path.join(self.directorio, f"{PREFIJO_INSTANTANEA}*.pkl"))
+        return sorted(os.path.basename(ruta)[len(PREFIJO_INSTANTANEA):-len(".pkl")] for ruta in rutas)
+
+    def cargar(self, fecha):
+        """Stock agregado de una fecha (KeyError si no hay instantánea)."""
+        if not os.path.exists(self.ruta(fecha)):
+            raise KeyError(f"No hay instantánea de stock para {fecha}. Disponibles: {self.fechas()}")
+        return pd.read_pickle(self.ruta(fecha))['stock']
+
+    def obtener(self, df_ZMB52, fecha=None, version=None):
+        """
+        Stock agregado del listado ZMB52 para una fecha, desde su instantánea si ya existe.
+
+        Parámetros:
+        - df_ZMB52 (DataFrame): Listado de stock tal como se leyó.
+        - fecha (str): Fecha o etiqueta de la instantánea (por defecto, hoy 'AAAA-MM-DD').
+        - version (str): Versión del listado que ya tenga quien llama (sha256 del archivo subido,
+          version_de_archivo, ...). Solo si falta se calcula version_de_datos sobre el listado.
+
+        Retorna:
+        - DataFrame: Resultado de agregar_stock.
+        """
+        fecha = fecha or str(pd.Timestamp.now().date())
+        version = version or version_de_datos(df_ZMB52)
+        ruta = self.ruta(fecha)
+        if os.path.exists(ruta):
+            guardada = pd.read_pickle(ruta)
+            if guardada['version'] == version:
+                print(f"Stock de {fecha} cargado de su instantánea")
+                return guardada['stock']
+
+        stock = agregar_stock(df_ZMB52)
+        pd.to_pickle({'version': version, 'stock': stock}, ruta + ".tmp")
+        os.replace(ruta + ".tmp", ruta)
+        return stock
+
+    def historial(self, materiales=None):
+        """
+        Stock de todas las instantáneas: 'Fecha', 'Material' y COLUMNAS_STOCK, opcionalmente solo
+        de algunos materiales (ya normalizados, como texto).
+        """
+        partes = []
+        for fecha in self.fechas():
+            stock = self.cargar(fecha)
+            if materiales is not None:
+                stock = stock[stock['Material'].isin(materiales)]
+            partes.append(stock.assign(Fecha=fecha))
+        if not partes:
+            return pd.DataFrame(columns=['Fecha', 'Material'] + COLUMNAS_STOCK)
+        historial = pd.concat(partes, ignore_index=True)
+        return historial[['Fecha'] + [col for col in historial.columns if col != 'Fecha']]
@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+
+#--------------------------------------------
+# SERVICIO DE TIPOS DE CAMBIO
+#--------------------------------------------
+
+# Prefijo de las columnas de la tabla mensual: 'Tipo_Cambio_PEN', 'Tipo_Cambio_EUR', ...
+PREFIJO_TIPO_CAMBIO = 'Tipo_Cambio_'
+
+
+def _periodo(fechas):
+    """Número de mes absoluto (año * 12 + mes - 1) de cada fecha; -1 para fechas nulas."""
+    fechas = pd.to_datetime(pd.Series(fechas), errors='coerce')
+    periodo = fechas.dt.year * 12 + fechas.dt.month - 1
+    return periodo.fillna(-1).to_numpy(dtype=np.int64)
+
+
+class ServicioTipoCambio:
+    """
+    Tipos de cambio a USD precalculados como un arreglo denso (periodo x moneda).
+
+    La tabla mensual (columnas 'Año', 'Mes' y una 'Tipo_Cambio_<MONEDA>' por moneda) se convierte
+    una sola vez en un arreglo indexado por mes absoluto y moneda, de modo que la conversión de
+    cada fila es un acceso directo al arreglo, sin merge.
+
+    Opcionalmente se puede dar una tabla de tasas diarias (columnas 'Fecha', 'Moneda',
+    'Tipo de Cambio') para cualquier moneda: para esas monedas se usa la última tasa publicada en
+    o antes de la fecha (as-of) y, si no hay ninguna, la tasa mensual.
+
+    Las monedas sin tasa en ninguna tabla (USD incluido) tienen tipo de cambio 1.
+    """
+    def __init__(self, df_tipos_cambio=None, df_tasas_diarias=None):
+        self.monedas = pd.Index([])
+        self.periodo_inicial = 0
+        self.tabla = np.empty((0, 0))
+        if df_tipos_cambio is not None and len(df_tipos_cambio):
+            self._construir_tabla_mensual(df_tipos_cambio)
+
+        self.diarias = {}
+        if df_tasas_diarias is not None:
+            self._construir_tasas_diarias(df_tasas_diarias)
+
+    def _construir_tabla_mensual(self, df_tipos_cambio):
+        columnas = [col for col in df_tipos_cambio.columns if str(col).startswith(PREFIJO_TIPO_CAMBIO)]
+        self.monedas = pd.Index([col[len(PREFIJO_TIPO_CAMBIO):] for col in columnas])
+
+        anios = pd.to_numeric(df_tipos_cambio['Año'], errors='coerce')
+        meses = pd.to_numeric(df_tipos_cambio['Mes'], errors='coerce')
+        validos = (anios.notna() & meses.notna()).to_numpy()
+        periodos = (anios * 12 + meses - 1).to_numpy()[validos].astype(np.int64)
+        if not len(periodos):
+            return
+
+        self.periodo_inicial = periodos.min()
+        self.tabla = np.full((periodos.max() - self.periodo_inicial + 1, len(columnas)), np.nan)
+        valores = df_tipos_cambio[columnas].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)[validos]
+        self.tabla[periodos - self.periodo_inicial] = valores
+
+    def _construir_tasas_diarias(self, df_tasas_diarias):
+        fechas = pd.to_datetime(df_tasas_diarias['Fecha'], errors='coerce')
+        tasas = pd.to_numeric(df_tasas_diarias['Tipo de Cambio'], errors='coerce')
+        validas = fechas.notna() & tasas.notna()
+        diarias = pd.DataFrame({'Fecha': fechas[validas], 'Moneda': df_tasas_diarias['Moneda'][validas],
+                                'Tipo de Cambio': tasas[validas]})
+        for moneda, serie in diarias.sort_values('Fecha', kind='stable').groupby('Moneda'):
+            self.diarias[moneda] = (serie['Fecha'].to_numpy(dtype='datetime64[ns]'),
+                                    serie['Tipo de Cambio'].to_numpy(dtype=float))
+
+    def tasas_mensuales(self, fechas, monedas):
+        """Tipo de cambio de la tabla mensual para cada fila (1 si la moneda no está en la tabla)."""
+        columnas = self.monedas.get_indexer(pd.Series(monedas))
+        filas = _periodo(fechas) - self.periodo_inicial
+        en_rango = (filas >= 0) & (filas < len(self.tabla)) & (columnas >= 0)
+
+        tasas = np.where(columnas >= 0, np.nan, 1.0)
+        tasas[en_rango] = self.tabla[filas[en_rango], columnas[en_rango]]
+        return tasas
+
+    def tasas(self, fechas, monedas):
+        """
+        Tipo de cambio a USD para cada fila.
+
+        Parámetros:
+        - fechas (Series): Fecha de la operación (p. ej. 'Fecha de OC').
+        - monedas (Series): Moneda de cada fila.
+
+        Retorna:
+        - ndarray: Tipo de cambio por fila (NaN si la moneda tiene tabla pero no tasa para esa fecha).
+        """
+        tasas = self.tasas_mensuales(fechas, monedas)
+        if not self.diarias:
+            return tasas
+
+        fechas = pd.to_datetime(pd.Series(fechas), errors='coerce').to_numpy(dtype='datetime64[ns]')
+        monedas = pd.Series(monedas).to_numpy()
+        for moneda, (fechas_tasa, valores) in self.diarias.items():
+            if moneda not in self.monedas:
+                # Moneda solo diaria: sin tasa as-of queda sin tipo de cambio, no en 1
+                tasas[monedas == moneda] = np.nan
+            filas = np.flatnonzero((monedas == moneda) & ~np.isnat(fechas))
+            if not len(filas):
+                continue
+            posiciones = np.searchsorted(fechas_tasa, fechas[filas], side='right') - 1
+            con_tasa = posiciones >= 0
+            tasas[filas[con_tasa]] = valores[posiciones[con_tasa]]
+        return tasas
+
+    def convertir(self, montos, fechas, monedas):
+        """Convierte montos a USD dividiendo entre el tipo de cambio de cada fila."""
+        return pd.to_numeric(pd.Series(montos), errors='coerce').to_numpy(dtype=float) / self.tasas(fechas, monedas)
+
+
+def obtener_servicio_tipo_cambio(df_tipos_cambio):
+    """Acepta la tabla mensual de tipos de cambio o un ServicioTipoCambio ya construido."""
+    if isinstance(df_tipos_cambio, ServicioTipoCambio):
+        return df_tipos_cambio
+    return ServicioTipoCambio(df_tipos_cambio)
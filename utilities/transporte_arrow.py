@@ -0,0 +1,243 @@
+import os
+import pickle
+import shutil
+import tempfile
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+#--------------------------------------------
+# TRANSPORTE DE DATAFRAMES ENTRE PROCESOS (ARROW IPC EN MEMORIA COMPARTIDA)
+#--------------------------------------------
+
+# Qué se copia y qué no: al enviar, cada tabla se escribe una vez al archivo. Al recibir, el archivo
+# se abre con memory map y se convierte con split_blocks/self_destruct: las columnas numéricas y de
+# fecha sin nulos quedan como vistas de solo lectura sobre el archivo, sin copiarse (process_data no
+# modifica sus entradas). Las de texto pasan a objetos de Python y las columnas object que no son
+# solo texto viajan en un pickle aparte.
+
+# Memoria compartida del sistema si existe (Linux); si no, la carpeta temporal
+DIRECTORIO_COMPARTIDO = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+
+# Tablas con menos filas viajan con pickle como siempre: por debajo de este tamaño, crear y abrir
+# los archivos cuesta más que serializarlas (ver comparar_con_pickle)
+FILAS_MINIMAS_TRANSPORTE = 50_000
+
+FORMATO_ARROW = "arrow"
+FORMATO_PICKLE = "pickle"
+
+
+def arrow_disponible():
+    """True si pyarrow está instalado (sin él, el transporte usa pickle en archivos)."""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class TablaCompartida:
+    """
+    Referencia a una tabla escrita por TransporteArrow: solo la ruta y el formato, así que enviarla
+    a otro proceso no serializa los datos (se leen del archivo al recibirla). `columnas_pickle` son
+    las columnas que viajan aparte con pickle (ver escribir_tabla).
+    """
+    def __init__(self, ruta, formato, filas, columnas_pickle=()):
+        self.ruta = ruta
+        self.formato = formato
+        self.filas = filas
+        self.columnas_pickle = list(columnas_pickle)
+
+    def __repr__(self):
+        return f"TablaCompartida({self.formato}, {self.filas} filas, {self.ruta})"
+
+
+def _columnas_solo_pickle(df):
+    """
+    Columnas object que Arrow no devolvería idénticas: las que no son solo texto (números y textos
+    mezclados, frecuentes en los Excel de SAP, fechas sueltas, columnas solo con NaT, ...). Arrow
+    las convertiría a otro tipo.
+    """
+    return [col for col in df.columns
+            if df[col].dtype == object and pd.api.types.infer_dtype(df[col], skipna=True) != 'string']
+
+
+def escribir_tabla(df, ruta):
+    """
+    Escribe un DataFrame como archivo Arrow IPC sin compresión. Las columnas de _columnas_solo_pickle
+    se escriben aparte con pickle (`<ruta>.pkl`) para que vuelvan con los mismos valores y tipos; si
+    la tabla entera no se puede representar en Arrow (nombres de columna repetidos o que no son
+    texto) o pyarrow no está instalado, se escribe toda con pickle.
+
+    Retorna:
+    - TablaCompartida
+    """
+    nombres_validos = df.columns.is_unique and all(isinstance(col, str) for col in df.columns)
+    if arrow_disponible() and nombres_validos:
+        import pyarrow as pa
+        aparte = _columnas_solo_pickle(df)
+        try:
+            tabla = pa.Table.from_pandas(df.drop(columns=aparte), preserve_index=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            tabla = None
+        if tabla is not None:
+            with pa.OSFile(ruta, "wb") as archivo, pa.ipc.new_file(archivo, tabla.schema) as escritor:
+                escritor.write_table(tabla)
+            if aparte:
+                with open(ruta + ".pkl", "wb") as archivo:
+                    pickle.dump({'orden': list(df.columns), 'columnas': {col: df[col].to_numpy() for col in aparte}},
+                                archivo, protocol=pickle.HIGHEST_PROTOCOL)
+            return TablaCompartida(ruta, FORMATO_ARROW, len(df), aparte)
+    with open(ruta, "wb") as archivo:
+        pickle.dump(df, archivo, protocol=pickle.HIGHEST_PROTOCOL)
+    return TablaCompartida(ruta, FORMATO_PICKLE, len(df))
+
+
+def leer_tabla(referencia, copiar=False):
+    """
+    Lee una tabla escrita con escribir_tabla. Los archivos Arrow se abren con memory map y se
+    convierten columna por columna (split_blocks) liberando cada buffer de Arrow al convertirlo
+    (self_destruct): las columnas numéricas sin nulos no se copian y quedan de solo lectura. Las
+    columnas aparte se deserializan con pickle. Los nulos de las columnas de texto vuelven como
+    NaN, igual que los deja read_excel.
+
+    Con `copiar`, todas las columnas se copian a memoria propia y editable y el archivo queda libre
+    (para resultados que se entregan al usuario y sobreviven al transporte).
+    """
+    if referencia.formato == FORMATO_PICKLE:
+        with open(referencia.ruta, "rb") as archivo:
+            return pickle.load(archivo)
+
+    import pyarrow as pa
+    with pa.memory_map(referencia.ruta, "r") as origen:
+        tabla = pa.ipc.open_file(origen).read_all()
+        df = tabla.to_pandas() if copiar else tabla.to_pandas(split_blocks=True, self_destruct=True)
+        del tabla
+    for col in df.columns[df.dtypes == object]:
+        if df[col].isna().any():
+            df[col] = df[col].where(df[col].notna(), np.nan)
+    if referencia.columnas_pickle:
+        with open(referencia.ruta + ".pkl", "rb") as archivo:
+            aparte = pickle.load(archivo)
+        # Cada columna se inserta en su posición original: reordenar con df[orden] copiaría todo
+        for posicion, col in enumerate(aparte['orden']):
+            if col in aparte['columnas']:
+                valores = aparte['columnas'][col]
+                # Con dtype explícito: insertar el arreglo tal cual dejaría a pandas inferir otro tipo
+                df.insert(posicion, col, pd.Series(valores, index=df.index, dtype=valores.dtype))
+    return df
+
+
+class TransporteArrow:
+    """
+    Carpeta en memoria compartida donde un proceso deja DataFrames para que otro los lea.
+
+    En lugar de pasar los DataFrames a ProcessPoolExecutor.submit (se serializan con pickle, viajan
+    por una tubería y se deserializan en el worker), se escriben una vez como Arrow IPC y al worker
+    solo se le pasan las TablaCompartida; el worker lee las columnas numéricas directamente del
+    archivo (ver leer_tabla). La carpeta se borra con `cerrar` (o al salir del bloque with).
+    enviar_varios deja pasar tal cual las tablas de menos de `filas_minimas` filas.
+
+    Uso:
+        with TransporteArrow() as transporte:
+            referencias = transporte.enviar_varios(dfs)
+            pool.submit(funcion, referencias).result()      # en el worker: recibir_varios(referencias)
+    """
+    def __init__(self, directorio=None, filas_minimas=FILAS_MINIMAS_TRANSPORTE):
+        self.directorio = tempfile.mkdtemp(prefix="transporte_", dir=directorio or DIRECTORIO_COMPARTIDO)
+        self.filas_minimas = filas_minimas
+
+    def enviar(self, df, nombre=None):
+        """Escribe un DataFrame en la carpeta del transporte y devuelve su TablaCompartida."""
+        nombre = nombre or uuid.uuid4().hex[:12]
+        return escribir_tabla(df, os.path.join(self.directorio, f"{nombre}.tabla"))
+
+    def enviar_varios(self, dfs):
+        """enviar para cada DataFrame de un diccionario; los demás valores y las tablas pequeñas pasan tal cual."""
+        return {clave: self.enviar(df, clave) if isinstance(df, pd.DataFrame) and len(df) >= self.filas_minimas else df
+                for clave, df in dfs.items()}
+
+    def cerrar(self):
+        shutil.rmtree(self.directorio, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.cerrar()
+
+
+def recibir(referencia, copiar=False):
+    """DataFrame de una TablaCompartida (cualquier otro valor se devuelve tal cual); ver leer_tabla."""
+    return leer_tabla(referencia, copiar) if isinstance(referencia, TablaCompartida) else referencia
+
+
+def recibir_varios(referencias, copiar=False):
+    """recibir para cada valor de un diccionario."""
+    return {clave: recibir(referencia, copiar) for clave, referencia in referencias.items()}
+
+
+def _bytes_en_disco(referencia):
+    """Tamaño de una tabla escrita, incluidas sus columnas aparte."""
+    rutas = [referencia.ruta] + ([referencia.ruta + ".pkl"] if referencia.columnas_pickle else [])
+    return sum(os.path.getsize(ruta) for ruta in rutas)
+
+
+def _filas_en_worker(referencias):
+    """Tarea de referencia para el benchmark entre procesos: recibe las tablas y cuenta filas."""
+    return sum(len(df) for df in recibir_varios(referencias).values() if isinstance(df, pd.DataFrame))
+
+
+def comparar_con_pickle(dfs, repeticiones=3, entre_procesos=True):
+    """
+    Benchmark del transporte Arrow frente a pickle.
+
+    Parámetros:
+    - dfs (dict): DataFrames a transportar, por nombre (p. ej. los reportes de un periodo).
+    - repeticiones (int): Se informa el mejor tiempo de cada medición.
+    - entre_procesos (bool): Mide también el envío real a un worker de ProcessPoolExecutor.
+
+    Retorna:
+    - DataFrame: Por tabla, filas, columnas, formato usado por el transporte, MB y segundos de
+      pickle (dumps + loads) y de Arrow (escribir + leer). Con entre_procesos, una fila 'TOTAL
+      (entre procesos)' con el tiempo de pasar todas las tablas a un worker con cada método.
+    """
+    filas = []
+    with TransporteArrow() as transporte:
+        for nombre, df in dfs.items():
+            tiempos_pickle, tiempos_arrow = [], []
+            for _ in range(repeticiones):
+                inicio = time.perf_counter()
+                datos = pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL)
+                pickle.loads(datos)
+                tiempos_pickle.append(time.perf_counter() - inicio)
+
+                inicio = time.perf_counter()
+                referencia = transporte.enviar(df, nombre)
+                leer_tabla(referencia)
+                tiempos_arrow.append(time.perf_counter() - inicio)
+            filas.append({'Tabla': nombre, 'Filas': len(df), 'Columnas': df.shape[1], 'Formato': referencia.formato,
+                          'MB pickle': len(datos) / 2**20, 'MB transporte': _bytes_en_disco(referencia) / 2**20,
+                          'Segundos pickle': min(tiempos_pickle), 'Segundos transporte': min(tiempos_arrow)})
+
+        if entre_procesos:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                pool.submit(_filas_en_worker, {}).result()   # arranque del worker fuera de la medición
+                tiempos_pickle, tiempos_arrow = [], []
+                for _ in range(repeticiones):
+                    inicio = time.perf_counter()
+                    pool.submit(_filas_en_worker, dict(dfs)).result()
+                    tiempos_pickle.append(time.perf_counter() - inicio)
+
+                    inicio = time.perf_counter()
+                    pool.submit(_filas_en_worker, transporte.enviar_varios(dfs)).result()
+                    tiempos_arrow.append(time.perf_counter() - inicio)
+            filas.append({'Tabla': 'TOTAL (entre procesos)', 'Filas': sum(len(df) for df in dfs.values()),
+                          'Columnas': np.nan, 'Formato': '', 'MB pickle': np.nan, 'MB transporte': np.nan,
+                          'Segundos pickle': min(tiempos_pickle), 'Segundos transporte': min(tiempos_arrow)})
+    return pd.DataFrame(filas).round(4)
@@ -0,0 +1,215 @@
+import argparse
+import glob
+import hashlib
+import os
+import pickle
+import tempfile
+import time
+import traceback
+
+from mainSINSTREAMLIT import (ARCHIVOS_PERIODO, ARCHIVOS_REFERENCIA, Timer, cargar_archivo, procesar_dataframes,
+                              guardar_resultado)
+
+# -------------------------
+# Cache de archivos parseados
+# -------------------------
+# Versiones de cada archivo que se conservan en el cache en disco (la actual y las anteriores más recientes)
+ENTRADAS_POR_ARCHIVO = 3
+
+# Segundos sin usarse tras los que una entrada del cache en disco se borra
+DURACION_CACHE = 7 * 24 * 3600
+
+class CacheArchivosParseados:
+    """
+    Guarda el DataFrame ya cargado (cargar_archivo) de cada archivo junto a su huella
+    (fecha de modificación y tamaño). Mientras la huella no cambie, el archivo no se vuelve a leer.
+    Si se indica un directorio, el cache también se persiste en disco y sobrevive a reinicios; de
+    cada archivo se conservan solo las `max_entradas` versiones usadas más recientemente y ninguna
+    que lleve más de `duracion` segundos sin usarse, para que la vigilancia no llene el disco.
+    """
+    def __init__(self, directorio=None, max_entradas=ENTRADAS_POR_ARCHIVO, duracion=DURACION_CACHE):
+        self.directorio = directorio
+        self.max_entradas = max_entradas
+        self.duracion = duracion
+        self.memoria = {}
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+            for key in ARCHIVOS_PERIODO:
+                self.podar(key)
+
+    def _ruta_disco(self, key, huella):
+        nombre = hashlib.sha1(f"{key}|{huella}".encode()).hexdigest()
+        return os.path.join(self.directorio, f"{key}_{nombre}.pkl")
+
+    def _entradas_disco(self, key):
+        """Archivos del cache en disco de un reporte, del usado más recientemente al más antiguo."""
+        largo = len(f"{key}_") + 40 + len(".pkl")
+        rutas = [ruta for ruta in glob.glob(os.path.join(self.directorio, f"{key}_*.pkl"))
+                 if len(os.path.basename(ruta)) == largo]
+        return sorted(rutas, key=os.path.getmtime, reverse=True)
+
+    def podar(self, key):
+        """Borra del disco las versiones de un reporte que sobran o vencieron. Retorna cuántas borró."""
+        limite = time.time() - self.duracion
+        borradas = 0
+        for posicion, ruta in enumerate(self._entradas_disco(key)):
+            if posicion >= self.max_entradas or os.path.getmtime(ruta) < limite:
+                try:
+                    os.remove(ruta)
+                    borradas += 1
+                except OSError:
+                    pass
+        return borradas
+
+    def obtener(self, key, ruta, huella):
+        """
+        Devuelve el DataFrame parseado de `ruta`, leyéndolo solo si su huella cambió.
+
+        Retorna:
+        - DataFrame: El mismo objeto que guarda el cache, sin copiar; no debe modificarse.
+        - bool: True si el archivo tuvo que volver a parsearse.
+        """
+        guardado = self.memoria.get(key)
+        if guardado is not None and guardado[0] == huella:
+            return guardado[1], False
+
+        ruta_disco = self._ruta_disco(key, huella) if self.directorio else None
+        if ruta_disco and os.path.exists(ruta_disco):
+            with open(ruta_disco, "rb") as f:
+                df = pickle.load(f)
+            # La fecha de modificación marca el último uso (ver podar)
+            os.utime(ruta_disco)
+            reparseado = False
+        else:
+            df = cargar_archivo(key, ruta)
+            reparseado = True
+            if ruta_disco:
+                publicar_atomicamente(ruta_disco, lambda tmp: df.to_pickle(tmp))
+                self.podar(key)
+
+        self.memoria[key] = (huella, df)
+        return df, reparseado
+
+
+def huella_archivo(ruta):
+    """Huella (mtime en ns, tamaño) de un archivo, o None si no existe."""
+    try:
+        estado = os.stat(ruta)
+    except OSError:
+        return None
+    return (estado.st_mtime_ns, estado.st_size)
+
+
+def publicar_atomicamente(destino, escribir):
+    """
+    Escribe un archivo en una ruta temporal de la misma carpeta y lo renombra sobre el destino,
+    de modo que los lectores nunca ven un archivo a medio escribir.
+
+    Parámetros:
+    - destino (str): Ruta final.
+    - escribir (callable): Recibe la ruta temporal y escribe en ella.
+    """
+    carpeta = os.path.dirname(os.path.abspath(destino))
+    sufijo = os.path.splitext(destino)[1]
+    descriptor, temporal = tempfile.mkstemp(prefix=".tmp_", suffix=sufijo, dir=carpeta)
+    os.close(descriptor)
+    try:
+        escribir(temporal)
+        # mkstemp crea el archivo solo para el usuario; el reporte publicado debe ser legible
+        permisos = os.stat(destino).st_mode if os.path.exists(destino) else 0o644
+        os.chmod(temporal, permisos)
+        os.replace(temporal, destino)
+    except Exception:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+# -------------------------
+# Modo vigilancia
+# -------------------------
+def vigilar(carpeta, destino, intervalo=10, espera_estable=30, backend='pandas', directorio_cache=None,
+            max_ciclos=None):
+    """
+    Vigila una carpeta de exportaciones SAP y regenera el reporte cuando llegan archivos nuevos o
+    modificados.
+
+    Un archivo se considera completo cuando su huella no cambia durante `espera_estable` segundos,
+    para no leer exportaciones a medio copiar. Solo se vuelven a parsear los archivos cuya huella
+    cambió; el resto sale del cache. El reporte se publica de forma atómica en `destino`.
+
+    Parámetros:
+    - carpeta (str): Carpeta con los archivos de ARCHIVOS_PERIODO.
+    - destino (str): Ruta del libro Excel publicado.
+    - intervalo (float): Segundos entre revisiones de la carpeta.
+    - espera_estable (float): Segundos sin cambios antes de procesar un archivo.
+    - backend (str): Backend de process_data.
+    - directorio_cache (str): Carpeta para persistir el cache de archivos parseados.
+    - max_ciclos (int): Número de revisiones antes de salir (None = sin límite).
+    """
+    cache = CacheArchivosParseados(directorio_cache)
+    rutas = {key: os.path.join(carpeta, nombre) for key, nombre in ARCHIVOS_PERIODO.items()}
+    vistas = {}          # última huella observada por archivo
+    estable_desde = {}   # momento desde el que la huella no cambia
+    procesadas = None    # huellas del último procesamiento (exitoso o fallido)
+
+    print(f"Vigilando {carpeta} cada {intervalo} s; publicando en {destino}")
+    ciclo = 0
+    while max_ciclos is None or ciclo < max_ciclos:
+        ciclo += 1
+        ahora = time.time()
+        for key, ruta in rutas.items():
+            huella = huella_archivo(ruta)
+            if huella != vistas.get(key):
+                vistas[key] = huella
+                estable_desde[key] = ahora
+
+        huellas = dict(vistas)
+        completos = all(huella is not None for huella in huellas.values())
+        estables = all(ahora - estable_desde[key] >= espera_estable for key in rutas)
+        if completos and estables and huellas != procesadas:
+            procesadas = huellas
+            try:
+                _regenerar(cache, rutas, huellas, destino, backend)
+            except Exception:
+                print("Error regenerando el reporte; se reintentará cuando cambien los archivos.")
+                traceback.print_exc()
+
+        if max_ciclos is None or ciclo < max_ciclos:
+            time.sleep(intervalo)
+
+
+def _regenerar(cache, rutas, huellas, destino, backend):
+    with Timer("Regenerating report"):
+        dfs = {}
+        reparseados = []
+        for key, ruta in rutas.items():
+            dfs[key], reparseado = cache.obtener(key, ruta, huellas[key])
+            if reparseado:
+                reparseados.append(key)
+        print(f"Archivos parseados de nuevo: {reparseados or 'ninguno (todo desde cache)'}")
+
+        # La huella de cada archivo es también la versión de sus datos de referencia: el registro no
+        # vuelve a recorrer CRITICOS, INMOVILIZADOS ni tipos de cambio para saber si cambiaron
+        versiones_referencia = {key: "-".join(map(str, huellas[key])) for key in ARCHIVOS_REFERENCIA}
+        result, processed_dataframes_dict = procesar_dataframes(dfs, backend, versiones_referencia=versiones_referencia)
+        publicar_atomicamente(destino, lambda tmp: guardar_resultado(result, processed_dataframes_dict, tmp))
+    print(f"Reporte publicado en {destino}")
+
+
+def parse_args(argv=None):
+    from utilities.backends import backends_disponibles
+
+    parser = argparse.ArgumentParser(description="Regenera el reporte cada vez que llegan exportaciones SAP nuevas.")
+    parser.add_argument("carpeta", help="Carpeta compartida donde se depositan las exportaciones SAP.")
+    parser.add_argument("--destino", default="resultado.xlsx", help="Libro Excel publicado.")
+    parser.add_argument("--intervalo", type=float, default=10, help="Segundos entre revisiones.")
+    parser.add_argument("--espera", type=float, default=30, help="Segundos sin cambios antes de procesar un archivo.")
+    parser.add_argument("--cache", default=None, help="Carpeta para persistir el cache de archivos parseados.")
+    parser.add_argument("--backend", default="pandas", choices=backends_disponibles(),
+                        help="Backend de procesamiento (ver utilities.backends).")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    vigilar(args.carpeta, args.destino, args.intervalo, args.espera, args.backend, args.cache)